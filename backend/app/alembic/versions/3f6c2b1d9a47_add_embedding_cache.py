@@ -0,0 +1,33 @@
+"""Add embedding cache
+
+Revision ID: 3f6c2b1d9a47
+Revises: dc7f31f1b429
+Create Date: 2026-10-18 09:12:31.402913
+
+"""
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3f6c2b1d9a47"
+down_revision = "dc7f31f1b429"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "embedding_cache",
+        sa.Column("model_name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column(
+            "text_hash", sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False
+        ),
+        sa.Column("embedding", sa.LargeBinary(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("model_name", "text_hash"),
+    )
+
+
+def downgrade():
+    op.drop_table("embedding_cache")
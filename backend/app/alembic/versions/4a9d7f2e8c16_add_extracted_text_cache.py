@@ -0,0 +1,38 @@
+"""Add extracted text cache
+
+Revision ID: 4a9d7f2e8c16
+Revises: c81f5e3a6d02
+Create Date: 2026-10-18 18:21:09.527114
+
+"""
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "4a9d7f2e8c16"
+down_revision = "c81f5e3a6d02"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "extracted_text_cache",
+        sa.Column(
+            "content_hash", sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False
+        ),
+        sa.Column("extractor", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("pages", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("splitter", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column(
+            "chunk_boundaries", postgresql.JSONB(astext_type=sa.Text()), nullable=True
+        ),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("content_hash", "extractor"),
+    )
+
+
+def downgrade():
+    op.drop_table("extracted_text_cache")
@@ -0,0 +1,52 @@
+"""Backfill owner_id and source_type on vector chunks
+
+Revision ID: 7b3e9d2c4f10
+Revises: 3f6c2b1d9a47
+Create Date: 2026-10-18 10:41:07.118522
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "7b3e9d2c4f10"
+down_revision = "3f6c2b1d9a47"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The PGVector tables are created by langchain on first use, so they
+    # may not exist yet. The filter indexes are created by
+    # app/manage_vector_index.py ensure.
+    conn = op.get_bind()
+    if (
+        conn.execute(sa.text("SELECT to_regclass('langchain_pg_embedding')")).scalar()
+        is None
+    ):
+        return
+    op.execute(
+        """
+        UPDATE langchain_pg_embedding AS e
+        SET cmetadata = e.cmetadata || jsonb_build_object('owner_id', r.owner_id)
+        FROM recipe AS r
+        WHERE e.cmetadata->>'source' = coalesce(r.url, r.file_path)
+          AND NOT e.cmetadata ? 'owner_id'
+    """
+    )
+    op.execute(
+        """
+        UPDATE langchain_pg_embedding
+        SET cmetadata = cmetadata || jsonb_build_object('source_type',
+            CASE
+                WHEN cmetadata->>'source' ~* '\\.pdf$' THEN 'pdf'
+                WHEN cmetadata->>'source' ~* '\\.(jpe?g|png)$' THEN 'image'
+                ELSE 'url'
+            END)
+        WHERE NOT cmetadata ? 'source_type'
+    """
+    )
+
+
+def downgrade():
+    pass
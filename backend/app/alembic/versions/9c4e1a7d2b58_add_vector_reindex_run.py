@@ -0,0 +1,40 @@
+"""Add vector reindex run
+
+Revision ID: 9c4e1a7d2b58
+Revises: 7b3e9d2c4f10
+Create Date: 2026-10-18 15:40:12.118305
+
+"""
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9c4e1a7d2b58"
+down_revision = "7b3e9d2c4f10"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "vector_reindex_run",
+        sa.Column(
+            "target_collection", sqlmodel.sql.sqltypes.AutoString(), nullable=False
+        ),
+        sa.Column(
+            "run_id", sqlmodel.sql.sqltypes.AutoString(length=32), nullable=False
+        ),
+        sa.Column("last_recipe_id", sa.Integer(), nullable=False),
+        sa.Column("documents", sa.Integer(), nullable=False),
+        sa.Column("chunks", sa.Integer(), nullable=False),
+        sa.Column("failed", sa.Integer(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("completed_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("target_collection"),
+    )
+
+
+def downgrade():
+    op.drop_table("vector_reindex_run")
@@ -0,0 +1,31 @@
+"""Add vector source change log
+
+Revision ID: a6e1d4c8b273
+Revises: f2c6a8e4d715
+Create Date: 2026-10-19 10:14:52.503817
+
+"""
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "a6e1d4c8b273"
+down_revision = "f2c6a8e4d715"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "vector_source_change",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("owner_id", sa.Integer(), nullable=True),
+        sa.Column("source", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("changed_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade():
+    op.drop_table("vector_source_change")
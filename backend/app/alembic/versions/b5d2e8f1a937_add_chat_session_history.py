@@ -0,0 +1,42 @@
+"""Add chat session history
+
+Revision ID: b5d2e8f1a937
+Revises: 4a9d7f2e8c16
+Create Date: 2026-10-18 21:04:37.815320
+
+"""
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "b5d2e8f1a937"
+down_revision = "4a9d7f2e8c16"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "chat_session_history",
+        sa.Column(
+            "session_id", sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False
+        ),
+        sa.Column("messages", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("session_id"),
+    )
+    op.create_index(
+        op.f("ix_chat_session_history_updated_at"),
+        "chat_session_history",
+        ["updated_at"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index(
+        op.f("ix_chat_session_history_updated_at"), table_name="chat_session_history"
+    )
+    op.drop_table("chat_session_history")
@@ -0,0 +1,31 @@
+"""Add vector write generation
+
+Revision ID: b8c2f5a1e694
+Revises: a6e1d4c8b273
+Create Date: 2026-10-19 11:02:37.815240
+
+"""
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b8c2f5a1e694"
+down_revision = "a6e1d4c8b273"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "vector_write_generation",
+        sa.Column(
+            "collection_name", sqlmodel.sql.sqltypes.AutoString(), nullable=False
+        ),
+        sa.Column("generation", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("collection_name"),
+    )
+
+
+def downgrade():
+    op.drop_table("vector_write_generation")
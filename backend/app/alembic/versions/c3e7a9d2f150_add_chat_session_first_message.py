@@ -0,0 +1,26 @@
+"""Add chat session first message number
+
+Revision ID: c3e7a9d2f150
+Revises: b8c2f5a1e694
+Create Date: 2026-10-19 14:26:08.531774
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c3e7a9d2f150"
+down_revision = "b8c2f5a1e694"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "chat_session_history",
+        sa.Column("first_message", sa.Integer(), server_default="0", nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_column("chat_session_history", "first_message")
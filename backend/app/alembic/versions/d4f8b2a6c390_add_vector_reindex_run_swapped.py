@@ -0,0 +1,26 @@
+"""Add vector reindex run swapped flag
+
+Revision ID: d4f8b2a6c390
+Revises: e7a3c9f05b21
+Create Date: 2026-10-18 23:05:41.276903
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d4f8b2a6c390"
+down_revision = "e7a3c9f05b21"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "vector_reindex_run",
+        sa.Column("swapped", sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+
+
+def downgrade():
+    op.drop_column("vector_reindex_run", "swapped")
@@ -0,0 +1,27 @@
+"""Add chat session summary
+
+Revision ID: e7a3c9f05b21
+Revises: b5d2e8f1a937
+Create Date: 2026-10-18 22:12:53.402118
+
+"""
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e7a3c9f05b21"
+down_revision = "b5d2e8f1a937"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "chat_session_history",
+        sa.Column("summary", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_column("chat_session_history", "summary")
@@ -0,0 +1,58 @@
+"""Scope upsertion_record group ids by owner
+
+Revision ID: f2c6a8e4d715
+Revises: d4f8b2a6c390
+Create Date: 2026-10-18 23:31:18.640257
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "f2c6a8e4d715"
+down_revision = "d4f8b2a6c390"
+branch_labels = None
+depends_on = None
+
+
+def _tables_exist(conn):
+    # Both tables are created by langchain on first use
+    return all(
+        conn.execute(sa.text(f"SELECT to_regclass('{table}')")).scalar() is not None
+        for table in ("upsertion_record", "langchain_pg_embedding")
+    )
+
+
+def upgrade():
+    # Incremental cleanup groups chunks by owner_id:source (see
+    # app.core.vector_db_services.source_group_id). Records written before
+    # that still carry the bare source, so the next save of such a source
+    # would not clean up its old chunks.
+    conn = op.get_bind()
+    if not _tables_exist(conn):
+        return
+    op.execute(
+        """
+        UPDATE upsertion_record AS r
+        SET group_id = (e.cmetadata->>'owner_id') || ':' || (e.cmetadata->>'source')
+        FROM langchain_pg_embedding AS e
+        WHERE e.id = r.key
+          AND r.group_id = e.cmetadata->>'source'
+          AND e.cmetadata->>'owner_id' IS NOT NULL
+    """
+    )
+
+
+def downgrade():
+    conn = op.get_bind()
+    if not _tables_exist(conn):
+        return
+    op.execute(
+        """
+        UPDATE upsertion_record AS r
+        SET group_id = e.cmetadata->>'source'
+        FROM langchain_pg_embedding AS e
+        WHERE e.id = r.key
+          AND r.group_id = (e.cmetadata->>'owner_id') || ':' || (e.cmetadata->>'source')
+    """
+    )
@@ -1,26 +1,73 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, BackgroundTasks, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel, Field
 from typing import Dict, List, Optional
 from langchain_openai import ChatOpenAI
-from langchain_groq import ChatGroq
 from langchain_core.messages import HumanMessage, AIMessage
 from langchain_core.prompts import PromptTemplate, ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.output_parsers import JsonOutputParser
-from langchain_core.runnables.history import RunnableWithMessageHistory
+from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
 from langchain_core.chat_history import BaseChatMessageHistory
-from langchain_community.chat_message_histories import ChatMessageHistory
 
-from app.core.vector_db_services import query_vector_db
+from app.api.deps import CurrentUser
+from app.core.chat_compaction import compact_messages, estimate_tokens, summarize_history, summary_prompt
+from app.core.chat_history import chat_history_store
+from app.core.config import settings
+from app.core.llm import llm_registry
+from app.core.streaming import SSE_HEADERS, completed_items, measure_stream, sse_event
+from app.core.vector_db_services import aquery_vector_db
+from app.core.vector_search import metadata_filter
 
 router = APIRouter()
 
-# In-memory store for session histories
-store = {}
-
 def get_session_history(session_id: str) -> BaseChatMessageHistory:
-    if session_id not in store:
-        store[session_id] = ChatMessageHistory()
-    return store[session_id]
+    # Bounded and expiring, see app.core.chat_history
+    return chat_history_store.get(session_id)
+
+def history_to_chat_messages(messages) -> List[dict]:
+    return [{"role": "user", "content": msg.content} if isinstance(msg, HumanMessage) else {"role": "bot", "content": msg.content} for msg in messages]
+
+async def prompt_history(history: BaseChatMessageHistory):
+    # Summary of older turns plus the most recent ones, see app.core.chat_compaction
+    summary, messages, _ = await run_in_threadpool(history.snapshot)
+    compacted = compact_messages(summary, messages, settings.CHAT_HISTORY_KEEP_TURNS, settings.CHAT_HISTORY_TOKEN_BUDGET)
+    tokens = sum(estimate_tokens(msg.content) for msg in compacted)
+    print(f"Chat history in prompt: {len(compacted)} of {len(messages)} messages, ~{tokens} tokens")
+    return compacted
+
+async def save_exchange(history: BaseChatMessageHistory, query: str, response: str):
+    await run_in_threadpool(history.add_messages, [HumanMessage(content=query), AIMessage(content=response)])
+    return await run_in_threadpool(lambda: history.messages)
+
+# Sessions whose summary is being updated by this worker
+summarizing = set()
+
+async def summarize_session(session_id: str):
+    """
+    Fold turns that no longer fit the prompt window into the session's
+    rolling summary. Runs after the response has been sent.
+    """
+    if session_id in summarizing:
+        return
+    summarizing.add(session_id)
+    try:
+        await summarize_history(
+            get_session_history(session_id),
+            llm_registry.chain("chat_summary"),
+            settings.CHAT_HISTORY_KEEP_TURNS,
+            settings.CHAT_HISTORY_TOKEN_BUDGET,
+        )
+    except Exception as e:
+        print(f"Error: {e}")
+    finally:
+        summarizing.discard(session_id)
+
+chat_prompt = ChatPromptTemplate.from_messages([
+    ("system", "You are Carrotina, a friendly and helpful cooking assistant. You can help users with recipes, meal planning, cooking tips, and food-related questions. Always refer to yourself as Carrotina."),
+    MessagesPlaceholder(variable_name="history"),
+    ("human", "{input}")
+])
 
 class Meal(BaseModel):
     recipe: str
@@ -89,69 +136,55 @@ class ChatResponse(BaseModel):
     history: List[ChatMessage]
     
 @router.post("/chat", response_model=ChatResponse, summary="Chat with AI", description="Get answers to your questions from the AI.")
-def chat_with_ai(request: ChatRequest):
+async def chat_with_ai(request: ChatRequest, background_tasks: BackgroundTasks):
     """
     Get answers to your questions from the AI.
     """
     try:
         history = get_session_history(request.session_id)
-        
-        model = ChatGroq(model="llama3-70b-8192")
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are Carrotina, a friendly and helpful cooking assistant. You can help users with recipes, meal planning, cooking tips, and food-related questions. Always refer to yourself as Carrotina."),
-            MessagesPlaceholder(variable_name="history"),
-            ("human", "{input}")
-        ])
-        chain = prompt | model
-        runnable_with_history = RunnableWithMessageHistory(
-            chain,
-            get_session_history,
-            input_messages_key="input",
-            history_messages_key="history",
-        )
-
-        response = runnable_with_history.invoke(
-            {"input": HumanMessage(content=request.query), "history": history.messages},
-            config={"configurable": {"session_id": request.session_id}}
-        )
-        
-        # Append the new query and response to the chat history
-        history.add_user_message(HumanMessage(content=request.query))
-        history.add_ai_message(AIMessage(content=response.content))
-        
-        new_history = [{"role": "user", "content": msg.content} if isinstance(msg, HumanMessage) else {"role": "bot", "content": msg.content} for msg in history.messages]
-        
-        return {"response": response.content, "history": new_history}
+        inputs = {"input": request.query, "history": await prompt_history(history)}
+        response = await llm_registry.chain("chat").ainvoke(inputs)
+        messages = await save_exchange(history, request.query, response.content)
+        background_tasks.add_task(summarize_session, request.session_id)
+        return {"response": response.content, "history": history_to_chat_messages(messages)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/meal-plan", response_model=MealPlanResponse, summary="Generate meal plan", description="Generate a meal plan based on selected diets and available vegetables.")
-def generate_meal_plan(request: MealPlanRequest):
+@router.post("/chat/stream", summary="Chat with AI (streaming)", description="Stream the AI's answer as server-sent events.")
+async def stream_chat_with_ai(request: ChatRequest):
     """
-    Generate a meal plan based on the provided diets and vegetables.
+    Stream the answer token by token as `token` events, followed by a `done`
+    event carrying the full response and history (or an `error` event).
+    The exchange is added to the session history only once the answer is
+    complete, so an interrupted stream leaves the history unchanged.
     """
-    
-    try:
-        diets = ', '.join(request.diets)
-        vegetables = request.vegetables
-        numberOfPeople = request.numberOfPeople
-        startDay = request.startDay
-        matching_recipes = query_vector_db(vegetables)  
-        
-        recipes_data = [
-            {"title": recipe['title'], "url": recipe['url']}
-            for recipe in matching_recipes
-        ]
-        
-        print(f"Recipes Data: {recipes_data}")
+    history = get_session_history(request.session_id)
+    chain = llm_registry.chain("chat")
+    inputs = {"input": request.query, "history": await prompt_history(history)}
 
-        recipes_str = "\n".join(
-            [f"- Title: {recipe['title']}, URL: {recipe['url']}" for recipe in recipes_data]
-        )
-        
-        print(f"Recipes Str: {recipes_str}")
-              
-        template = """
+    async def events():
+        tokens = []
+        try:
+            async for chunk in measure_stream(chain.astream(inputs), "chat stream"):
+                if chunk.content:
+                    tokens.append(chunk.content)
+                    yield sse_event("token", {"content": chunk.content})
+        except Exception as e:
+            print(f"Error: {e}")
+            yield sse_event("error", {"detail": str(e)})
+            return
+        response = "".join(tokens)
+        messages = await save_exchange(history, request.query, response)
+        yield sse_event("done", {"response": response, "history": history_to_chat_messages(messages)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+        background=BackgroundTask(summarize_session, request.session_id),
+    )
+
+MEAL_PLAN_TEMPLATE = """
         You are the world's most comprehensive recipe book. Please help the user create a weekly meal plan (breakfast, lunch, dinner) based on their chosen diets: {diets}.
         If no diets are specified, assume they are omnivores.
         
@@ -186,44 +219,115 @@ def generate_meal_plan(request: MealPlanRequest):
             // ... other days
         }}        
         """
-         # model = ChatOpenAI(model_name="gpt-3.5-turbo")
-        model = ChatGroq(model="llama3-70b-8192")
-        parser = JsonOutputParser()
-        prompt = PromptTemplate(template=template, input_variables=["diets", "vegetables", "numberOfPeople", "startDay", "recipes"])
-        chain = prompt | model | parser
-        
-        response = chain.invoke({
-            "diets": diets,  
-            "vegetables": ', '.join(vegetables), 
-            "numberOfPeople": numberOfPeople, 
-            "startDay": startDay, 
-            "recipes": recipes_str
-        })
+
+meal_plan_prompt = PromptTemplate(template=MEAL_PLAN_TEMPLATE, input_variables=["diets", "vegetables", "numberOfPeople", "startDay", "recipes"])
+
+recipe_prompt = PromptTemplate.from_template("""
+    You are the biggest recipe book in the world. Please provide a detailed recipe for the following dish: {recipe_title}.
+    Include the ingredients and step-by-step instructions.
+    """)
+
+# Chains are built once per worker, see app.core.llm.LLMRegistry
+llm_registry.register("chat", settings.LLM_CHAT_MODEL, lambda model: chat_prompt | model)
+llm_registry.register("chat_summary", settings.LLM_SUMMARY_MODEL, lambda model: summary_prompt | model | StrOutputParser())
+# model = ChatOpenAI(model_name="gpt-3.5-turbo")
+llm_registry.register("meal_plan", settings.LLM_MEAL_PLAN_MODEL, lambda model: meal_plan_prompt | model | JsonOutputParser())
+llm_registry.register("recipe", settings.LLM_RECIPE_MODEL, lambda model: recipe_prompt | model | StrOutputParser())
+
+async def meal_plan_inputs(request: MealPlanRequest, current_user):
+    """
+    Look up the stored recipes matching the requested vegetables and build
+    the prompt inputs. Returns the inputs and the matched recipes.
+    """
+    owner_id = current_user.id if settings.RETRIEVAL_SCOPE_TO_OWNER else None
+    matching_recipes = await aquery_vector_db(request.vegetables, filter=metadata_filter(owner_id=owner_id))
+    
+    recipes_data = [
+        {"title": recipe['title'], "url": recipe['url']}
+        for recipe in matching_recipes
+    ]
+    
+    print(f"Recipes Data: {recipes_data}")
+
+    recipes_str = "\n".join(
+        [f"- Title: {recipe['title']}, URL: {recipe['url']}" for recipe in recipes_data]
+    )
+    
+    print(f"Recipes Str: {recipes_str}")
+
+    inputs = {
+        "diets": ', '.join(request.diets),
+        "vegetables": ', '.join(request.vegetables),
+        "numberOfPeople": request.numberOfPeople, 
+        "startDay": request.startDay, 
+        "recipes": recipes_str
+    }
+    return inputs, recipes_data
+
+def match_recipe_urls(meals, recipes_data):
+    # TODO: Fix the issue with the response JSON (no file paths and same meals for dinner/lunches)
+    for meal_type, meal in meals.items():
+        # Check if the recipe is from the vector store
+        for recipe in recipes_data:
+            if recipe['title'] in meal['recipe']:
+                meal['url'] = recipe['url']
+                meal.pop('ingredients', None)
+                meal.pop('recipe_steps', None)
+                break
+    return meals
+
+@router.post("/meal-plan", response_model=MealPlanResponse, summary="Generate meal plan", description="Generate a meal plan based on selected diets and available vegetables.")
+async def generate_meal_plan(request: MealPlanRequest, current_user: CurrentUser):
+    """
+    Generate a meal plan based on the provided diets and vegetables.
+    """
+    
+    try:
+        inputs, recipes_data = await meal_plan_inputs(request, current_user)
+        chain = llm_registry.chain("meal_plan")
+        response = await chain.ainvoke(inputs)
  
         meal_plan = response
-        # TODO: Fix the issue with the response JSON (no file paths and same meals for dinner/lunches)
         for day, meals in meal_plan.items():
-            for meal_type, meal in meals.items():
-                # Check if the recipe is from the vector store
-                for recipe in recipes_data:
-                    if recipe['title'] in meal['recipe']:
-                        meal['url'] = recipe['url']
-                        meal.pop('ingredients', None)
-                        meal.pop('recipe_steps', None)
-                        break
+            match_recipe_urls(meals, recipes_data)
 
         return {"response": meal_plan}
     except Exception as e:
         print(f"Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-    
-def generate_full_recipe_from_llm(recipe_title):
-    template = f"""
-    You are the biggest recipe book in the world. Please provide a detailed recipe for the following dish: {recipe_title}.
-    Include the ingredients and step-by-step instructions.
+
+@router.post("/meal-plan/stream", summary="Generate meal plan (streaming)", description="Stream the meal plan day by day as server-sent events.")
+async def stream_meal_plan(request: MealPlanRequest, current_user: CurrentUser):
     """
-    model = ChatGroq(model="llama3-70b-8192")
-    response = model(template)
+    Stream the meal plan as one `day` event per day, sent as soon as the
+    model has finished writing that day, followed by a `done` event with the
+    whole plan (or an `error` event). Recipe URLs are matched per day.
+    """
+    try:
+        inputs, recipes_data = await meal_plan_inputs(request, current_user)
+    except Exception as e:
+        print(f"Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    chain = llm_registry.chain("meal_plan")
+
+    async def events():
+        meal_plan = {}
+        try:
+            async for day, meals in completed_items(measure_stream(chain.astream(inputs), "meal plan stream")):
+                if not isinstance(meals, dict):
+                    continue
+                meal_plan[day] = match_recipe_urls(meals, recipes_data)
+                yield sse_event("day", {"day": day, "meals": meal_plan[day]})
+        except Exception as e:
+            print(f"Error: {e}")
+            yield sse_event("error", {"detail": str(e)})
+            return
+        yield sse_event("done", {"response": meal_plan})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+    
+async def generate_full_recipe_from_llm(recipe_title):
+    response = await llm_registry.chain("recipe").ainvoke({"recipe_title": recipe_title})
     
     # Parse the response to extract ingredients and steps
     response_data = response.split("Ingredients:")[1].split("Steps:")
@@ -1,15 +1,40 @@
+from contextlib import contextmanager
 from typing import Any, List
 from pydantic import BaseModel
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Request
+from fastapi.concurrency import run_in_threadpool
 from app.api.deps import CurrentUser, SessionDep
 from app.models import RecipeCreate, RecipeUpdate, RecipeOut, RecipesOut, Message, CommentCreate, Comment, CommentOut
 from app import crud
 from app.utils import upload_file_to_b2, get_download_authorization, fetch_html_content, parse_open_graph_data
 from app.core.config import settings
-from app.core.vector_db_services import process_and_store_in_vector_db
+from app.core.vector_db_services import build_metadata, delete_from_vector_db, process_and_store_in_vector_db, vector_write_lock
 
 router = APIRouter()
 
+def remove_from_vector_db(session, recipe, source):
+    # Keep the chunks if another recipe of the same user stores the source
+    if source and not crud.source_stored_by_other_recipe(db=session, db_recipe=recipe, source=source):
+        delete_from_vector_db(source, owner_id=recipe.owner_id)
+
+@contextmanager
+def vector_db_writes(needed=True):
+    # Held from the recipe row change to the vector db write, so a reindex
+    # swap (app.core.reindex) sees either none or all of it
+    if not needed:
+        yield
+        return
+    with vector_write_lock():
+        yield
+
+def save_new_recipe(session, recipe_in, user_id, store_in_vector_db):
+    with vector_db_writes(store_in_vector_db):
+        recipe = crud.create_recipe(db=session, recipe_in=recipe_in, user_id=user_id)
+        if store_in_vector_db:
+            metadata = build_metadata(title=recipe_in.title, file_path=recipe_in.file_path, url=recipe_in.url, owner_id=user_id)
+            process_and_store_in_vector_db(file_path=recipe_in.file_path, url=recipe_in.url, metadata=metadata)
+    return recipe
+
 @router.post("/", response_model=RecipeOut)
 async def create_recipe(
     request: Request,
@@ -43,17 +68,9 @@ async def create_recipe(
         comment=comment
     )
     
-    recipe = crud.create_recipe(db=session, recipe_in=recipe_in, user_id=current_user.id)
-    
-    if store_in_vector_db:
-        source = url if url else file_url
-        metadata = {
-            'title': title,
-            'source': source,  # Use source for both URL and file_path
-            'language': 'en',
-        }
-        process_and_store_in_vector_db(file_path=file_url, url=url, metadata=metadata)
-        
+    # The write lock blocks while a reindex swaps collections, so the
+    # database and vector db writes run off the event loop
+    recipe = await run_in_threadpool(save_new_recipe, session, recipe_in, current_user.id, store_in_vector_db)
     print("Created Recipe:", recipe)
     return recipe
 
@@ -103,15 +120,14 @@ def update_recipe(
         raise HTTPException(status_code=404, detail="Recipe not found")
     if recipe.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    recipe = crud.update_recipe(db=session, db_recipe=recipe, recipe_in=recipe_in)
-    if recipe_in.store_in_vector_db:
-        source = recipe.url if recipe.url else recipe.file_path
-        metadata = {
-            'title': recipe.title,
-            'source': source,
-            'language': 'en',
-        }
-        process_and_store_in_vector_db(file_path=recipe.file_path, url=recipe.url, metadata=metadata)
+    old_source = crud.recipe_source(recipe) if recipe.store_in_vector_db else None
+    with vector_db_writes(bool(old_source) or bool(recipe_in.store_in_vector_db)):
+        recipe = crud.update_recipe(db=session, db_recipe=recipe, recipe_in=recipe_in)
+        if old_source and (not recipe.store_in_vector_db or crud.recipe_source(recipe) != old_source):
+            remove_from_vector_db(session, recipe, old_source)
+        if recipe_in.store_in_vector_db:
+            metadata = build_metadata(title=recipe.title, file_path=recipe.file_path, url=recipe.url, owner_id=recipe.owner_id)
+            process_and_store_in_vector_db(file_path=recipe.file_path, url=recipe.url, metadata=metadata)
     
     return recipe
 
@@ -130,7 +146,10 @@ def delete_recipe(
         raise HTTPException(status_code=404, detail="Recipe not found")
     if recipe.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    crud.delete_recipe(db=session, db_recipe=recipe)
+    with vector_db_writes(recipe.store_in_vector_db):
+        if recipe.store_in_vector_db:
+            remove_from_vector_db(session, recipe, crud.recipe_source(recipe))
+        crud.delete_recipe(db=session, db_recipe=recipe)
     return Message(message="Recipe deleted successfully")
 
 class FileRequest(BaseModel):
@@ -1,7 +1,16 @@
+from typing import Any
+
 from fastapi import APIRouter, Depends
 from pydantic.networks import EmailStr
 
 from app.api.deps import get_current_active_superuser
+from app.core.chat_history import chat_history_store
+from app.core.config import settings
+from app.core.embedding_cache import embedding_cache
+from app.core.embeddings import EMBEDDING_MODEL_NAME, embedding_registry
+from app.core.llm import llm_registry
+from app.core.streaming import stream_tracker
+from app.core.vector_db_services import retrieval_cache
 from app.models import Message
 from app.utils import generate_test_email, send_email
 
@@ -24,3 +33,56 @@ def test_email(email_to: EmailStr) -> Message:
         html_content=email_data.html_content,
     )
     return Message(message="Test email sent")
+
+
+@router.get(
+    "/embeddings-status/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def embeddings_status() -> dict[str, Any]:
+    """
+    Report whether the embedding model is loaded in this worker, along with
+    the embedding and retrieval cache hit/miss counters.
+    """
+    return {
+        "model": EMBEDDING_MODEL_NAME,
+        "backend": settings.EMBEDDING_BACKEND,
+        "ready": embedding_registry.is_ready(EMBEDDING_MODEL_NAME),
+        "cache": embedding_cache.stats(),
+        "retrieval_cache": retrieval_cache.stats(),
+    }
+
+
+@router.post(
+    "/embeddings-warm-up/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def embeddings_warm_up() -> Message:
+    """
+    Load the embedding model in this worker.
+    """
+    embedding_registry.warm_up(EMBEDDING_MODEL_NAME)
+    return Message(message="Embedding model loaded")
+
+
+@router.get(
+    "/llm-status/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def llm_status() -> dict[str, Any]:
+    """
+    Report call counts and latency percentiles of each LLM in this worker,
+    and the time to first chunk and duration of the streamed routes.
+    """
+    return {"models": llm_registry.stats(), "streams": stream_tracker.stats()}
+
+
+@router.get(
+    "/chat-history-status/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def chat_history_status() -> dict[str, Any]:
+    """
+    Report the number of chat sessions and the size of their messages.
+    """
+    return chat_history_store.stats()
@@ -0,0 +1,151 @@
+"""
+Measure how many slow LLM calls the API's chat routes can serve
+concurrently, and how much they delay a cheap sync route of the same app.
+
+    python -m app.benchmarks.llm_concurrency [--requests 120] [--latency 1.0]
+
+Requests go to ``app.main:app`` in-process. The registry's models are
+replaced by a fake chat model that takes ``--latency`` seconds per call, so
+the numbers isolate the serving model from Groq's own latency. The probe
+polls /utils/llm-status/ with the superuser check overridden; sync routes
+run on Starlette's threadpool (40 threads by default).
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from collections.abc import AsyncIterator, Iterator
+from typing import Any
+
+import httpx
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from app.api.deps import get_current_active_superuser
+from app.core.config import settings
+from app.core.llm import llm_registry
+from app.main import app
+from app.models import User
+
+RESPONSE = "Roast the carrots with cumin and honey."
+ROUTES = {"chat": "/llm/chat", "stream": "/llm/chat/stream"}
+
+
+class SlowChatModel(BaseChatModel):
+    latency: float = 1.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow-fake"
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Any = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content=RESPONSE))]
+        )
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: Any = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content=RESPONSE))]
+        )
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: Any = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        for word in RESPONSE.split(" "):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=f"{word} "))
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: Any = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        for word in RESPONSE.split(" "):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=f"{word} "))
+
+
+def use_fake_llm(latency: float) -> None:
+    def factory(model_name: str, callbacks: list[BaseCallbackHandler]) -> BaseChatModel:
+        return SlowChatModel(latency=latency, callbacks=callbacks)
+
+    llm_registry.set_model_factory(factory)
+    app.dependency_overrides[get_current_active_superuser] = lambda: User(
+        email="bench@example.com", hashed_password="", is_superuser=True
+    )
+
+
+async def run(mode: str, requests: int) -> None:
+    transport = httpx.ASGITransport(app=app)
+    base_url = f"http://bench{settings.API_V1_STR}"
+    async with httpx.AsyncClient(
+        transport=transport, base_url=base_url, timeout=None
+    ) as client:
+        done = asyncio.Event()
+        pings: list[float] = []
+
+        async def probe() -> None:
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/utils/llm-status/")
+                pings.append(time.perf_counter() - start)
+                await asyncio.sleep(0.05)
+
+        async def chat() -> None:
+            # A new session per request, so no summaries are written
+            response = await client.post(
+                ROUTES[mode],
+                json={"query": "carrots?", "session_id": str(uuid.uuid4())},
+            )
+            response.raise_for_status()
+
+        prober = asyncio.create_task(probe())
+        start = time.perf_counter()
+        await asyncio.gather(*(chat() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await prober
+
+    pings.sort()
+    print(
+        f"{mode:>6}: {requests} LLM calls in {elapsed:.2f}s ({requests / elapsed:.1f} req/s), "
+        f"/utils/llm-status/ p50 {statistics.median(pings) * 1000:.0f}ms "
+        f"p95 {pings[int(len(pings) * 0.95)] * 1000:.0f}ms max {pings[-1] * 1000:.0f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=120)
+    parser.add_argument("--latency", type=float, default=1.0)
+    args = parser.parse_args()
+    use_fake_llm(args.latency)
+    for mode in ROUTES:
+        asyncio.run(run(mode, args.requests))
+
+
+if __name__ == "__main__":
+    main()
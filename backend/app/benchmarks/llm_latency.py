@@ -0,0 +1,52 @@
+"""
+Compare Groq call latency with a ChatGroq client created per call (as the
+llm routes used to) against the shared, keep-alive model from
+app.core.llm.llm_registry.
+
+    python -m app.benchmarks.llm_latency [--calls 20] [--model llama3-70b-8192]
+
+Needs GROQ_API_KEY. Prompts are kept tiny and max_tokens low so the
+difference in connection and TLS setup isn't drowned out by generation.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from langchain_groq import ChatGroq
+
+from app.core.llm import llm_registry
+
+PROMPT = "Name one root vegetable. Answer with one word."
+
+
+async def timed(calls: int, get_model) -> list[float]:
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        await get_model().ainvoke(PROMPT, max_tokens=5)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(name: str, timings: list[float]) -> None:
+    ordered = sorted(timings)
+    print(
+        f"{name:>9}: p50 {statistics.median(ordered) * 1000:.0f}ms "
+        f"p95 {ordered[int(len(ordered) * 0.95)] * 1000:.0f}ms "
+        f"first {timings[0] * 1000:.0f}ms"
+    )
+
+
+async def main(calls: int, model_name: str) -> None:
+    report("per call", await timed(calls, lambda: ChatGroq(model=model_name)))
+    report("shared", await timed(calls, lambda: llm_registry.model(model_name)))
+    await llm_registry.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--model", default="llama3-70b-8192")
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.model))
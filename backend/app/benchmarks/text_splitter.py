@@ -0,0 +1,83 @@
+"""
+Compare the recursive and token-offset text splitters.
+
+    python -m app.benchmarks.text_splitter [FILE ...]
+
+PDFs are read with PyPDFLoader, other files as plain text. Without files a
+synthetic cookbook of a few hundred recipes is used.
+"""
+import argparse
+import random
+import time
+
+from langchain_community.document_loaders import PyPDFLoader
+
+from app.core.vector_db_services import build_text_splitter, get_tokenizer
+
+WORDS = (
+    "carrot beetroot pumpkin onion garlic celery fennel spinach kale potato "
+    "roast simmer chop slice season stir bake serve fresh warm olive oil salt "
+    "pepper butter stock tender golden crisp minutes oven pan heat"
+).split()
+
+
+def synthetic_text(recipes: int = 300, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    parts = []
+    for n in range(recipes):
+        steps = "\n".join(
+            f"{i}. "
+            + " ".join(rng.choices(WORDS, k=rng.randint(8, 30))).capitalize()
+            + "."
+            for i in range(1, rng.randint(4, 12))
+        )
+        ingredients = "\n".join(
+            f"- {rng.randint(1, 4)} cups {rng.choice(WORDS)}" for _ in range(8)
+        )
+        parts.append(f"Recipe {n}\n\nIngredients\n{ingredients}\n\nMethod\n{steps}")
+    return "\n\n".join(parts)
+
+
+def load_texts(paths: list[str]) -> list[str]:
+    texts = []
+    for path in paths:
+        if path.endswith(".pdf"):
+            texts.append(
+                "\n\n".join(page.page_content for page in PyPDFLoader(path).load())
+            )
+        else:
+            with open(path) as f:
+                texts.append(f.read())
+    return texts
+
+
+def run(mode: str, texts: list[str], repeat: int) -> None:
+    splitter = build_text_splitter(mode)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = [chunk for text in texts for chunk in splitter.split_text(text)]
+        timings.append(time.perf_counter() - start)
+    sizes = [len(get_tokenizer().tokenize(chunk)) for chunk in chunks]
+    print(
+        f"{mode:>9}: best {min(timings):.3f}s over {repeat} runs, "
+        f"{len(chunks)} chunks, tokens/chunk avg {sum(sizes) / len(sizes):.0f} max {max(sizes)}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    texts = load_texts(args.files) if args.files else [synthetic_text()]
+    print(f"{sum(len(text) for text in texts)} characters in {len(texts)} documents")
+    for mode in ("recursive", "token"):
+        run(mode, texts, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
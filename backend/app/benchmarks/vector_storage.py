@@ -0,0 +1,139 @@
+"""
+Compare the vector, halfvec and binary storage modes of the ANN index on
+the chunks already stored in the plan_to_plate collection.
+
+    python -m app.benchmarks.vector_storage [--queries 50] [--k 10] [--keep]
+
+For each mode an HNSW index is built (unless it already exists), and the
+script reports its size, the search latency and recall@k against an exact
+full-precision scan. Indexes built by the script are dropped again unless
+``--keep`` is given.
+"""
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.vector_db_services import (
+    COLLECTION_NAME,
+    get_embedding_function,
+    get_search_engine,
+)
+from app.core.vector_index import (
+    EMBEDDING_TABLE,
+    STORAGE_INDEX_EXPRESSIONS,
+    _autocommit,
+    _create_index_sql,
+    _index_exists,
+    candidate_ef_search,
+    index_name,
+)
+from app.core.vector_search import vector_query
+
+VEGETABLES = (
+    "carrot beetroot pumpkin onion garlic celery fennel spinach kale potato "
+    "leek cabbage broccoli cauliflower courgette aubergine pepper tomato pea"
+).split()
+
+
+def query_embeddings(count: int, seed: int = 0) -> list[list[float]]:
+    rng = random.Random(seed)
+    queries = [
+        " ".join(rng.sample(VEGETABLES, rng.randint(2, 5))) for _ in range(count)
+    ]
+    embeddings = get_embedding_function()
+    return [embeddings.embed_query(query) for query in queries]
+
+
+def search(
+    conn, storage: str, embedding: list[float], k: int, exact: bool = False
+) -> list[str]:
+    sql, params = vector_query(storage, embedding, k, settings.VECTOR_RERANK_FACTOR)
+    params["collection"] = COLLECTION_NAME
+    with conn.begin():
+        conn.execute(
+            text(
+                f"SET LOCAL hnsw.ef_search = {candidate_ef_search(None, params['candidates'])}"
+            )
+        )
+        if exact:
+            conn.execute(text("SET LOCAL enable_indexscan = off"))
+        rows = conn.execute(text(sql), params).all()
+    return [row.document for row in rows]
+
+
+def run(
+    engine,
+    storage: str,
+    embeddings: list[list[float]],
+    truth: list[list[str]],
+    k: int,
+    keep: bool,
+) -> None:
+    name = index_name("hnsw", storage)
+    with _autocommit(engine) as conn:
+        created = not _index_exists(conn, name)
+        if created:
+            start = time.perf_counter()
+            conn.execute(
+                text(_create_index_sql(conn, "hnsw", storage, name, concurrently=False))
+            )
+            build = f"built in {time.perf_counter() - start:.1f}s"
+        else:
+            build = "existing"
+        size = conn.execute(
+            text("SELECT pg_relation_size(CAST(:name AS regclass))"), {"name": name}
+        ).scalar()
+
+    try:
+        with engine.connect() as conn:
+            timings, recalls = [], []
+            for embedding, expected in zip(embeddings, truth):
+                start = time.perf_counter()
+                found = search(conn, storage, embedding, k)
+                timings.append(time.perf_counter() - start)
+                recalls.append(len(set(found) & set(expected)) / max(1, len(expected)))
+        print(
+            f"{storage:>7}: index {size / 2**20:.1f} MiB ({build}), "
+            f"p50 {statistics.median(timings) * 1000:.1f}ms, "
+            f"recall@{k} {statistics.mean(recalls):.3f}"
+        )
+    finally:
+        if created and not keep:
+            with _autocommit(engine) as conn:
+                conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument(
+        "--keep", action="store_true", help="keep the indexes built by the benchmark"
+    )
+    args = parser.parse_args()
+
+    engine = get_search_engine()
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"SELECT count(*) FROM {EMBEDDING_TABLE}")).scalar()
+    print(
+        f"{rows} chunks, {args.queries} queries, rerank factor {settings.VECTOR_RERANK_FACTOR}"
+    )
+
+    embeddings = query_embeddings(args.queries)
+    with engine.connect() as conn:
+        truth = [
+            search(conn, "vector", embedding, args.k, exact=True)
+            for embedding in embeddings
+        ]
+    for storage in STORAGE_INDEX_EXPRESSIONS:
+        run(engine, storage, embeddings, truth, args.k, args.keep)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import logging
+from collections.abc import Sequence
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables import Runnable
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+summary_prompt = PromptTemplate.from_template(
+    """Update the summary of a conversation between a user and Carrotina, a cooking assistant.
+Keep the facts that later answers may depend on: the user's preferences, diets, allergies,
+ingredients they have, and recipes or plans that were agreed on. Write at most 200 words.
+
+Current summary:
+{summary}
+
+New messages:
+{conversation}
+
+Updated summary:"""
+)
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English text; avoids loading
+    # a tokenizer for the model behind the API
+    return len(text) // 4 + 1
+
+
+def window_start(
+    messages: Sequence[BaseMessage], max_turns: int, token_budget: int
+) -> int:
+    """
+    Index of the first message kept verbatim: the most recent messages, at
+    most ``max_turns`` exchanges and ``token_budget`` tokens. The window
+    always starts at a user message so exchanges aren't split.
+    """
+    start = len(messages)
+    tokens = 0
+    while start > 0 and len(messages) - start < max_turns * 2:
+        cost = estimate_tokens(messages[start - 1].content)
+        if tokens + cost > token_budget:
+            break
+        tokens += cost
+        start -= 1
+    while start < len(messages) and not isinstance(messages[start], HumanMessage):
+        start += 1
+    return start
+
+
+def compact_messages(
+    summary: str | None,
+    messages: Sequence[BaseMessage],
+    max_turns: int,
+    token_budget: int,
+) -> list[BaseMessage]:
+    """
+    The history as sent to the model: the rolling summary followed by the
+    window of recent messages.
+    """
+    compacted: list[BaseMessage] = []
+    if summary:
+        compacted.append(SystemMessage(content=SUMMARY_PREFIX + summary))
+    compacted.extend(messages[window_start(messages, max_turns, token_budget) :])
+    return compacted
+
+
+def format_conversation(messages: Sequence[BaseMessage]) -> str:
+    return "\n".join(
+        f"{'User' if isinstance(message, HumanMessage) else 'Carrotina'}: {message.content}"
+        for message in messages
+    )
+
+
+async def summarize_history(
+    history, summarize: Runnable, max_turns: int, token_budget: int
+) -> bool:
+    """
+    Fold the messages that have fallen out of the window into the session's
+    rolling summary. ``summarize`` maps {summary, conversation} to the new
+    summary text. Returns False if there was nothing to fold or the history
+    was compacted concurrently.
+    """
+    summary, messages, first = await run_in_threadpool(history.snapshot)
+    start = window_start(messages, max_turns, token_budget)
+    if start == 0:
+        return False
+    new_summary = await summarize.ainvoke(
+        {
+            "summary": summary or "(none)",
+            "conversation": format_conversation(messages[:start]),
+        }
+    )
+    compacted = await run_in_threadpool(
+        history.compact, new_summary.strip(), first + start, summary
+    )
+    if compacted:
+        logger.info(f"Folded {start} messages into the chat summary")
+    return compacted
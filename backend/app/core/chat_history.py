@@ -0,0 +1,316 @@
+import asyncio
+import logging
+import threading
+from collections.abc import Sequence
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.ttl_cache import TTLCache
+from app.models import ChatSessionHistory
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_TYPES: dict[str, type[BaseMessage]] = {
+    "human": HumanMessage,
+    "ai": AIMessage,
+    "system": SystemMessage,
+}
+
+
+def to_rows(messages: Sequence[BaseMessage]) -> list[list[str]]:
+    return [[message.type, message.content] for message in messages]
+
+
+def from_rows(rows: list[list[str]]) -> list[BaseMessage]:
+    return [MESSAGE_TYPES[type_](content=content) for type_, content in rows]
+
+
+class InMemoryChatMessageHistory(BaseChatMessageHistory):
+    """
+    Chat history that keeps only the last ``max_messages`` messages, plus a
+    rolling summary of the messages folded out of it. Messages are numbered
+    in the order they were added, so a compaction removes exactly the
+    messages that were summarized even if others were added or trimmed in
+    the meantime.
+    """
+
+    def __init__(self, max_messages: int) -> None:
+        self.max_messages = max_messages
+        self._messages: list[BaseMessage] = []
+        # Number of the first message in _messages
+        self._first = 0
+        self._summary: str | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def messages(self) -> list[BaseMessage]:  # type: ignore[override]
+        with self._lock:
+            return list(self._messages)
+
+    def snapshot(self) -> tuple[str | None, list[BaseMessage], int]:
+        """
+        The summary, the messages and the number of the first message.
+        """
+        with self._lock:
+            return self._summary, list(self._messages), self._first
+
+    def compact(self, summary: str, until: int, previous_summary: str | None) -> bool:
+        """
+        Replace the messages numbered below ``until`` by ``summary``, unless
+        the summary changed since ``previous_summary`` was read.
+        """
+        with self._lock:
+            if self._summary != previous_summary:
+                return False
+            del self._messages[: max(until - self._first, 0)]
+            self._first = max(self._first, until)
+            self._summary = summary
+            return True
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        with self._lock:
+            self._messages.extend(messages)
+            dropped = len(self._messages) - self.max_messages
+            if dropped > 0:
+                # Summaries normally fold messages long before this
+                logger.warning(
+                    f"Dropped {dropped} chat messages that were never summarized"
+                )
+                del self._messages[:dropped]
+                self._first += dropped
+
+    def clear(self) -> None:
+        with self._lock:
+            self._messages = []
+            self._first = 0
+            self._summary = None
+
+    def size(self) -> int:
+        with self._lock:
+            return sum(len(message.content) for message in self._messages) + len(
+                self._summary or ""
+            )
+
+
+class InMemoryChatHistoryStore:
+    """
+    Sessions of one worker process, evicted least recently used first once
+    there are more than ``max_sessions``, and after ``ttl`` seconds idle.
+    """
+
+    def __init__(self, max_sessions: int, max_messages: int, ttl: float) -> None:
+        self.max_messages = max_messages
+        self._sessions = TTLCache(maxsize=max_sessions, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> BaseChatMessageHistory:
+        with self._lock:
+            history = self._sessions.get(session_id)
+            if history is None:
+                history = InMemoryChatMessageHistory(self.max_messages)
+            # Re-set on every access so the TTL counts from the last use
+            self._sessions.set(session_id, history)
+        return history
+
+    def delete(self, session_id: str) -> None:
+        self._sessions.pop(session_id)
+
+    def sweep(self) -> int:
+        return self._sessions.expire()
+
+    def stats(self) -> dict[str, Any]:
+        sessions = self._sessions.values()
+        return {
+            "backend": "memory",
+            "sessions": len(sessions),
+            "max_sessions": self._sessions.maxsize,
+            "messages": sum(len(history.messages) for history in sessions),
+            "content_bytes": sum(history.size() for history in sessions),
+        }
+
+
+class PostgresChatMessageHistory(BaseChatMessageHistory):
+    """
+    Chat history stored as one row per session, shared by all workers.
+    Appends create the row if needed and lock it, so concurrent turns of a
+    session don't lose messages. Like the in-memory history, messages are
+    numbered so compactions from other workers remove only what they
+    summarized. Rows idle for longer than ``ttl`` read as empty.
+    """
+
+    def __init__(self, session_id: str, max_messages: int, ttl: float) -> None:
+        self.session_id = session_id
+        self.max_messages = max_messages
+        self.ttl = ttl
+
+    def _expired(self, row: ChatSessionHistory) -> bool:
+        updated_at = row.updated_at.replace(
+            tzinfo=row.updated_at.tzinfo or timezone.utc
+        )
+        return updated_at < datetime.now(timezone.utc) - timedelta(seconds=self.ttl)
+
+    @property
+    def messages(self) -> list[BaseMessage]:  # type: ignore[override]
+        return self.snapshot()[1]
+
+    def snapshot(self) -> tuple[str | None, list[BaseMessage], int]:
+        with Session(engine) as session:
+            row = session.get(ChatSessionHistory, self.session_id)
+            if row is None or self._expired(row):
+                return None, [], 0
+            return row.summary, from_rows(row.messages), row.first_message
+
+    def _lock_row(self, session: Session) -> ChatSessionHistory | None:
+        return session.exec(
+            select(ChatSessionHistory)
+            .where(ChatSessionHistory.session_id == self.session_id)
+            .with_for_update()
+        ).first()
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        with Session(engine) as session:
+            # Create the row first, so that concurrent first turns of a
+            # session both end up locking it instead of both inserting it
+            session.execute(
+                insert(ChatSessionHistory)
+                .values(
+                    session_id=self.session_id,
+                    messages=[],
+                    updated_at=datetime.now(timezone.utc),
+                )
+                .on_conflict_do_nothing(index_elements=[ChatSessionHistory.session_id])
+            )
+            row = self._lock_row(session)
+            if row is None:
+                # Cleared since the insert
+                row = ChatSessionHistory(session_id=self.session_id, messages=[])
+            elif self._expired(row):
+                # Keep counting, so a stale compaction can't remove new messages
+                row.first_message += len(row.messages)
+                row.messages = []
+                row.summary = None
+            row.messages = row.messages + to_rows(messages)
+            dropped = len(row.messages) - self.max_messages
+            if dropped > 0:
+                logger.warning(
+                    f"Dropped {dropped} chat messages that were never summarized"
+                )
+                row.messages = row.messages[dropped:]
+                row.first_message += dropped
+            row.updated_at = datetime.now(timezone.utc)
+            session.add(row)
+            session.commit()
+
+    def compact(self, summary: str, until: int, previous_summary: str | None) -> bool:
+        with Session(engine) as session:
+            row = self._lock_row(session)
+            if row is None or self._expired(row) or row.summary != previous_summary:
+                return False
+            row.messages = row.messages[max(until - row.first_message, 0) :]
+            row.first_message = max(row.first_message, until)
+            row.summary = summary
+            session.add(row)
+            session.commit()
+            return True
+
+    def clear(self) -> None:
+        with Session(engine) as session:
+            session.execute(
+                delete(ChatSessionHistory).where(
+                    ChatSessionHistory.session_id == self.session_id
+                )
+            )
+            session.commit()
+
+
+class PostgresChatHistoryStore:
+    def __init__(self, max_messages: int, ttl: float) -> None:
+        self.max_messages = max_messages
+        self.ttl = ttl
+
+    def get(self, session_id: str) -> BaseChatMessageHistory:
+        return PostgresChatMessageHistory(session_id, self.max_messages, self.ttl)
+
+    def delete(self, session_id: str) -> None:
+        self.get(session_id).clear()
+
+    def sweep(self) -> int:
+        """
+        Delete sessions idle for longer than the TTL.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.ttl)
+        with Session(engine) as session:
+            result = session.execute(
+                delete(ChatSessionHistory).where(ChatSessionHistory.updated_at < cutoff)
+            )
+            session.commit()
+        return result.rowcount
+
+    def stats(self) -> dict[str, Any]:
+        with Session(engine) as session:
+            sessions, messages, size = session.exec(
+                select(
+                    func.count(),
+                    func.coalesce(
+                        func.sum(func.jsonb_array_length(ChatSessionHistory.messages)),
+                        0,
+                    ),
+                    func.coalesce(
+                        func.sum(
+                            func.pg_column_size(ChatSessionHistory.messages)
+                            + func.coalesce(
+                                func.pg_column_size(ChatSessionHistory.summary), 0
+                            )
+                        ),
+                        0,
+                    ),
+                )
+            ).one()
+        return {
+            "backend": "postgres",
+            "sessions": sessions,
+            "messages": messages,
+            "content_bytes": size,
+        }
+
+
+ChatHistoryStore = InMemoryChatHistoryStore | PostgresChatHistoryStore
+
+
+def build_chat_history_store() -> ChatHistoryStore:
+    if settings.CHAT_HISTORY_BACKEND == "postgres":
+        return PostgresChatHistoryStore(
+            max_messages=settings.CHAT_HISTORY_MAX_MESSAGES,
+            ttl=settings.CHAT_HISTORY_TTL,
+        )
+    return InMemoryChatHistoryStore(
+        max_sessions=settings.CHAT_HISTORY_MAX_SESSIONS,
+        max_messages=settings.CHAT_HISTORY_MAX_MESSAGES,
+        ttl=settings.CHAT_HISTORY_TTL,
+    )
+
+
+chat_history_store = build_chat_history_store()
+
+
+async def sweep_periodically(store: ChatHistoryStore, interval: float) -> None:
+    """
+    Delete expired sessions every ``interval`` seconds until cancelled.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            removed = await asyncio.to_thread(store.sweep)
+        except Exception as e:
+            logger.warning(f"Chat history sweep failed: {e}")
+            continue
+        if removed:
+            logger.info(f"Removed {removed} expired chat sessions")
@@ -1,3 +1,4 @@
+import importlib.util
 import secrets
 import warnings
 from typing import Annotated, Any, Literal
@@ -104,6 +105,121 @@ class Settings(BaseSettings):
     B2_API_URL: str = "https://api.backblazeb2.com"
     B2_BUCKET_ID: str
 
+    # Embedding cache: in-memory LRU tier size and Postgres-backed tier toggle
+    EMBEDDING_CACHE_SIZE: int = 10_000
+    EMBEDDING_CACHE_PERSISTENT: bool = True
+    # Encoder runtime, see app.core.encoders. ONNX models are exported to
+    # EMBEDDING_ONNX_DIR on first use; 0 threads leaves the runtime default.
+    EMBEDDING_BACKEND: Literal["torch", "torch-int8", "onnx", "onnx-int8"] = "torch"
+    EMBEDDING_ONNX_DIR: str = ".cache/onnx"
+    EMBEDDING_NUM_THREADS: int = 0
+    # Concurrent query embeds arriving within the window share one forward
+    # pass; 0 disables batching
+    EMBEDDING_BATCH_WINDOW_MS: float = 5.0
+    EMBEDDING_MAX_BATCH_SIZE: int = 32
+    # Load the tokenizer and embedding model at startup rather than on the
+    # first request that needs them
+    PRELOAD_MODELS: bool = False
+
+    # pgvector ANN index on langchain_pg_embedding, see app.core.vector_index
+    VECTOR_INDEX_TYPE: Literal["hnsw", "ivfflat", "none"] = "hnsw"
+    VECTOR_HNSW_M: int = 16
+    VECTOR_HNSW_EF_CONSTRUCTION: int = 64
+    VECTOR_HNSW_EF_SEARCH: int = 40
+    # Filtered HNSW scans keep scanning until enough rows pass the filter;
+    # only applied where the installed pgvector supports it (>= 0.8)
+    VECTOR_HNSW_ITERATIVE_SCAN: Literal["off", "relaxed_order", "strict_order"] = "relaxed_order"
+    # None picks rows / 1000 (sqrt(rows) above a million rows) at build time
+    VECTOR_IVFFLAT_LISTS: int | None = None
+    VECTOR_IVFFLAT_PROBES: int = 10
+    VECTOR_INDEX_MAINTENANCE_WORK_MEM: str = "512MB"
+    # "halfvec" / "binary" index a float16 / binary-quantized copy of the
+    # embeddings and rerank VECTOR_RERANK_FACTOR x k candidates by full
+    # precision. Run manage_vector_index.py ensure after changing it.
+    VECTOR_STORAGE: Literal["vector", "halfvec", "binary"] = "vector"
+    VECTOR_RERANK_FACTOR: int = 4
+
+    # HTTP fetching of recipe pages for ingestion, see app.core.fetching
+    FETCH_TIMEOUT: float = 15.0
+    FETCH_MAX_CONNECTIONS: int = 50
+    FETCH_PER_HOST_LIMIT: int = 4
+    FETCH_MAX_BYTES: int = 10 * 1024 * 1024
+    # Uploaded PDFs and images
+    FETCH_MAX_FILE_BYTES: int = 100 * 1024 * 1024
+    FETCH_USER_AGENT: str = "plan-to-plate/0.1"
+
+    # Connection pool of the async vector search engine (per worker)
+    VECTOR_SEARCH_POOL_SIZE: int = 5
+    VECTOR_SEARCH_MAX_OVERFLOW: int = 10
+    VECTOR_SEARCH_POOL_TIMEOUT: float = 30.0
+    VECTOR_SEARCH_POOL_RECYCLE: int = 1800
+
+    # Per-worker cache of aquery_vector_db results. Entries are keyed by the
+    # collection's uuid, which a reindex swap changes, and its write
+    # generation, which every write bumps; workers look both up at most
+    # every GENERATION_TTL seconds, which bounds how long they serve stale
+    # results.
+    RETRIEVAL_CACHE_SIZE: int = 1024
+    RETRIEVAL_CACHE_TTL: int = 300
+    RETRIEVAL_CACHE_GENERATION_TTL: float = 5.0
+    # Collapse chunk hits to distinct recipes, fetching OVERFETCH x k chunks
+    RETRIEVAL_GROUP_BY_RECIPE: bool = True
+    RETRIEVAL_OVERFETCH: int = 4
+    RETRIEVAL_MMR: bool = False
+    RETRIEVAL_MMR_LAMBDA: float = 0.5
+    # Only retrieve recipes ingested by the requesting user
+    RETRIEVAL_SCOPE_TO_OWNER: bool = True
+    # Hybrid retrieval: fuse vector and full-text hits with reciprocal rank
+    # fusion; each leg fetches its own k candidates
+    RETRIEVAL_HYBRID: bool = True
+    RETRIEVAL_HYBRID_VECTOR_K: int = 40
+    RETRIEVAL_HYBRID_LEXICAL_K: int = 40
+    RETRIEVAL_RRF_K: int = 60
+    # Multi-query retrieval: with several vegetables, search for each one
+    # separately (MULTI_QUERY_K chunks each) and fuse so each is covered
+    RETRIEVAL_MULTI_QUERY: bool = True
+    RETRIEVAL_MULTI_QUERY_K: int = 20
+    # Requests with more vegetables are searched as one combined query, and
+    # at most CONCURRENCY searches of a request hold a pool connection
+    RETRIEVAL_MULTI_QUERY_MAX_QUERIES: int = 8
+    RETRIEVAL_MULTI_QUERY_CONCURRENCY: int = 4
+
+    # "token" tokenizes each document once and cuts by token offsets;
+    # "recursive" re-tokenizes candidate pieces while splitting
+    TEXT_SPLITTER_MODE: Literal["recursive", "token"] = "recursive"
+    # Pages of an uploaded PDF split, embedded and written per round
+    INGEST_WINDOW_PAGES: int = 20
+
+    # Groq chat models used by the llm routes, see app.core.llm.
+    # LLM_MODEL_SETTINGS holds extra ChatGroq options per model name, e.g.
+    # {"llama3-70b-8192": {"temperature": 0.2, "max_tokens": 4096}}
+    LLM_CHAT_MODEL: str = "llama3-70b-8192"
+    LLM_MEAL_PLAN_MODEL: str = "llama3-70b-8192"
+    LLM_RECIPE_MODEL: str = "llama3-70b-8192"
+    # Writes the rolling summary of long chats, see app.core.chat_compaction
+    LLM_SUMMARY_MODEL: str = "llama3-8b-8192"
+    LLM_MODEL_SETTINGS: dict[str, dict[str, Any]] = {}
+    LLM_TIMEOUT: float = 60.0
+    LLM_CONNECT_TIMEOUT: float = 5.0
+    LLM_MAX_RETRIES: int = 2
+    # Connection pool shared by all models
+    LLM_MAX_CONNECTIONS: int = 100
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    LLM_KEEPALIVE_EXPIRY: float = 30.0
+
+    # Chat session history, see app.core.chat_history. "postgres" shares
+    # sessions between workers; idle sessions expire after CHAT_HISTORY_TTL
+    # seconds and only the last CHAT_HISTORY_MAX_MESSAGES are kept.
+    CHAT_HISTORY_BACKEND: Literal["memory", "postgres"] = "memory"
+    CHAT_HISTORY_MAX_SESSIONS: int = 10_000
+    CHAT_HISTORY_MAX_MESSAGES: int = 50
+    CHAT_HISTORY_TTL: int = 60 * 60 * 24
+    CHAT_HISTORY_SWEEP_INTERVAL: int = 60 * 10
+    # The prompt gets at most the last CHAT_HISTORY_KEEP_TURNS exchanges that
+    # fit in CHAT_HISTORY_TOKEN_BUDGET; older ones are folded into a summary
+    CHAT_HISTORY_KEEP_TURNS: int = 6
+    CHAT_HISTORY_TOKEN_BUDGET: int = 1500
+
     def _check_default_secret(self, var_name: str, value: str | None) -> None:
         if value == "changethis":
             message = (
@@ -125,5 +241,33 @@ class Settings(BaseSettings):
 
         return self
 
+    @model_validator(mode="after")
+    def _check_embedding_backend(self) -> Self:
+        # The ONNX runtimes are not locked dependencies of the project
+        required = {
+            "onnx": ["onnxruntime"],
+            "onnx-int8": ["onnxruntime", "onnx"],
+        }.get(self.EMBEDDING_BACKEND, [])
+        missing = [name for name in required if importlib.util.find_spec(name) is None]
+        if missing:
+            raise ValueError(
+                f'EMBEDDING_BACKEND "{self.EMBEDDING_BACKEND}" needs '
+                f"{', '.join(missing)}, install it with: pip install {' '.join(missing)}"
+            )
+
+        return self
+
+    @model_validator(mode="after")
+    def _check_chat_history_window(self) -> Self:
+        # Every exchange is followed by a compaction down to the window, so
+        # the cap only drops unsummarized messages if it can't hold the
+        # window plus the next exchange
+        if self.CHAT_HISTORY_MAX_MESSAGES < 2 * (self.CHAT_HISTORY_KEEP_TURNS + 1):
+            raise ValueError(
+                "CHAT_HISTORY_MAX_MESSAGES must hold at least CHAT_HISTORY_KEEP_TURNS + 1 exchanges"
+            )
+
+        return self
+
 
 settings = Settings()  # type: ignore
@@ -0,0 +1,234 @@
+import hashlib
+import logging
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+
+from langchain_core.embeddings import Embeddings
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, col, select
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.encoders import embed_queries
+from app.models import EmbeddingCacheEntry
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def pack_embedding(embedding: list[float]) -> bytes:
+    return array("f", embedding).tobytes()
+
+
+def unpack_embedding(data: bytes) -> list[float]:
+    values = array("f")
+    values.frombytes(data)
+    return values.tolist()
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache keyed by model name and the SHA-256 of the
+    normalized text.
+
+    The memory tier is a bounded LRU shared by the whole worker process. The
+    optional persistent tier is the ``embedding_cache`` table, so reindexes
+    and other workers can reuse vectors that were computed once. Failures of
+    the persistent tier are logged and treated as misses.
+    """
+
+    def __init__(self, maxsize: int = 10_000, persistent: bool = True) -> None:
+        self.maxsize = maxsize
+        self.persistent = persistent
+        self._memory: OrderedDict[tuple[str, str], list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    def _memory_get(self, key: tuple[str, str]) -> list[float] | None:
+        with self._lock:
+            embedding = self._memory.get(key)
+            if embedding is not None:
+                self._memory.move_to_end(key)
+            return embedding
+
+    def _memory_set(self, key: tuple[str, str], embedding: list[float]) -> None:
+        with self._lock:
+            self._memory[key] = embedding
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
+
+    def _persistent_get(
+        self, model_name: str, hashes: list[str]
+    ) -> dict[str, list[float]]:
+        if not self.persistent or not hashes:
+            return {}
+        try:
+            with Session(engine) as session:
+                rows = session.exec(
+                    select(EmbeddingCacheEntry).where(
+                        EmbeddingCacheEntry.model_name == model_name,
+                        col(EmbeddingCacheEntry.text_hash).in_(hashes),
+                    )
+                ).all()
+        except Exception as e:
+            logger.warning(f"Embedding cache lookup failed: {e}")
+            return {}
+        return {row.text_hash: unpack_embedding(row.embedding) for row in rows}
+
+    def _persistent_set(self, model_name: str, entries: dict[str, list[float]]) -> None:
+        if not self.persistent or not entries:
+            return
+        statement = (
+            insert(EmbeddingCacheEntry)
+            .values(
+                [
+                    {
+                        "model_name": model_name,
+                        "text_hash": hash_,
+                        "embedding": pack_embedding(embedding),
+                    }
+                    for hash_, embedding in entries.items()
+                ]
+            )
+            .on_conflict_do_nothing()
+        )
+        try:
+            with Session(engine) as session:
+                session.exec(statement)  # type: ignore[call-overload]
+                session.commit()
+        except Exception as e:
+            logger.warning(f"Embedding cache write failed: {e}")
+
+    def get_many(self, model_name: str, hashes: list[str]) -> dict[str, list[float]]:
+        found: dict[str, list[float]] = {}
+        missing: list[str] = []
+        for hash_ in hashes:
+            embedding = self._memory_get((model_name, hash_))
+            if embedding is None:
+                missing.append(hash_)
+            else:
+                found[hash_] = embedding
+        self.memory_hits += len(found)
+
+        stored = self._persistent_get(model_name, missing)
+        for hash_, embedding in stored.items():
+            self._memory_set((model_name, hash_), embedding)
+        self.persistent_hits += len(stored)
+        self.misses += len(set(missing) - stored.keys())
+        found.update(stored)
+        return found
+
+    def set_many(self, model_name: str, entries: dict[str, list[float]]) -> None:
+        for hash_, embedding in entries.items():
+            self._memory_set((model_name, hash_), embedding)
+        self._persistent_set(model_name, entries)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._memory),
+            "maxsize": self.maxsize,
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        self.memory_hits = self.persistent_hits = self.misses = 0
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that consults an EmbeddingCache before calling the
+    underlying encoder and only encodes the texts it hasn't seen.
+    """
+
+    def __init__(
+        self, embeddings: Embeddings, model_name: str, cache: EmbeddingCache
+    ) -> None:
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache = cache
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        hashes = [text_hash(text) for text in texts]
+        found = self.cache.get_many(self.model_name, list(dict.fromkeys(hashes)))
+
+        to_embed: dict[str, str] = {}
+        for hash_, text in zip(hashes, texts, strict=True):
+            if hash_ not in found and hash_ not in to_embed:
+                to_embed[hash_] = text
+        if to_embed:
+            vectors = self.embeddings.embed_documents(list(to_embed.values()))
+            computed = dict(zip(to_embed.keys(), vectors, strict=True))
+            self.cache.set_many(self.model_name, computed)
+            found.update(computed)
+
+        return [found[hash_] for hash_ in hashes]
+
+    def missing(self, texts: list[str]) -> list[str]:
+        """
+        Return the distinct texts that have no cached document embedding.
+        """
+        by_hash = {text_hash(text): text for text in texts}
+        found = self.cache.get_many(self.model_name, list(by_hash))
+        return [text for hash_, text in by_hash.items() if hash_ not in found]
+
+    def prime(self, texts: list[str], vectors: list[list[float]]) -> None:
+        """
+        Store document embeddings that were computed elsewhere, e.g. by the
+        encoder processes of the bulk ingestion pipeline.
+        """
+        self.cache.set_many(
+            self.model_name,
+            {
+                text_hash(text): vector
+                for text, vector in zip(texts, vectors, strict=True)
+            },
+        )
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_queries([text])[0]
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """
+        Embed several queries, encoding the uncached ones in one batch.
+        """
+        # Queries get their own key space: BGE prepends a retrieval
+        # instruction to queries, so they embed differently from documents.
+        model_key = f"{self.model_name}:query"
+        hashes = [text_hash(text) for text in texts]
+        found = self.cache.get_many(model_key, list(dict.fromkeys(hashes)))
+        to_embed = {
+            hash_: text
+            for hash_, text in zip(hashes, texts, strict=True)
+            if hash_ not in found
+        }
+        if to_embed:
+            if len(to_embed) == 1:
+                vectors = [self.embeddings.embed_query(next(iter(to_embed.values())))]
+            else:
+                vectors = embed_queries(self.embeddings, list(to_embed.values()))
+            computed = dict(zip(to_embed.keys(), vectors, strict=True))
+            self.cache.set_many(model_key, computed)
+            found.update(computed)
+        return [found[hash_] for hash_ in hashes]
+
+
+embedding_cache = EmbeddingCache(
+    maxsize=settings.EMBEDDING_CACHE_SIZE,
+    persistent=settings.EMBEDDING_CACHE_PERSISTENT,
+)
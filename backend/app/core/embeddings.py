@@ -0,0 +1,110 @@
+import logging
+import os
+import threading
+import time
+
+from langchain_core.embeddings import Embeddings
+
+from app.core.config import settings
+from app.core.encoders import DynamicBatchingEmbeddings, load_encoder
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL_NAME = "BAAI/bge-small-en-v1.5"
+EMBEDDING_MODEL_KWARGS = {"device": "cpu"}
+EMBEDDING_ENCODE_KWARGS = {"normalize_embeddings": True}
+EMBEDDING_DIMENSIONS = 384
+
+
+class EmbeddingModelRegistry:
+    """
+    Process-wide registry of loaded embedding models.
+
+    Each model is built at most once per worker process and then shared by
+    every query and ingest path. Loading is guarded by a lock so concurrent
+    first requests don't construct the model twice. A forked worker starts
+    with an empty registry instead of inheriting the parent's models.
+    The encoder runtime is picked by ``settings.EMBEDDING_BACKEND``.
+    """
+
+    def __init__(self) -> None:
+        self._models: dict[str, Embeddings] = {}
+        self._batched: dict[str, DynamicBatchingEmbeddings] = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _check_pid(self) -> None:
+        if self._pid != os.getpid():
+            self._models = {}
+            self._batched = {}
+            self._lock = threading.Lock()
+            self._pid = os.getpid()
+
+    def get(self, model_name: str = EMBEDDING_MODEL_NAME) -> Embeddings:
+        self._check_pid()
+        model = self._models.get(model_name)
+        if model is not None:
+            return model
+        with self._lock:
+            model = self._models.get(model_name)
+            if model is None:
+                backend = settings.EMBEDDING_BACKEND
+                logger.info(f"Loading embedding model {model_name} ({backend})")
+                start = time.perf_counter()
+                model = load_encoder(
+                    model_name, backend, EMBEDDING_MODEL_KWARGS, EMBEDDING_ENCODE_KWARGS
+                )
+                self._models[model_name] = model
+                logger.info(
+                    f"Loaded embedding model {model_name} in {time.perf_counter() - start:.2f}s"
+                )
+        return model
+
+    def get_batched(self, model_name: str = EMBEDDING_MODEL_NAME) -> Embeddings:
+        """
+        The model wrapped in a dynamic-batching queue for query embeds, see
+        app.core.encoders.DynamicBatchingEmbeddings.
+        """
+        model = self.get(model_name)
+        if settings.EMBEDDING_BATCH_WINDOW_MS <= 0:
+            return model
+        batched = self._batched.get(model_name)
+        if batched is None:
+            with self._lock:
+                batched = self._batched.get(model_name)
+                if batched is None:
+                    batched = DynamicBatchingEmbeddings(
+                        model,
+                        window_ms=settings.EMBEDDING_BATCH_WINDOW_MS,
+                        max_batch_size=settings.EMBEDDING_MAX_BATCH_SIZE,
+                    )
+                    self._batched[model_name] = batched
+        return batched
+
+    def warm_up(self, model_name: str = EMBEDDING_MODEL_NAME) -> None:
+        """
+        Load the model and run a single encode so the first real request
+        doesn't pay for lazy initialisation inside the encoder.
+        """
+        self.get(model_name).embed_query("warm up")
+
+    def is_ready(self, model_name: str = EMBEDDING_MODEL_NAME) -> bool:
+        self._check_pid()
+        return model_name in self._models
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models = {}
+            self._batched = {}
+
+
+def encoder_key(model_name: str = EMBEDDING_MODEL_NAME) -> str:
+    """
+    Key under which embeddings from the configured backend are cached;
+    quantized and exported encoders don't produce bit-identical vectors.
+    """
+    backend = settings.EMBEDDING_BACKEND
+    return model_name if backend == "torch" else f"{model_name}@{backend}"
+
+
+embedding_registry = EmbeddingModelRegistry()
@@ -0,0 +1,276 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any
+
+from langchain_community.embeddings import HuggingFaceBgeEmbeddings
+from langchain_community.embeddings.huggingface import DEFAULT_QUERY_BGE_INSTRUCTION_EN
+from langchain_core.embeddings import Embeddings
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_INT8_MODEL_FILE = "model.int8.onnx"
+# Same limit sentence-transformers applies to bge-small-en-v1.5
+MAX_SEQUENCE_LENGTH = 512
+
+
+def quantize_torch(embeddings: HuggingFaceBgeEmbeddings) -> HuggingFaceBgeEmbeddings:
+    """
+    Replace the Linear layers of the sentence-transformers model with
+    dynamically quantized int8 ones, in place.
+    """
+    import torch
+
+    torch.quantization.quantize_dynamic(
+        embeddings.client, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+    )
+    return embeddings
+
+
+def onnx_model_dir(model_name: str) -> Path:
+    return Path(settings.EMBEDDING_ONNX_DIR) / model_name.replace("/", "--")
+
+
+def export_onnx(model_name: str, output_dir: Path, quantize: bool = False) -> Path:
+    """
+    Export the transformer of ``model_name`` to ONNX next to its tokenizer,
+    optionally with a dynamically int8-quantized copy. Returns the path of
+    the requested model file; existing exports are reused.
+    """
+    model_path = output_dir / ONNX_MODEL_FILE
+    if not model_path.exists():
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        logger.info(f"Exporting {model_name} to ONNX in {output_dir}")
+        start = time.perf_counter()
+        output_dir.mkdir(parents=True, exist_ok=True)
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModel.from_pretrained(model_name).eval()
+        sample = tokenizer(["warm up"], return_tensors="pt")
+        input_names = list(sample.keys())
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+        # Export to a temporary name so an interrupted export isn't reused
+        tmp_path = output_dir / f"{ONNX_MODEL_FILE}.tmp"
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(sample[name] for name in input_names),
+                str(tmp_path),
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=14,
+            )
+        tokenizer.save_pretrained(output_dir)
+        os.replace(tmp_path, model_path)
+        logger.info(
+            f"Exported {model_name} to ONNX in {time.perf_counter() - start:.2f}s"
+        )
+
+    if not quantize:
+        return model_path
+    int8_path = output_dir / ONNX_INT8_MODEL_FILE
+    if not int8_path.exists():
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        tmp_path = output_dir / f"{ONNX_INT8_MODEL_FILE}.tmp"
+        quantize_dynamic(str(model_path), str(tmp_path), weight_type=QuantType.QInt8)
+        os.replace(tmp_path, int8_path)
+    return int8_path
+
+
+class OnnxBgeEmbeddings(Embeddings):
+    """
+    BGE encoder running on ONNX Runtime with the same preprocessing, CLS
+    pooling and normalisation as HuggingFaceBgeEmbeddings.
+    """
+
+    def __init__(
+        self,
+        model_path: Path,
+        query_instruction: str = DEFAULT_QUERY_BGE_INSTRUCTION_EN,
+        batch_size: int = 32,
+        num_threads: int = 0,
+    ) -> None:
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        options = onnxruntime.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(
+            str(model_path), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {
+            model_input.name for model_input in self.session.get_inputs()
+        }
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path.parent)
+        self.query_instruction = query_instruction
+        self.batch_size = batch_size
+
+    def _encode(self, texts: list[str]) -> list[list[float]]:
+        import numpy as np
+
+        vectors = []
+        for i in range(0, len(texts), self.batch_size):
+            inputs = self.tokenizer(
+                texts[i : i + self.batch_size],
+                padding=True,
+                truncation=True,
+                max_length=MAX_SEQUENCE_LENGTH,
+                return_tensors="np",
+            )
+            feed = {
+                name: value.astype(np.int64)
+                for name, value in inputs.items()
+                if name in self.input_names
+            }
+            cls = self.session.run(None, feed)[0][:, 0]
+            cls = cls / np.linalg.norm(cls, axis=1, keepdims=True)
+            vectors.extend(cls.tolist())
+        return vectors
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._encode([text.replace("\n", " ") for text in texts])
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_queries([text])[0]
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        return self._encode(
+            [self.query_instruction + text.replace("\n", " ") for text in texts]
+        )
+
+
+def load_encoder(
+    model_name: str,
+    backend: str,
+    model_kwargs: dict[str, Any],
+    encode_kwargs: dict[str, Any],
+) -> Embeddings:
+    if backend in ("torch", "torch-int8"):
+        embeddings = HuggingFaceBgeEmbeddings(
+            model_name=model_name,
+            model_kwargs=model_kwargs,
+            encode_kwargs=encode_kwargs,
+        )
+        return quantize_torch(embeddings) if backend == "torch-int8" else embeddings
+    if backend in ("onnx", "onnx-int8"):
+        model_path = export_onnx(
+            model_name, onnx_model_dir(model_name), quantize=backend == "onnx-int8"
+        )
+        return OnnxBgeEmbeddings(model_path, num_threads=settings.EMBEDDING_NUM_THREADS)
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+
+def embed_queries(embeddings: Embeddings, texts: list[str]) -> list[list[float]]:
+    """
+    Embed several queries in one forward pass where the encoder allows it.
+    """
+    if isinstance(embeddings, OnnxBgeEmbeddings | DynamicBatchingEmbeddings):
+        return embeddings.embed_queries(texts)
+    if isinstance(embeddings, HuggingFaceBgeEmbeddings):
+        vectors = embeddings.client.encode(
+            [embeddings.query_instruction + text.replace("\n", " ") for text in texts],
+            **embeddings.encode_kwargs,
+        )
+        return vectors.tolist()
+    return [embeddings.embed_query(text) for text in texts]
+
+
+class DynamicBatchingEmbeddings(Embeddings):
+    """
+    Merges query embeds issued concurrently from different threads into a
+    single forward pass. The first query waits up to ``window_ms`` for
+    others to join its batch; document embeds are passed straight through
+    since callers already batch them.
+    """
+
+    def __init__(
+        self, embeddings: Embeddings, window_ms: float, max_batch_size: int
+    ) -> None:
+        self.embeddings = embeddings
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._queue: queue.SimpleQueue[tuple[str, Future]] = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._worker: threading.Thread | None = None
+        self._pid = os.getpid()
+        self.batches = 0
+        self.queries = 0
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked: the parent's queue and worker thread are unusable
+                self._queue = queue.SimpleQueue()
+                self._worker = None
+                self._pid = os.getpid()
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="embedding-batcher", daemon=True
+                )
+                self._worker.start()
+
+    def _run(self) -> None:
+        pending = self._queue
+        while True:
+            batch = [pending.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(pending.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            texts = [text for text, _ in batch]
+            try:
+                vectors = embed_queries(self.embeddings, texts)
+                # Checked here so a mismatch fails the batch, not the worker
+                if len(vectors) != len(batch):
+                    raise ValueError(
+                        f"Expected {len(batch)} embeddings, got {len(vectors)}"
+                    )
+            except Exception as exc:
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            self.batches += 1
+            self.queries += len(batch)
+            for (_, future), vector in zip(batch, vectors, strict=True):
+                future.set_result(vector)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_queries([text])[0]
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        self._ensure_worker()
+        futures: list[Future] = []
+        for text in texts:
+            future: Future = Future()
+            self._queue.put((text, future))
+            futures.append(future)
+        return [future.result() for future in futures]
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "batches": self.batches,
+            "queries": self.queries,
+            "avg_batch_size": self.queries / self.batches if self.batches else 0.0,
+        }
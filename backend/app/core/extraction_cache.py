@@ -0,0 +1,119 @@
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from langchain_core.documents import Document
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session
+
+from app.core.db import engine
+from app.models import ExtractedTextCacheEntry
+
+logger = logging.getLogger(__name__)
+
+# (page index, start offset, end offset) of a chunk in its page's text
+ChunkBoundary = tuple[int, int, int]
+
+
+@dataclass
+class ExtractedText:
+    pages: list[Document]
+    splitter: str | None = None
+    chunk_boundaries: list[ChunkBoundary] | None = None
+
+    def page_chunks(
+        self, splitter: str
+    ) -> list[tuple[Document, list[Document]]] | None:
+        """
+        Rebuild the chunks of every page from the stored boundaries if they
+        were computed with ``splitter``.
+        """
+        if self.splitter != splitter or self.chunk_boundaries is None:
+            return None
+        result: list[tuple[Document, list[Document]]] = [
+            (page, []) for page in self.pages
+        ]
+        for index, start, end in self.chunk_boundaries:
+            page = self.pages[index]
+            result[index][1].append(
+                Document(
+                    page_content=page.page_content[start:end],
+                    metadata=dict(page.metadata),
+                )
+            )
+        return result
+
+
+def split_page(
+    index: int, page: Document, split_text: Callable[[str], list[str]]
+) -> tuple[list[Document], list[ChunkBoundary] | None]:
+    """
+    Split one page like ``TextSplitter.split_documents`` and locate every
+    chunk in the page text. Boundaries are None if a chunk isn't a verbatim
+    slice of the page, in which case only the page text can be cached.
+    """
+    chunks: list[Document] = []
+    boundaries: list[ChunkBoundary] | None = []
+    offset = 0
+    for text in split_text(page.page_content):
+        chunks.append(Document(page_content=text, metadata=dict(page.metadata)))
+        if boundaries is None:
+            continue
+        start = page.page_content.find(text, offset)
+        if start < 0:
+            boundaries = None
+            continue
+        boundaries.append((index, start, start + len(text)))
+        offset = start + 1
+    return chunks, boundaries
+
+
+def get_extracted_text(content_hash: str, extractor: str) -> ExtractedText | None:
+    with Session(engine) as session:
+        entry = session.get(ExtractedTextCacheEntry, (content_hash, extractor))
+        if entry is None:
+            return None
+        return ExtractedText(
+            pages=[
+                Document(page_content=page["text"], metadata=page["metadata"])
+                for page in entry.pages
+            ],
+            splitter=entry.splitter,
+            chunk_boundaries=[tuple(boundary) for boundary in entry.chunk_boundaries]
+            if entry.chunk_boundaries is not None
+            else None,
+        )
+
+
+def save_extracted_text(
+    content_hash: str, extractor: str, extracted: ExtractedText
+) -> None:
+    """
+    Store the extracted pages unless another upload of the same file got
+    there first. A failed write only costs a later re-extraction, so it's
+    logged rather than raised.
+    """
+    statement = (
+        insert(ExtractedTextCacheEntry)
+        .values(
+            content_hash=content_hash,
+            extractor=extractor,
+            pages=[
+                {"text": page.page_content, "metadata": page.metadata}
+                for page in extracted.pages
+            ],
+            splitter=extracted.splitter,
+            chunk_boundaries=[list(boundary) for boundary in extracted.chunk_boundaries]
+            if extracted.chunk_boundaries is not None
+            else None,
+            created_at=datetime.now(timezone.utc),
+        )
+        .on_conflict_do_nothing(index_elements=["content_hash", "extractor"])
+    )
+    try:
+        with Session(engine) as session:
+            session.exec(statement)  # type: ignore[call-overload]
+            session.commit()
+    except Exception as e:
+        logger.warning(f"Extraction cache write failed: {e}")
@@ -0,0 +1,263 @@
+import asyncio
+import hashlib
+import logging
+import threading
+from collections.abc import Coroutine
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import IO, Any, TypeVar
+from urllib.parse import urlsplit
+
+import httpx
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import engine
+from app.models import SourceFetchState
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class FetchError(Exception):
+    pass
+
+
+@dataclass
+class FetchResult:
+    url: str
+    status_code: int
+    content: bytes = b""
+    content_type: str | None = None
+    encoding: str | None = None
+    etag: str | None = None
+    last_modified: str | None = None
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status_code == 304
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    @property
+    def content_hash(self) -> str:
+        return hashlib.sha256(self.content).hexdigest()
+
+
+class PageFetcher:
+    """
+    Shared HTTP client for ingestion.
+
+    Connections are kept alive and reused across fetches, at most
+    ``per_host_limit`` requests run against one host at a time, and bodies
+    larger than ``max_bytes`` are rejected. The client lives on a private
+    event loop thread, so the same pool serves async callers (``fetch``)
+    and the thread pools of the sync ingestion paths (``fetch_sync``).
+    """
+
+    def __init__(
+        self,
+        timeout: float,
+        max_connections: int,
+        per_host_limit: int,
+        max_bytes: int,
+        user_agent: str,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.per_host_limit = per_host_limit
+        self.max_bytes = max_bytes
+        self.user_agent = user_agent
+        self.transport = transport
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._client: httpx.AsyncClient | None = None
+        self._hosts: dict[str, asyncio.Semaphore] = {}
+        self._lock = threading.Lock()
+
+    def _start(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=loop.run_forever, name="page-fetcher", daemon=True
+                ).start()
+                self._loop = loop
+        return self._loop
+
+    def _submit(self, coro: Coroutine[Any, Any, T]) -> "asyncio.Future[T]":
+        return asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(coro, self._start())
+        )
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                headers={"User-Agent": self.user_agent},
+                follow_redirects=True,
+                transport=self.transport,
+            )
+        return self._client
+
+    async def _fetch(
+        self,
+        url: str,
+        etag: str | None,
+        last_modified: str | None,
+        max_bytes: int | None,
+    ) -> FetchResult:
+        max_bytes = max_bytes or self.max_bytes
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        host = urlsplit(url).netloc
+        semaphore = self._hosts.setdefault(host, asyncio.Semaphore(self.per_host_limit))
+        async with semaphore:
+            async with self._get_client().stream(
+                "GET", url, headers=headers
+            ) as response:
+                result = FetchResult(
+                    url=url,
+                    status_code=response.status_code,
+                    content_type=response.headers.get("content-type"),
+                    encoding=response.charset_encoding,
+                    etag=response.headers.get("etag"),
+                    last_modified=response.headers.get("last-modified"),
+                )
+                if response.status_code == 304:
+                    return result
+                if response.status_code >= 400:
+                    raise FetchError(f"GET {url} returned {response.status_code}")
+                declared = int(response.headers.get("content-length") or 0)
+                if declared > max_bytes:
+                    raise FetchError(f"{url} is {declared} bytes, limit is {max_bytes}")
+                body = bytearray()
+                async for data in response.aiter_bytes():
+                    body.extend(data)
+                    if len(body) > max_bytes:
+                        raise FetchError(f"{url} exceeds {max_bytes} bytes")
+                result.content = bytes(body)
+                return result
+
+    async def _download(self, url: str, file: IO[bytes], max_bytes: int | None) -> str:
+        max_bytes = max_bytes or self.max_bytes
+        digest = hashlib.sha256()
+        size = 0
+        host = urlsplit(url).netloc
+        semaphore = self._hosts.setdefault(host, asyncio.Semaphore(self.per_host_limit))
+        async with semaphore:
+            async with self._get_client().stream("GET", url) as response:
+                if response.status_code >= 400:
+                    raise FetchError(f"GET {url} returned {response.status_code}")
+                async for data in response.aiter_bytes():
+                    size += len(data)
+                    if size > max_bytes:
+                        raise FetchError(f"{url} exceeds {max_bytes} bytes")
+                    digest.update(data)
+                    file.write(data)
+        file.flush()
+        return digest.hexdigest()
+
+    def download_sync(
+        self, url: str, file: IO[bytes], max_bytes: int | None = None
+    ) -> str:
+        """
+        Stream the body of ``url`` into ``file`` without holding it in
+        memory and return its SHA-256.
+        """
+        try:
+            return asyncio.run_coroutine_threadsafe(
+                self._download(url, file, max_bytes), self._start()
+            ).result()
+        except httpx.HTTPError as e:
+            raise FetchError(f"GET {url} failed: {e!r}") from e
+
+    async def fetch(
+        self,
+        url: str,
+        etag: str | None = None,
+        last_modified: str | None = None,
+        max_bytes: int | None = None,
+    ) -> FetchResult:
+        """
+        GET ``url``; with ``etag`` / ``last_modified`` from an earlier fetch
+        the request is conditional and may return a 304 result without body.
+        ``max_bytes`` overrides the body size limit.
+        """
+        try:
+            return await self._submit(self._fetch(url, etag, last_modified, max_bytes))
+        except httpx.HTTPError as e:
+            raise FetchError(f"GET {url} failed: {e!r}") from e
+
+    def fetch_sync(
+        self,
+        url: str,
+        etag: str | None = None,
+        last_modified: str | None = None,
+        max_bytes: int | None = None,
+    ) -> FetchResult:
+        try:
+            return asyncio.run_coroutine_threadsafe(
+                self._fetch(url, etag, last_modified, max_bytes), self._start()
+            ).result()
+        except httpx.HTTPError as e:
+            raise FetchError(f"GET {url} failed: {e!r}") from e
+
+    async def close(self) -> None:
+        if self._loop is None:
+            return
+        if self._client is not None:
+            await self._submit(self._client.aclose())
+            self._client = None
+        self._hosts = {}
+
+
+page_fetcher = PageFetcher(
+    timeout=settings.FETCH_TIMEOUT,
+    max_connections=settings.FETCH_MAX_CONNECTIONS,
+    per_host_limit=settings.FETCH_PER_HOST_LIMIT,
+    max_bytes=settings.FETCH_MAX_BYTES,
+    user_agent=settings.FETCH_USER_AGENT,
+)
+
+
+def get_fetch_state(source_id: str) -> SourceFetchState | None:
+    with Session(engine) as session:
+        return session.get(SourceFetchState, source_id)
+
+
+def save_fetch_state(source_id: str, result: FetchResult, metadata_hash: str) -> None:
+    """
+    Remember the validators and content hash of a page whose chunks have
+    been stored, for conditional requests on the next ingest.
+    """
+    with Session(engine) as session:
+        state = session.get(SourceFetchState, source_id) or SourceFetchState(
+            source_id=source_id
+        )
+        state.url = result.url
+        state.etag = result.etag
+        state.last_modified = result.last_modified
+        state.content_hash = result.content_hash
+        state.metadata_hash = metadata_hash
+        state.fetched_at = datetime.now(timezone.utc)
+        session.add(state)
+        session.commit()
+
+
+def delete_fetch_state(source_id: str) -> None:
+    with Session(engine) as session:
+        state = session.get(SourceFetchState, source_id)
+        if state is not None:
+            session.delete(state)
+            session.commit()
@@ -0,0 +1,234 @@
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any
+
+from langchain_core.documents import Document
+from sqlmodel import Session, select
+
+from app.core.embeddings import EMBEDDING_MODEL_NAME, embedding_registry
+from app.core.vector_db_services import (
+    COLLECTION_NAME,
+    build_metadata,
+    get_embedding_function,
+    load_chunks,
+    store_embeddings,
+)
+from app.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IngestionStats:
+    documents: int = 0
+    chunks: int = 0
+    failed: int = 0
+    seconds: float = 0.0
+
+    @property
+    def docs_per_sec(self) -> float:
+        return self.documents / self.seconds if self.seconds else 0.0
+
+    @property
+    def chunks_per_sec(self) -> float:
+        return self.chunks / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.documents} docs, {self.chunks} chunks, {self.failed} failed "
+            f"in {self.seconds:.1f}s ({self.docs_per_sec:.2f} docs/sec, "
+            f"{self.chunks_per_sec:.1f} chunks/sec)"
+        )
+
+
+def recipe_metadata(recipe: Recipe) -> dict[str, Any]:
+    return build_metadata(
+        title=recipe.title,
+        file_path=recipe.file_path,
+        url=recipe.url,
+        owner_id=recipe.owner_id,
+    )
+
+
+def _init_encoder_process(num_threads: int) -> None:
+    import torch
+
+    torch.set_num_threads(num_threads)
+    embedding_registry.get(EMBEDDING_MODEL_NAME)
+
+
+def _encode_batch(texts: list[str]) -> list[list[float]]:
+    return embedding_registry.get(EMBEDDING_MODEL_NAME).embed_documents(texts)
+
+
+def _batched(items: Iterable[Any], size: int) -> Iterator[list[Any]]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class BulkIngestionPipeline:
+    """
+    Ingest many recipes into the vector store at once.
+
+    Recipes are fetched and split on a thread pool, chunk texts are encoded
+    in fixed-size batches across a pool of encoder processes, and chunks are
+    written to PGVector in large batches. Encoded vectors go through the
+    shared embedding cache, so the final ``index()`` call only reads them
+    back instead of re-encoding.
+    """
+
+    def __init__(
+        self,
+        fetch_workers: int = 8,
+        encoder_processes: int | None = None,
+        encode_batch_size: int = 64,
+        write_batch_size: int = 1000,
+        window_size: int = 2000,
+        collection_name: str = COLLECTION_NAME,
+        metadata: dict[str, Any] | None = None,
+    ) -> None:
+        self.fetch_workers = fetch_workers
+        self.encoder_processes = encoder_processes or max(1, (os.cpu_count() or 2) // 2)
+        self.encode_batch_size = encode_batch_size
+        self.write_batch_size = write_batch_size
+        # Number of chunks encoded and written per round; keeps memory and
+        # the in-memory cache tier bounded regardless of corpus size.
+        self.window_size = window_size
+        self.collection_name = collection_name
+        # Added to every chunk's metadata, on top of recipe_metadata()
+        self.metadata = metadata or {}
+
+    def _load(self, recipe: Recipe) -> list[Document]:
+        chunks = load_chunks(file_path=recipe.file_path, url=recipe.url)
+        metadata = recipe_metadata(recipe)
+        for chunk in chunks:
+            chunk.metadata.update(metadata)
+        return chunks
+
+    def _encoder_pool(self) -> Executor:
+        threads = max(1, (os.cpu_count() or 1) // self.encoder_processes)
+        return ProcessPoolExecutor(
+            max_workers=self.encoder_processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_encoder_process,
+            initargs=(threads,),
+        )
+
+    def _encode(self, pool: Executor, chunks: list[Document]) -> None:
+        embedding_function = get_embedding_function()
+        texts = [chunk.page_content for chunk in chunks]
+        # Fill the cache with vectors for the texts it doesn't know yet.
+        missing = embedding_function.missing(texts)
+        batches = list(_batched(missing, self.encode_batch_size))
+        for batch, vectors in zip(
+            batches, pool.map(_encode_batch, batches), strict=True
+        ):
+            embedding_function.prime(batch, vectors)
+
+    def _write(self, chunks: list[Document]) -> None:
+        store_embeddings(
+            chunks,
+            get_embedding_function(),
+            self.metadata,
+            batch_size=self.write_batch_size,
+            collection_name=self.collection_name,
+        )
+
+    def _fetch(
+        self, pool: Executor, recipes: Iterable[Recipe]
+    ) -> Iterator[tuple[Recipe, Future[list[Document]]]]:
+        # Keep a bounded number of fetches in flight so loaded documents
+        # don't pile up faster than they can be encoded.
+        in_flight: deque[tuple[Recipe, Future[list[Document]]]] = deque()
+        for recipe in recipes:
+            in_flight.append((recipe, pool.submit(self._load, recipe)))
+            if len(in_flight) >= self.fetch_workers * 2:
+                yield in_flight.popleft()
+        while in_flight:
+            yield in_flight.popleft()
+
+    def run(
+        self,
+        recipes: Iterable[Recipe],
+        on_flush: Callable[[Recipe, IngestionStats], None] | None = None,
+    ) -> IngestionStats:
+        """
+        Ingest ``recipes``. Recipes are written in the order they are given;
+        after each write ``on_flush`` is called with the last recipe that
+        has been written (or has failed to load) and the running totals.
+        """
+        stats = IngestionStats()
+        start = time.perf_counter()
+        window: list[Document] = []
+        last: Recipe | None = None
+        with ThreadPoolExecutor(
+            max_workers=self.fetch_workers
+        ) as fetch_pool, self._encoder_pool() as encode_pool:
+            for recipe, future in self._fetch(fetch_pool, recipes):
+                try:
+                    chunks = future.result()
+                except Exception as e:
+                    logger.warning(f"Failed to load recipe {recipe.id}: {e}")
+                    stats.failed += 1
+                    last = recipe
+                    continue
+                stats.documents += 1
+                window.extend(chunks)
+                last = recipe
+                if len(window) >= self.window_size:
+                    self._flush(encode_pool, window, stats, start)
+                    window = []
+                    if on_flush:
+                        on_flush(last, stats)
+            if window:
+                self._flush(encode_pool, window, stats, start)
+            if on_flush and last is not None:
+                on_flush(last, stats)
+        stats.seconds = time.perf_counter() - start
+        logger.info(f"Bulk ingestion finished: {stats}")
+        return stats
+
+    def _flush(
+        self,
+        pool: Executor,
+        chunks: list[Document],
+        stats: IngestionStats,
+        start: float,
+    ) -> None:
+        self._encode(pool, chunks)
+        self._write(chunks)
+        stats.chunks += len(chunks)
+        stats.seconds = time.perf_counter() - start
+        logger.info(f"Ingested {stats}")
+
+
+def ingest_recipes(recipes: Iterable[Recipe], **kwargs: Any) -> IngestionStats:
+    return BulkIngestionPipeline(**kwargs).run(recipes)
+
+
+def stream_recipes(
+    session: Session, after_id: int = 0, batch_size: int = 500
+) -> Iterator[Recipe]:
+    """
+    Yield the recipes stored in the vector db in id order, fetched
+    ``batch_size`` rows at a time through a server-side cursor.
+    """
+    statement = (
+        select(Recipe)
+        .where(Recipe.store_in_vector_db == True, Recipe.id > after_id)  # noqa: E712
+        .order_by(Recipe.id)
+        .execution_options(yield_per=batch_size)
+    )
+    yield from session.exec(statement)
+
+
+def ingest_all_recipes(session: Session, **kwargs: Any) -> IngestionStats:
+    return ingest_recipes(stream_recipes(session), **kwargs)
@@ -0,0 +1,203 @@
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from typing import Any
+from uuid import UUID
+
+import httpx
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import Runnable
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+ModelFactory = Callable[[str, list[BaseCallbackHandler]], BaseChatModel]
+ChainBuilder = Callable[[BaseChatModel], Runnable]
+
+
+def percentiles(values: deque[float]) -> dict[str, float] | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return {
+        "p50_ms": statistics.median(ordered) * 1000,
+        "p95_ms": ordered[int(len(ordered) * 0.95)] * 1000,
+    }
+
+
+class LatencyTracker(BaseCallbackHandler):
+    """
+    Records the duration of a model's calls, and the time to the first
+    token of streamed calls, over the last ``window`` calls.
+    """
+
+    run_inline = True
+
+    def __init__(self, model_name: str, window: int = 1000) -> None:
+        self.model_name = model_name
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.first_token: deque[float] = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+        self._started: dict[UUID, float] = {}
+        self._streaming: set[UUID] = set()
+
+    def on_chat_model_start(
+        self, serialized: dict[str, Any], messages: Any, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        start = self._started.get(run_id)
+        if start is not None and run_id not in self._streaming:
+            self._streaming.add(run_id)
+            self.first_token.append(time.perf_counter() - start)
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        start = self._started.pop(run_id, None)
+        self._streaming.discard(run_id)
+        if start is not None:
+            self.calls += 1
+            self.latencies.append(time.perf_counter() - start)
+
+    def on_llm_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._started.pop(run_id, None)
+        self._streaming.discard(run_id)
+        self.errors += 1
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "latency": percentiles(self.latencies),
+            "first_token": percentiles(self.first_token),
+        }
+
+
+class LLMRegistry:
+    """
+    Process-wide chat models and chains for the llm routes.
+
+    Each model is created once and shares one keep-alive HTTP connection
+    pool (sync and async) with every other model, so requests reuse open
+    TLS connections to Groq. Chains are registered with a builder when
+    the routes are imported, built by ``build_all`` at startup (or on
+    first use) and then reused by every request.
+    """
+
+    def __init__(self, model_factory: ModelFactory | None = None) -> None:
+        self._model_factory = model_factory or self._groq_model
+        self._builders: dict[str, tuple[str, ChainBuilder]] = {}
+        self._models: dict[str, BaseChatModel] = {}
+        self._chains: dict[str, Runnable] = {}
+        self._trackers: dict[str, LatencyTracker] = {}
+        self._http_client: httpx.Client | None = None
+        self._http_async_client: httpx.AsyncClient | None = None
+        self._lock = threading.RLock()
+
+    def _http_options(self) -> dict[str, Any]:
+        return {
+            "timeout": httpx.Timeout(
+                settings.LLM_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT
+            ),
+            "limits": httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY,
+            ),
+        }
+
+    def _groq_model(
+        self, model_name: str, callbacks: list[BaseCallbackHandler]
+    ) -> BaseChatModel:
+        from langchain_groq import ChatGroq
+
+        if self._http_client is None:
+            self._http_client = httpx.Client(**self._http_options())
+            self._http_async_client = httpx.AsyncClient(**self._http_options())
+        options: dict[str, Any] = {
+            "request_timeout": settings.LLM_TIMEOUT,
+            "max_retries": settings.LLM_MAX_RETRIES,
+        }
+        options.update(settings.LLM_MODEL_SETTINGS.get(model_name, {}))
+        return ChatGroq(
+            model=model_name,
+            http_client=self._http_client,
+            http_async_client=self._http_async_client,
+            callbacks=callbacks,
+            **options,
+        )
+
+    def set_model_factory(self, model_factory: ModelFactory) -> None:
+        """
+        Create models with ``model_factory`` from now on, e.g. a fake model
+        for benchmarks. Models and chains built so far are dropped.
+        """
+        with self._lock:
+            self._model_factory = model_factory
+            self._models = {}
+            self._chains = {}
+
+    def model(self, model_name: str) -> BaseChatModel:
+        model = self._models.get(model_name)
+        if model is None:
+            with self._lock:
+                model = self._models.get(model_name)
+                if model is None:
+                    tracker = self._trackers.setdefault(
+                        model_name, LatencyTracker(model_name)
+                    )
+                    model = self._model_factory(model_name, [tracker])
+                    self._models[model_name] = model
+        return model
+
+    def register(self, name: str, model_name: str, build: ChainBuilder) -> None:
+        with self._lock:
+            self._builders[name] = (model_name, build)
+            self._chains.pop(name, None)
+
+    def chain(self, name: str) -> Runnable:
+        chain = self._chains.get(name)
+        if chain is None:
+            with self._lock:
+                chain = self._chains.get(name)
+                if chain is None:
+                    model_name, build = self._builders[name]
+                    chain = build(self.model(model_name))
+                    self._chains[name] = chain
+        return chain
+
+    def build_all(self) -> None:
+        """
+        Build every registered chain. Failures (e.g. a missing API key) are
+        logged and the chain is built again on first use.
+        """
+        for name in list(self._builders):
+            try:
+                self.chain(name)
+            except Exception as e:
+                logger.warning(f"Could not build LLM chain {name}: {e}")
+
+    def stats(self) -> dict[str, Any]:
+        return {name: tracker.stats() for name, tracker in self._trackers.items()}
+
+    async def aclose(self) -> None:
+        with self._lock:
+            self._models = {}
+            self._chains = {}
+            http_client, self._http_client = self._http_client, None
+            http_async_client, self._http_async_client = self._http_async_client, None
+        if http_client is not None:
+            http_client.close()
+        if http_async_client is not None:
+            await http_async_client.aclose()
+
+
+llm_registry = LLMRegistry()
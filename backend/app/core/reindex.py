@@ -0,0 +1,266 @@
+import logging
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any
+
+from sqlalchemy import Engine, and_, delete, or_, text
+from sqlmodel import Session, col, select
+
+from app.core.ingestion import BulkIngestionPipeline, IngestionStats, stream_recipes
+from app.core.vector_db_services import (
+    COLLECTION_NAME,
+    REINDEX_LOCK_KEY,
+    delete_from_vector_db,
+    get_record_manager,
+    get_search_engine,
+    record_manager_namespace,
+    retrieval_cache,
+)
+from app.models import Recipe, VectorReindexRun, VectorSourceChange
+
+logger = logging.getLogger(__name__)
+
+SHADOW_SUFFIX = "__shadow"
+OLD_SUFFIX = "__old"
+
+
+def collection_exists(engine: Engine, collection_name: str) -> bool:
+    with engine.connect() as conn:
+        return (
+            conn.execute(
+                text("SELECT 1 FROM langchain_pg_collection WHERE name = :name"),
+                {"name": collection_name},
+            ).first()
+            is not None
+        )
+
+
+def drop_collection(engine: Engine, collection_name: str) -> None:
+    """
+    Delete a collection, its chunks (cascaded) and its record-manager keys.
+    """
+    with engine.begin() as conn:
+        conn.execute(
+            text("DELETE FROM upsertion_record WHERE namespace = :namespace"),
+            {"namespace": record_manager_namespace(collection_name)},
+        )
+        conn.execute(
+            text("DELETE FROM langchain_pg_collection WHERE name = :name"),
+            {"name": collection_name},
+        )
+
+
+def swap_collections(engine: Engine, live: str, shadow: str) -> None:
+    """
+    Atomically make ``shadow`` the live collection and mark its reindex run
+    as swapped. Searches look the collection up by name, so they switch
+    over on commit. The previous live collection is deleted afterwards.
+    """
+    if not collection_exists(engine, shadow):
+        raise ValueError(f"Collection {shadow} does not exist")
+    old = f"{live}{OLD_SUFFIX}"
+    drop_collection(engine, old)
+    with engine.begin() as conn:
+        rename = text(
+            "UPDATE langchain_pg_collection SET name = :new WHERE name = :name"
+        )
+        conn.execute(rename, {"name": live, "new": old})
+        conn.execute(rename, {"name": shadow, "new": live})
+        conn.execute(
+            text("DELETE FROM upsertion_record WHERE namespace = :namespace"),
+            {"namespace": record_manager_namespace(live)},
+        )
+        conn.execute(
+            text(
+                "UPDATE upsertion_record SET namespace = :new WHERE namespace = :namespace"
+            ),
+            {
+                "namespace": record_manager_namespace(shadow),
+                "new": record_manager_namespace(live),
+            },
+        )
+        conn.execute(
+            text(
+                "UPDATE vector_reindex_run SET swapped = true WHERE target_collection = :shadow"
+            ),
+            {"shadow": shadow},
+        )
+    drop_collection(engine, old)
+    retrieval_cache.clear()
+
+
+@contextmanager
+def reindex_lock(engine: Engine) -> Iterator[None]:
+    """
+    Hold the reindex advisory lock, waiting for API writes in progress to
+    finish; new writes wait until it is released, see
+    app.core.vector_db_services.vector_write_lock.
+    """
+    with engine.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": REINDEX_LOCK_KEY})
+        conn.commit()
+        try:
+            yield
+        finally:
+            conn.execute(
+                text("SELECT pg_advisory_unlock(:key)"), {"key": REINDEX_LOCK_KEY}
+            )
+            conn.commit()
+
+
+def _start_run(session: Session, target: str, restart: bool) -> VectorReindexRun:
+    run = session.get(VectorReindexRun, target)
+    if run is not None and run.completed_at is None and not restart:
+        logger.info(f"Resuming reindex of {target} after recipe {run.last_recipe_id}")
+        return run
+    if run is not None:
+        session.delete(run)
+        session.commit()
+    run = VectorReindexRun(target_collection=target, run_id=uuid.uuid4().hex)
+    session.add(run)
+    session.commit()
+    session.refresh(run)
+    return run
+
+
+def _ingest(
+    db_engine: Engine,
+    session: Session,
+    run: VectorReindexRun,
+    pipeline: BulkIngestionPipeline,
+    batch_size: int,
+) -> IngestionStats:
+    base = IngestionStats(documents=run.documents, chunks=run.chunks, failed=run.failed)
+
+    def checkpoint(recipe: Recipe, stats: IngestionStats) -> None:
+        run.last_recipe_id = recipe.id
+        run.documents = base.documents + stats.documents
+        run.chunks = base.chunks + stats.chunks
+        run.failed = base.failed + stats.failed
+        run.updated_at = datetime.now(timezone.utc)
+        session.add(run)
+        session.commit()
+
+    # The cursor lives in its own session; committing a checkpoint
+    # would close it.
+    with Session(db_engine) as stream_session:
+        return pipeline.run(
+            stream_recipes(stream_session, run.last_recipe_id, batch_size),
+            on_flush=checkpoint,
+        )
+
+
+def _catch_up(
+    session: Session, run: VectorReindexRun, pipeline: BulkIngestionPipeline
+) -> tuple[IngestionStats, int]:
+    """
+    Replay the API writes to the live collection logged since the run
+    started: drop the chunks of every changed source from the shadow
+    collection and ingest the recipes that still store it again. Returns
+    the stats and the id of the last change replayed.
+    """
+    changes = session.exec(select(VectorSourceChange)).all()
+    recipes: dict[int, Recipe] = {}
+    for owner_id, source in {(change.owner_id, change.source) for change in changes}:
+        delete_from_vector_db(source, owner_id, collection_name=run.target_collection)
+        statement = select(Recipe).where(
+            Recipe.store_in_vector_db == True,  # noqa: E712
+            or_(
+                Recipe.url == source,
+                and_(col(Recipe.url).is_(None), Recipe.file_path == source),
+            ),
+        )
+        if owner_id is not None:
+            statement = statement.where(Recipe.owner_id == owner_id)
+        recipes.update((recipe.id, recipe) for recipe in session.exec(statement))
+    last_change = max((change.id for change in changes), default=0)
+    if not recipes:
+        return IngestionStats(), last_change
+    logger.info(f"Replaying {len(recipes)} recipes changed during the reindex")
+    return pipeline.run(
+        sorted(recipes.values(), key=lambda recipe: recipe.id)
+    ), last_change
+
+
+def _refuse_failed(run: VectorReindexRun, force: bool) -> None:
+    if run.failed and not force:
+        raise RuntimeError(
+            f"{run.failed} recipes failed to ingest into {run.target_collection}, so it was not swapped in. "
+            "Run again with force to swap it in anyway, or restart to rebuild it."
+        )
+
+
+def reindex_collection(
+    db_engine: Engine,
+    shadow: bool = True,
+    restart: bool = False,
+    force: bool = False,
+    batch_size: int = 500,
+    **pipeline_kwargs: Any,
+) -> IngestionStats:
+    """
+    Rebuild the vector collection from the Recipe table.
+
+    Progress is checkpointed in vector_reindex_run after every write, and a
+    new call resumes an interrupted run unless ``restart`` is set. With
+    ``shadow`` the recipes are ingested into a separate collection that
+    replaces the live one once every recipe has been written; otherwise
+    they are re-ingested into the live collection in place.
+
+    The API keeps writing to the live collection during a shadow build.
+    Those writes are logged in vector_source_change and replayed into the
+    shadow collection right before the swap, under reindex_lock so no write
+    slips in between. A shadow collection is only swapped in if no recipe
+    failed to ingest, unless ``force`` is set.
+    """
+    search_engine = get_search_engine()
+    target = f"{COLLECTION_NAME}{SHADOW_SUFFIX}" if shadow else COLLECTION_NAME
+    with Session(db_engine) as session:
+        run = _start_run(session, target, restart)
+        if run.swapped:
+            # Interrupted after the swap, before the run was marked complete
+            logger.info(f"{target} was already swapped in")
+            stats = IngestionStats()
+        else:
+            if shadow and run.last_recipe_id == 0:
+                get_record_manager(target)  # creates upsertion_record if needed
+                drop_collection(search_engine, target)
+                # Writes logged so far are in the recipe rows about to be read
+                session.execute(delete(VectorSourceChange))
+                session.commit()
+            # Shadow chunks get their own ids: PGVector ids are unique across
+            # collections and derived from the chunk content and metadata.
+            pipeline = BulkIngestionPipeline(
+                collection_name=target,
+                metadata={"index_run": run.run_id} if shadow else None,
+                **pipeline_kwargs,
+            )
+            stats = _ingest(db_engine, session, run, pipeline, batch_size)
+            if shadow:
+                _refuse_failed(run, force)
+                with reindex_lock(search_engine):
+                    replayed, last_change = _catch_up(session, run, pipeline)
+                    run.documents += replayed.documents
+                    run.chunks += replayed.chunks
+                    run.failed += replayed.failed
+                    session.add(run)
+                    session.commit()
+                    _refuse_failed(run, force)
+                    logger.info(f"Swapping {target} in as {COLLECTION_NAME}")
+                    swap_collections(search_engine, COLLECTION_NAME, target)
+                    run.swapped = True
+                    session.execute(
+                        delete(VectorSourceChange).where(
+                            VectorSourceChange.id <= last_change
+                        )
+                    )
+        run.completed_at = datetime.now(timezone.utc)
+        session.add(run)
+        session.commit()
+        logger.info(
+            f"Reindex of {COLLECTION_NAME} finished: {run.documents} docs, "
+            f"{run.chunks} chunks, {run.failed} failed"
+        )
+    return stats
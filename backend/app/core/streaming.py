@@ -0,0 +1,102 @@
+import json
+import logging
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from typing import Any, TypeVar
+
+from app.core.llm import percentiles
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    # Stops nginx / traefik from buffering the stream
+    "X-Accel-Buffering": "no",
+}
+
+
+def sse_event(event: str, data: Any) -> str:
+    """
+    Format one server-sent event with a JSON payload.
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class StreamTracker:
+    """
+    Records the time to the first chunk and the total duration of each
+    named stream over its last ``window`` runs.
+    """
+
+    def __init__(self, window: int = 1000) -> None:
+        self.window = window
+        self._first_chunk: dict[str, deque[float]] = {}
+        self._durations: dict[str, deque[float]] = {}
+
+    def record_first_chunk(self, name: str, seconds: float) -> None:
+        self._first_chunk.setdefault(name, deque(maxlen=self.window)).append(seconds)
+
+    def record_duration(self, name: str, seconds: float) -> None:
+        self._durations.setdefault(name, deque(maxlen=self.window)).append(seconds)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            name: {
+                "streams": len(durations),
+                "first_chunk": percentiles(self._first_chunk.get(name, deque())),
+                "duration": percentiles(durations),
+            }
+            for name, durations in self._durations.items()
+        }
+
+
+stream_tracker = StreamTracker()
+
+
+async def measure_stream(
+    stream: AsyncIterator[T], name: str, tracker: StreamTracker = stream_tracker
+) -> AsyncIterator[T]:
+    """
+    Pass ``stream`` through, recording the time to its first item and the
+    total duration once it is exhausted in ``tracker``.
+    """
+    start = time.perf_counter()
+    first: float | None = None
+    items = 0
+    async for item in stream:
+        if first is None:
+            first = time.perf_counter() - start
+            tracker.record_first_chunk(name, first)
+        items += 1
+        yield item
+    duration = time.perf_counter() - start
+    tracker.record_duration(name, duration)
+    logger.info(
+        f"{name}: {items} chunks in {duration:.2f}s (time to first chunk {(first or 0) * 1000:.0f}ms)"
+    )
+
+
+async def completed_items(
+    partials: AsyncIterator[Any],
+) -> AsyncIterator[tuple[str, Any]]:
+    """
+    Turn the growing partial objects streamed by JsonOutputParser into
+    (key, value) pairs of the top-level object, each yielded once its value
+    is complete: when the next key starts, or when the stream ends.
+    """
+    latest: dict[str, Any] = {}
+    emitted = 0
+    async for partial in partials:
+        if not isinstance(partial, dict):
+            continue
+        latest = partial
+        keys = list(latest)
+        while emitted < len(keys) - 1:
+            yield keys[emitted], latest[keys[emitted]]
+            emitted += 1
+    keys = list(latest)
+    for key in keys[emitted:]:
+        yield key, latest[key]
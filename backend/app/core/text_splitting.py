@@ -0,0 +1,80 @@
+from collections.abc import Callable
+from typing import Any
+
+from langchain_text_splitters import TextSplitter
+
+# Preferred chunk boundaries, best first. Each is checked against the text
+# between two neighbouring tokens.
+PARAGRAPH, LINE, SENTENCE, WORD = range(4)
+
+
+class TokenOffsetTextSplitter(TextSplitter):
+    """
+    Split text into windows of ``chunk_size`` tokens with ``chunk_overlap``
+    tokens of overlap, tokenizing each document only once.
+
+    The fast tokenizer's offset mapping is used to cut the original text at
+    token boundaries. Within the last half of each window the cut is moved
+    back to the best natural boundary (paragraph, line, sentence, word), so
+    chunks read like the ones RecursiveCharacterTextSplitter produces while
+    never exceeding the token budget.
+    """
+
+    def __init__(self, tokenizer: Callable[..., Any], **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._tokenizer = tokenizer
+
+    def _offsets(self, text: str) -> list[tuple[int, int]]:
+        encoding = self._tokenizer(
+            text,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            verbose=False,
+        )
+        return [tuple(offset) for offset in encoding["offset_mapping"]]
+
+    def _boundary(
+        self, text: str, offsets: list[tuple[int, int]], i: int
+    ) -> int | None:
+        # Kind of boundary between token i - 1 and token i, if any
+        gap = text[offsets[i - 1][1] : offsets[i][0]]
+        if not gap or not gap.isspace():
+            return None
+        if "\n\n" in gap:
+            return PARAGRAPH
+        if "\n" in gap:
+            return LINE
+        if text[offsets[i - 1][1] - 1] in ".!?":
+            return SENTENCE
+        return WORD
+
+    def _cut(
+        self, text: str, offsets: list[tuple[int, int]], start: int, end: int
+    ) -> int:
+        lowest = start + max(1, (end - start) // 2)
+        best, best_kind = end, None
+        for i in range(end, lowest, -1):
+            kind = self._boundary(text, offsets, i)
+            if kind is not None and (best_kind is None or kind < best_kind):
+                best, best_kind = i, kind
+                if kind == PARAGRAPH:
+                    break
+        return best
+
+    def split_text(self, text: str) -> list[str]:
+        offsets = self._offsets(text)
+        chunks = []
+        start = 0
+        while start < len(offsets):
+            end = min(start + self._chunk_size, len(offsets))
+            if end < len(offsets):
+                end = self._cut(text, offsets, start, end)
+            chunk = text[offsets[start][0] : offsets[end - 1][1]]
+            if self._strip_whitespace:
+                chunk = chunk.strip()
+            if chunk:
+                chunks.append(chunk)
+            if end >= len(offsets):
+                break
+            start = max(end - self._chunk_overlap, start + 1)
+        return chunks
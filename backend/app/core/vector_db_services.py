@@ -1,14 +1,31 @@
-from langchain_community.document_loaders import WebBaseLoader, PyPDFLoader, UnstructuredImageLoader
-from transformers import AutoTokenizer
+from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.embeddings import HuggingFaceBgeEmbeddings
 from langchain_postgres.vectorstores import PGVector
 from langchain.indexes import SQLRecordManager, index
+from sqlalchemy import create_engine, text
+from bs4 import BeautifulSoup
+import hashlib
+import json
 import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
 
-EMBEDDING_MODEL_NAME = "BAAI/bge-small-en-v1.5"
-EMBEDDING_MODEL_KWARGS = {'device': 'cpu'}
-EMBEDDING_ENCODE_KWARGS = {'normalize_embeddings': True}
+from app.core.config import settings
+from app.core.embedding_cache import CachedEmbeddings, embedding_cache
+from app.core.embeddings import EMBEDDING_DIMENSIONS, EMBEDDING_MODEL_NAME, embedding_registry, encoder_key
+from app.core.extraction_cache import ExtractedText, get_extracted_text, save_extracted_text, split_page
+from app.core.fetching import delete_fetch_state, get_fetch_state, page_fetcher, save_fetch_state
+from app.core.text_splitting import TokenOffsetTextSplitter
+from app.core.ttl_cache import TTLCache
+from app.core.vector_index import EMBEDDING_TABLE, install_search_params
+from app.core.vector_search import VectorSearchService
+
+COLLECTION_NAME = "plan_to_plate"
+
+retrieval_cache = TTLCache(maxsize=settings.RETRIEVAL_CACHE_SIZE, ttl=settings.RETRIEVAL_CACHE_TTL)
 
 def get_connection_string():
     return PGVector.connection_string_from_db_params(
@@ -20,89 +37,511 @@ def get_connection_string():
         password=os.getenv('POSTGRES_PASSWORD', 'password'),
     )
 
-tokenizer = AutoTokenizer.from_pretrained(EMBEDDING_MODEL_NAME)
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=512,
-    chunk_overlap=20,
-    length_function=lambda text: len(tokenizer.tokenize(text, truncation=True)),
-    is_separator_regex=False,
-)
+_search_engine = None
+
+def get_search_engine():
+    # Long-lived engine for similarity searches; applies the ANN search
+    # parameters (hnsw.ef_search / ivfflat.probes) on every checkout.
+    global _search_engine
+    if _search_engine is None:
+        _search_engine = create_engine(get_connection_string(), pool_pre_ping=True)
+        install_search_params(_search_engine)
+    return _search_engine
+
+CHUNK_SIZE = 512
+CHUNK_OVERLAP = 20
+
+# transformers and the tokenizer are loaded on first use (or by
+# preload_models) so that importing this module stays cheap for API workers.
+_tokenizer = None
+_text_splitter = None
+_load_lock = threading.RLock()
+
+def get_tokenizer():
+    global _tokenizer
+    if _tokenizer is None:
+        with _load_lock:
+            if _tokenizer is None:
+                from transformers import AutoTokenizer
+                _tokenizer = AutoTokenizer.from_pretrained(EMBEDDING_MODEL_NAME)
+    return _tokenizer
+
+def build_text_splitter(mode):
+    tokenizer = get_tokenizer()
+    if mode == "token":
+        return TokenOffsetTextSplitter(
+            tokenizer,
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP,
+        )
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        length_function=lambda text: len(tokenizer.tokenize(text, truncation=True)),
+        is_separator_regex=False,
+    )
+
+def get_text_splitter():
+    global _text_splitter
+    if _text_splitter is None:
+        with _load_lock:
+            if _text_splitter is None:
+                _text_splitter = build_text_splitter(settings.TEXT_SPLITTER_MODE)
+    return _text_splitter
+
+def preload_models():
+    # Load the tokenizer and embedding model up front instead of on the
+    # first request, see settings.PRELOAD_MODELS.
+    start = time.perf_counter()
+    get_text_splitter()
+    embedding_registry.warm_up(EMBEDDING_MODEL_NAME)
+    print(f"Preloaded tokenizer and embedding model in {time.perf_counter() - start:.2f}s")
+
+# Identifies the chunk boundaries stored in the extracted-text cache
+SPLITTER_KEY = f"{settings.TEXT_SPLITTER_MODE}:{CHUNK_SIZE}:{CHUNK_OVERLAP}"
 
 def split_text_from_loader(loader):
-    chunks = loader.load_and_split(text_splitter)
+    return split_documents(loader.load())
+
+def split_documents(documents):
+    chunks = get_text_splitter().split_documents(documents)
     print("Generating " + str(len(chunks)) + " chunks...")
     return chunks
 
 def split_text_from_text(filepath):
     with open(filepath, "r") as f:
         text = f.read()
-    chunks = text_splitter.create_documents([text])
+    chunks = get_text_splitter().create_documents([text])
     print("Generating " + str(len(chunks)) + " chunks...")
     for chunk in chunks:
         chunk.metadata["source"] = filepath
     return chunks
 
 def get_embedding_function():
-    return HuggingFaceBgeEmbeddings(
-        model_name=EMBEDDING_MODEL_NAME,
-        model_kwargs=EMBEDDING_MODEL_KWARGS,
-        encode_kwargs=EMBEDDING_ENCODE_KWARGS,
+    # Shared per worker process, see app.core.embeddings.EmbeddingModelRegistry
+    return CachedEmbeddings(
+        embedding_registry.get_batched(EMBEDDING_MODEL_NAME),
+        encoder_key(EMBEDDING_MODEL_NAME),
+        embedding_cache,
     )
 
-def store_embeddings(chunks, embedding_function, metadata):
-    CONNECTION_STRING = get_connection_string()
-    vectorstore = PGVector(
-        collection_name="plan_to_plate",
-        connection=CONNECTION_STRING,
+_record_managers = {}
+
+def record_manager_namespace(collection_name=COLLECTION_NAME):
+    return f"pgvector/{collection_name}"
+
+def get_record_manager(collection_name=COLLECTION_NAME):
+    # One record manager per collection and worker process; its schema is
+    # created on first use instead of on every write.
+    record_manager = _record_managers.get(collection_name)
+    if record_manager is None:
+        record_manager = SQLRecordManager(
+            record_manager_namespace(collection_name), engine=get_search_engine()
+        )
+        record_manager.create_schema()
+        _record_managers[collection_name] = record_manager
+    return record_manager
+
+def get_vectorstore(embedding_function, collection_name=COLLECTION_NAME):
+    return PGVector(
+        collection_name=collection_name,
+        connection=get_search_engine(),
         embeddings=embedding_function,
+        embedding_length=EMBEDDING_DIMENSIONS,
     )
-    namespace = "pgvector/plan_to_plate"
-    record_manager = SQLRecordManager(
-        namespace, db_url=CONNECTION_STRING
-    )
-    record_manager.create_schema()
+
+def source_group_id(source, owner_id=None):
+    # Cleanup group of a source's chunks. Different users can store the same
+    # URL, so each owner's copy is cleaned up separately.
+    if source is None or owner_id is None:
+        return source
+    return f"{owner_id}:{source}"
+
+def chunk_source_id(chunk):
+    return source_group_id(chunk.metadata.get("source"), chunk.metadata.get("owner_id"))
+
+def store_embeddings(chunks, embedding_function, metadata, batch_size=100, collection_name=COLLECTION_NAME, cleanup="incremental"):
+    # Incremental cleanup: chunks of a re-indexed source that are no longer
+    # produced (e.g. the page changed) are deleted. Callers must pass all
+    # chunks of each source they index in a single call, or pass
+    # cleanup=None and clean up themselves (see store_file_in_vector_db).
+    vectorstore = get_vectorstore(embedding_function, collection_name)
     for chunk in chunks:
         chunk.metadata.update(metadata)
-    result = index(chunks, record_manager, vectorstore, cleanup=None, source_id_key="source")
+    result = index(
+        chunks,
+        get_record_manager(collection_name),
+        vectorstore,
+        cleanup=cleanup,
+        source_id_key=chunk_source_id,
+        batch_size=batch_size,
+    )
     print(result)
+    if result["num_added"] or result["num_updated"] or result["num_deleted"]:
+        invalidate_retrievals(collection_name)
+    return result
 
-def process_and_store_in_vector_db(file_path=None, url=None, metadata=None):
-    embedding_function = get_embedding_function()
+def invalidate_retrievals(collection_name=COLLECTION_NAME):
+    # Clears this worker's cache and bumps the collection's write
+    # generation, which other workers poll as part of their cache key (see
+    # VectorSearchService.collection_generation)
+    retrieval_cache.clear()
+    with get_search_engine().begin() as conn:
+        conn.execute(
+            text(
+                """
+                INSERT INTO vector_write_generation (collection_name, generation) VALUES (:collection, 1)
+                ON CONFLICT (collection_name)
+                DO UPDATE SET generation = vector_write_generation.generation + 1
+                """
+            ),
+            {"collection": collection_name},
+        )
+
+def delete_from_vector_db(source, owner_id=None, collection_name=COLLECTION_NAME):
+    """
+    Remove every chunk of ``source`` (of ``owner_id`` if given) from the
+    collection and the record manager. Returns the number of chunks removed.
+    """
+    params = {"collection": collection_name, "source": source}
+    owner_clause = ""
+    if owner_id is not None:
+        params["owner_id"] = str(owner_id)
+        owner_clause = "AND e.cmetadata->>'owner_id' = :owner_id"
+    with get_search_engine().begin() as conn:
+        ids = conn.execute(
+            text(
+                f"""
+                DELETE FROM {EMBEDDING_TABLE} AS e
+                USING langchain_pg_collection AS c
+                WHERE c.uuid = e.collection_id AND c.name = :collection
+                AND e.cmetadata->>'source' = :source {owner_clause}
+                RETURNING e.id
+                """
+            ),
+            params,
+        ).scalars().all()
+    if ids:
+        get_record_manager(collection_name).delete_keys([str(id_) for id_ in ids])
+    if collection_name == COLLECTION_NAME:
+        if ids:
+            invalidate_retrievals()
+        delete_fetch_state(source_group_id(source, owner_id))
+        record_source_change(source, owner_id)
+    print(f"Deleted {len(ids)} chunks of {source}")
+    return len(ids)
+
+# Postgres advisory lock taken exclusively by a shadow reindex while it
+# replays the API writes made during the build and swaps the collection in
+# (app.core.reindex), and shared by API writes meanwhile, so that every
+# write either is replayed or waits for the swap.
+REINDEX_LOCK_KEY = 7_106_405
+
+@contextmanager
+def vector_write_lock():
+    with get_search_engine().connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock_shared(:key)"), {"key": REINDEX_LOCK_KEY})
+        conn.commit()
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock_shared(:key)"), {"key": REINDEX_LOCK_KEY})
+            conn.commit()
+
+def record_source_change(source, owner_id=None):
+    # Logged for every API write to the live collection, so a shadow
+    # collection built meanwhile can catch up (see app.core.reindex)
+    if not source:
+        return
+    with get_search_engine().begin() as conn:
+        conn.execute(
+            text("INSERT INTO vector_source_change (owner_id, source, changed_at) VALUES (:owner_id, :source, now())"),
+            {"owner_id": owner_id, "source": source},
+        )
+
+def get_source_type(file_path=None, url=None):
     if file_path:
         if file_path.endswith('.pdf'):
-            loader = PyPDFLoader(file_path)
+            return 'pdf'
         elif file_path.endswith('.jpg') or file_path.endswith('.jpeg') or file_path.endswith('.png'):
-            loader = UnstructuredImageLoader(file_path)
+            return 'image'
+    # Other files are fetched as web pages, see get_web_url
+    return 'url'
+
+def build_metadata(title, file_path=None, url=None, owner_id=None, language='en'):
+    # Stored on every chunk; owner_id, language and source_type are the
+    # fields vector searches can filter on (see metadata_filter)
+    return {
+        'title': title,
+        'source': url if url else file_path,  # Use source for both URL and file_path
+        'source_type': get_source_type(file_path=file_path, url=url),
+        'language': language,
+        'owner_id': owner_id,
+    }
+
+def is_image(path):
+    return path.endswith('.jpg') or path.endswith('.jpeg') or path.endswith('.png')
+
+def get_web_url(file_path=None, url=None):
+    # Sources fetched as web pages through app.core.fetching.page_fetcher;
+    # PDFs and images keep their own loaders.
+    if file_path:
+        if file_path.endswith('.pdf') or is_image(file_path):
+            return None
+        return file_path
+    return url
+
+def get_loader(file_path=None, url=None):
+    # Imported here: the loaders pull in pypdf / unstructured
+    if file_path.endswith('.pdf'):
+        from langchain_community.document_loaders import PyPDFLoader
+        return PyPDFLoader(file_path)
+    from langchain_community.document_loaders import UnstructuredImageLoader
+    return UnstructuredImageLoader(file_path)
+
+def html_to_documents(result):
+    # Same text and metadata as langchain's WebBaseLoader
+    soup = BeautifulSoup(result.text, "xml" if result.url.endswith(".xml") else "html.parser")
+    metadata = {"source": result.url}
+    if title := soup.find("title"):
+        metadata["title"] = title.get_text()
+    if description := soup.find("meta", attrs={"name": "description"}):
+        metadata["description"] = description.get("content", "No description found.")
+    if html := soup.find("html"):
+        metadata["language"] = html.get("lang", "No language found.")
+    return [Document(page_content=soup.get_text(), metadata=metadata)]
+
+def download_file(file_path, f):
+    # Uploaded files are stored in B2 and referenced by URL
+    if urlsplit(file_path).scheme in ("http", "https"):
+        return page_fetcher.download_sync(file_path, f, max_bytes=settings.FETCH_MAX_FILE_BYTES)
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as source:
+        while data := source.read(1024 * 1024):
+            digest.update(data)
+            f.write(data)
+    f.flush()
+    return digest.hexdigest()
+
+def iter_file_chunks(file_path):
+    """
+    Yield (page, chunks) for every page of an uploaded PDF or image. Pages
+    are extracted lazily one at a time, and extraction is skipped for files
+    whose bytes were seen before (see app.core.extraction_cache).
+    """
+    extractor = "pdf" if file_path.endswith('.pdf') else "image"
+    suffix = os.path.splitext(urlsplit(file_path).path)[1]
+    with tempfile.NamedTemporaryFile(suffix=suffix) as f:
+        content_hash = download_file(file_path, f)
+        extracted = get_extracted_text(content_hash, extractor)
+        if extracted is not None:
+            for page in extracted.pages:
+                page.metadata["source"] = file_path
+            cached = extracted.page_chunks(SPLITTER_KEY)
+            if cached is not None:
+                print(f"Reusing cached chunks of {file_path}")
+                yield from cached
+                return
+            pages = iter(extracted.pages)
         else:
-            loader = WebBaseLoader(file_path)
-        chunks = split_text_from_loader(loader)
-    elif url:
-        loader = WebBaseLoader(url)
-        chunks = split_text_from_loader(loader)
-    
-    store_embeddings(chunks, embedding_function, metadata)
-    
-def query_vector_db(vegetables):
+            pages = get_loader(file_path=f.name).lazy_load()
+
+        # Only the page texts are kept for the cache, not the chunks
+        split_text = get_text_splitter().split_text
+        texts = []
+        boundaries = []
+        for page_index, page in enumerate(pages):
+            page.metadata["source"] = file_path
+            chunks, page_boundaries = split_page(page_index, page, split_text)
+            texts.append(Document(page_content=page.page_content, metadata=page.metadata))
+            if boundaries is not None and page_boundaries is not None:
+                boundaries.extend(page_boundaries)
+            else:
+                boundaries = None
+            yield page, chunks
+    save_extracted_text(content_hash, extractor, ExtractedText(texts, SPLITTER_KEY, boundaries))
+
+def load_file_chunks(file_path):
+    chunks = [chunk for _, page_chunks in iter_file_chunks(file_path) for chunk in page_chunks]
+    print("Generating " + str(len(chunks)) + " chunks...")
+    return chunks
+
+def store_file_in_vector_db(file_path, embedding_function, metadata, window_pages=None):
+    """
+    Split, embed and write an uploaded file ``window_pages`` pages at a
+    time, so memory stays bounded by the window instead of the file size.
+    Chunks of a previous version of the file are removed once every window
+    has been written.
+    """
+    window_pages = window_pages or settings.INGEST_WINDOW_PAGES
+    record_manager = get_record_manager()
+    written_after = record_manager.get_time()
+    start = time.perf_counter()
+    pages = 0
+    chunks_written = 0
+    window = []
+    for _, chunks in iter_file_chunks(file_path):
+        window.extend(chunks)
+        pages += 1
+        if pages % window_pages == 0:
+            store_embeddings(window, embedding_function, metadata, cleanup=None)
+            chunks_written += len(window)
+            window = []
+            elapsed = time.perf_counter() - start
+            print(f"{file_path}: {pages} pages, {chunks_written} chunks ({pages / elapsed:.1f} pages/sec)")
+    if window:
+        store_embeddings(window, embedding_function, metadata, cleanup=None)
+        chunks_written += len(window)
+
+    group_id = source_group_id(metadata.get('source', file_path), metadata.get('owner_id'))
+    stale = record_manager.list_keys(group_ids=[group_id], before=written_after)
+    if stale:
+        get_vectorstore(embedding_function).delete(stale)
+        record_manager.delete_keys(stale)
+        invalidate_retrievals()
+    elapsed = time.perf_counter() - start
+    print(
+        f"Stored {file_path}: {pages} pages, {chunks_written} chunks, {len(stale)} stale chunks removed "
+        f"in {elapsed:.1f}s ({pages / elapsed if elapsed else 0:.1f} pages/sec)"
+    )
+
+def load_chunks(file_path=None, url=None):
+    web_url = get_web_url(file_path=file_path, url=url)
+    if web_url:
+        return split_documents(html_to_documents(page_fetcher.fetch_sync(web_url)))
+    return load_file_chunks(file_path)
+
+def metadata_hash(metadata):
+    return hashlib.sha256(json.dumps(metadata, sort_keys=True, default=str).encode()).hexdigest()
+
+def process_and_store_in_vector_db(file_path=None, url=None, metadata=None):
+    metadata = metadata or {}
+    try:
+        store_in_vector_db(file_path=file_path, url=url, metadata=metadata)
+    finally:
+        record_source_change(metadata.get('source') or url or file_path, metadata.get('owner_id'))
+
+def store_in_vector_db(file_path=None, url=None, metadata=None):
     embedding_function = get_embedding_function()
-    vectorstore = PGVector(
-        collection_name="plan_to_plate",
-        connection=get_connection_string(),
-        embeddings=embedding_function
-    )    
-    
-    # query_embedding = embedding_function.embed_query(" ".join(vegetables))
-    # print(f"Query Embedding: {query_embedding}")
+    web_url = get_web_url(file_path=file_path, url=url)
+    if not web_url:
+        store_file_in_vector_db(file_path, embedding_function, metadata)
+        return
+
+    # Conditional request: a page whose content and metadata are unchanged
+    # since it was last stored is neither re-downloaded nor re-embedded,
+    # unless its chunks are gone (e.g. a reindex rebuilt the collection
+    # without them).
+    source_id = source_group_id(metadata.get('source', web_url), metadata.get('owner_id'))
+    state = get_fetch_state(source_id)
+    digest = metadata_hash(metadata)
+    fresh = (
+        state is not None
+        and state.metadata_hash == digest
+        and bool(get_record_manager().list_keys(group_ids=[source_id], limit=1))
+    )
+    result = page_fetcher.fetch_sync(
+        web_url,
+        etag=state.etag if fresh else None,
+        last_modified=state.last_modified if fresh else None,
+    )
+    if fresh and (result.not_modified or result.content_hash == state.content_hash):
+        print(f"{web_url} is unchanged, skipping")
+        return
+    store_embeddings(split_documents(html_to_documents(result)), embedding_function, metadata)
+    save_fetch_state(source_id, result, digest)
+
+def normalize_vegetables(vegetables):
+    # Order- and case-insensitive, so the same set always maps to one query
+    return tuple(sorted({vegetable.strip().casefold() for vegetable in vegetables if vegetable.strip()}))
+
+def retrieval_cache_key(vegetables, k, filter, *options):
+    return (vegetables, k, json.dumps(filter, sort_keys=True), *options)
+
+vector_search = VectorSearchService(get_connection_string, get_embedding_function, COLLECTION_NAME)
+
+async def aquery_vector_db(vegetables, k=10, filter=None, ef_search=None, probes=None, grouped=None, mmr=None, hybrid=None, multi_query=None):
+    # With hybrid retrieval (the default) vector and full-text results are
+    # fused with reciprocal rank fusion and MMR is not applied. With
+    # multi-query retrieval each vegetable is searched for separately.
+    grouped = settings.RETRIEVAL_GROUP_BY_RECIPE if grouped is None else grouped
+    mmr = settings.RETRIEVAL_MMR if mmr is None else mmr
+    hybrid = settings.RETRIEVAL_HYBRID if hybrid is None else hybrid
+    multi_query = settings.RETRIEVAL_MULTI_QUERY if multi_query is None else multi_query
+    vegetables = normalize_vegetables(vegetables)
+    multi_query = multi_query and 1 < len(vegetables) <= settings.RETRIEVAL_MULTI_QUERY_MAX_QUERIES
+    generation = await vector_search.collection_generation()
+    cache_key = retrieval_cache_key(vegetables, k, filter, generation, ef_search, probes, grouped, mmr, hybrid, multi_query)
+    cached = retrieval_cache.get(cache_key)
+    if cached is not None:
+        return [dict(recipe) for recipe in cached]
+
+    if multi_query:
+        results = await vector_search.multi_vector_search(
+            list(vegetables),
+            await vector_search.embed_queries(list(vegetables)),
+            n=k,
+            per_query_k=settings.RETRIEVAL_MULTI_QUERY_K,
+            lexical_k=settings.RETRIEVAL_HYBRID_LEXICAL_K if hybrid else 0,
+            rrf_k=settings.RETRIEVAL_RRF_K,
+            grouped=grouped,
+            filter=filter,
+            ef_search=ef_search,
+            probes=probes,
+            concurrency=settings.RETRIEVAL_MULTI_QUERY_CONCURRENCY,
+        )
+        recipes = results_to_recipes(results)
+        retrieval_cache.set(cache_key, recipes)
+        return [dict(recipe) for recipe in recipes]
+
+    query_embedding = await vector_search.embed_query(" ".join(vegetables))
+    if hybrid:
+        results = await vector_search.hybrid_search(
+            list(vegetables),
+            query_embedding,
+            n=k,
+            vector_k=settings.RETRIEVAL_HYBRID_VECTOR_K,
+            lexical_k=settings.RETRIEVAL_HYBRID_LEXICAL_K,
+            rrf_k=settings.RETRIEVAL_RRF_K,
+            grouped=grouped,
+            filter=filter,
+            ef_search=ef_search,
+            probes=probes,
+        )
+    elif grouped:
+        results = await vector_search.search_recipes_by_vector(
+            query_embedding,
+            n=k,
+            overfetch=settings.RETRIEVAL_OVERFETCH,
+            mmr=mmr,
+            lambda_mult=settings.RETRIEVAL_MMR_LAMBDA,
+            filter=filter,
+            ef_search=ef_search,
+            probes=probes,
+        )
+    else:
+        results = await vector_search.search_by_vector_with_score(
+            query_embedding, k=k, filter=filter, ef_search=ef_search, probes=probes
+        )
+    if not hybrid:
+        results = distances_to_scores(results)
+    recipes = results_to_recipes(results)
+    retrieval_cache.set(cache_key, recipes)
+    return [dict(recipe) for recipe in recipes]
 
-    results = vectorstore.similarity_search(" ".join(vegetables), k=10)
-    print(f"Results: {results}")
+def distances_to_scores(results):
+    # cosine distance -> cosine similarity
+    return [(doc, 1 - distance) for doc, distance in results]
 
+def results_to_recipes(results):
+    # results are (document, score) pairs, higher scores first
     recipes = []
-    for result in results:
+    for result, score in results:
         metadata = result.metadata
-        print(f"Metadata: {metadata}")
         recipes.append({
             'title': metadata.get('title'),
-            'url': metadata.get('source') 
+            'url': metadata.get('source'),
+            'score': score,
         })
     
-    return recipes
\ No newline at end of file
+    return recipes
@@ -0,0 +1,329 @@
+import logging
+import math
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from langchain_community.embeddings import FakeEmbeddings
+from langchain_postgres.vectorstores import PGVector
+from sqlalchemy import Connection, Engine, event, text
+
+from app.core.config import settings
+from app.core.embeddings import EMBEDDING_DIMENSIONS
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_TABLE = "langchain_pg_embedding"
+INDEX_TYPES = ("hnsw", "ivfflat")
+# Indexed expression and operator class per storage mode. The table always
+# keeps the full float32 vectors; "halfvec" indexes a float16 copy and
+# "binary" a binary-quantized copy, and searches rerank the candidates from
+# the index by full-precision cosine distance (PGVector's default strategy).
+STORAGE_INDEX_EXPRESSIONS = {
+    "vector": ("embedding", "vector_cosine_ops"),
+    "halfvec": (f"(embedding::halfvec({EMBEDDING_DIMENSIONS}))", "halfvec_cosine_ops"),
+    "binary": (
+        f"(binary_quantize(embedding)::bit({EMBEDDING_DIMENSIONS}))",
+        "bit_hamming_ops",
+    ),
+}
+# Metadata fields filtered with ``cmetadata->>'field' IN (...)``, see
+# app.core.vector_search.metadata_filter. PGVector itself already keeps a
+# jsonb_path_ops GIN index (ix_cmetadata_gin) on the whole column.
+METADATA_INDEX_FIELDS = ("owner_id", "language", "source_type", "source")
+# Full-text search configuration of the document_tsv column used by the
+# lexical leg of hybrid retrieval
+TEXT_SEARCH_CONFIG = "english"
+
+# Upper bound pgvector accepts for hnsw.ef_search
+HNSW_MAX_EF_SEARCH = 1000
+
+_search_params: ContextVar[dict[str, Any] | None] = ContextVar(
+    "vector_search_params", default=None
+)
+
+
+@contextmanager
+def search_params(
+    ef_search: int | None = None, probes: int | None = None, iterative: bool = False
+) -> Iterator[None]:
+    """
+    Override ``hnsw.ef_search`` / ``ivfflat.probes`` for the vector searches
+    run inside the block. Unset values fall back to the settings defaults.
+    ``iterative`` enables ``hnsw.iterative_scan`` for filtered searches.
+    """
+    params: dict[str, Any] = {"iterative": iterative}
+    if ef_search is not None:
+        params["ef_search"] = ef_search
+    if probes is not None:
+        params["probes"] = probes
+    token = _search_params.set(params)
+    try:
+        yield
+    finally:
+        _search_params.reset(token)
+
+
+def candidate_ef_search(ef_search: int | None, candidates: int) -> int:
+    """
+    ``hnsw.ef_search`` for a search that needs ``candidates`` rows from the
+    index: an HNSW scan returns at most ``ef_search`` rows, so a smaller
+    value would silently cut the candidate list short.
+    """
+    return min(
+        max(ef_search or settings.VECTOR_HNSW_EF_SEARCH, candidates), HNSW_MAX_EF_SEARCH
+    )
+
+
+def _supports_iterative_scan(cursor: Any, connection_record: Any) -> bool:
+    # hnsw.iterative_scan exists from pgvector 0.8; checked once per pooled
+    # connection, unless the extension isn't created yet
+    supported = connection_record.info.get("iterative_scan")
+    if supported is None:
+        cursor.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+        row = cursor.fetchone()
+        if row is None:
+            return False
+        major, minor = (int(part) for part in row[0].split(".")[:2])
+        supported = connection_record.info["iterative_scan"] = (major, minor) >= (0, 8)
+    return supported
+
+
+def _apply_search_params(
+    dbapi_connection: Any, connection_record: Any, connection_proxy: Any
+) -> None:
+    params = _search_params.get() or {}
+    ef_search = params.get("ef_search", settings.VECTOR_HNSW_EF_SEARCH)
+    probes = params.get("probes", settings.VECTOR_IVFFLAT_PROBES)
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(
+            "SELECT set_config('hnsw.ef_search', %s, false), set_config('ivfflat.probes', %s, false)",
+            (str(ef_search), str(probes)),
+        )
+        if settings.VECTOR_HNSW_ITERATIVE_SCAN != "off" and _supports_iterative_scan(
+            cursor, connection_record
+        ):
+            iterative = (
+                settings.VECTOR_HNSW_ITERATIVE_SCAN
+                if params.get("iterative")
+                else "off"
+            )
+            cursor.execute(
+                "SELECT set_config('hnsw.iterative_scan', %s, false)", (iterative,)
+            )
+    finally:
+        cursor.close()
+
+
+def install_search_params(engine: Engine) -> None:
+    """
+    Apply the ANN search parameters to every connection checked out of the
+    engine's pool. Only install this on engines used for vector search.
+    """
+    if not event.contains(engine, "checkout", _apply_search_params):
+        event.listen(engine, "checkout", _apply_search_params)
+
+
+def index_name(index_type: str, storage: str) -> str:
+    name = f"ix_langchain_pg_embedding_{index_type}"
+    return name if storage == "vector" else f"{name}_{storage}"
+
+
+ALL_INDEX_NAMES = tuple(
+    index_name(index_type, storage)
+    for index_type in INDEX_TYPES
+    for storage in STORAGE_INDEX_EXPRESSIONS
+)
+
+
+def _table_exists(conn: Connection) -> bool:
+    return (
+        conn.execute(
+            text("SELECT to_regclass(:name)"), {"name": EMBEDDING_TABLE}
+        ).scalar()
+        is not None
+    )
+
+
+def _index_exists(conn: Connection, name: str) -> bool:
+    return (
+        conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar()
+        is not None
+    )
+
+
+def _drop_invalid_index(conn: Connection, name: str) -> None:
+    # A failed or interrupted CREATE INDEX CONCURRENTLY leaves an invalid
+    # index behind that IF NOT EXISTS would take for a finished one
+    valid = conn.execute(
+        text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"),
+        {"name": name},
+    ).scalar()
+    if valid is False:
+        logger.warning(f"Dropping invalid index {name}")
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+
+def _pin_dimensions(conn: Connection) -> None:
+    # ANN indexes need a fixed dimension; tables created by older PGVector
+    # calls have an unconstrained ``vector`` column.
+    typmod = conn.execute(
+        text(
+            "SELECT atttypmod FROM pg_attribute "
+            "WHERE attrelid = CAST(:table AS regclass) AND attname = 'embedding'"
+        ),
+        {"table": EMBEDDING_TABLE},
+    ).scalar()
+    if typmod is not None and typmod < 0:
+        logger.info(
+            f"Pinning {EMBEDDING_TABLE}.embedding to vector({EMBEDDING_DIMENSIONS})"
+        )
+        conn.execute(
+            text(
+                f"ALTER TABLE {EMBEDDING_TABLE} "
+                f"ALTER COLUMN embedding TYPE vector({EMBEDDING_DIMENSIONS})"
+            )
+        )
+
+
+def _ensure_metadata_indexes(conn: Connection) -> None:
+    for field in METADATA_INDEX_FIELDS:
+        _drop_invalid_index(conn, f"ix_langchain_pg_embedding_{field}")
+        conn.execute(
+            text(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_langchain_pg_embedding_{field} "
+                f"ON {EMBEDDING_TABLE} ((cmetadata->>'{field}'))"
+            )
+        )
+
+
+def _ensure_lexical_index(conn: Connection) -> None:
+    # Adding a stored generated column rewrites the table once; after that
+    # Postgres keeps it up to date on every insert.
+    conn.execute(
+        text(
+            f"ALTER TABLE {EMBEDDING_TABLE} ADD COLUMN IF NOT EXISTS document_tsv tsvector "
+            f"GENERATED ALWAYS AS (to_tsvector('{TEXT_SEARCH_CONFIG}', "
+            f"coalesce(cmetadata->>'title', '') || ' ' || coalesce(document, ''))) STORED"
+        )
+    )
+    _drop_invalid_index(conn, "ix_langchain_pg_embedding_document_tsv")
+    conn.execute(
+        text(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_langchain_pg_embedding_document_tsv "
+            f"ON {EMBEDDING_TABLE} USING gin (document_tsv)"
+        )
+    )
+
+
+def _ivfflat_lists(conn: Connection) -> int:
+    if settings.VECTOR_IVFFLAT_LISTS:
+        return settings.VECTOR_IVFFLAT_LISTS
+    rows = conn.execute(text(f"SELECT count(*) FROM {EMBEDDING_TABLE}")).scalar() or 0
+    if rows > 1_000_000:
+        return int(math.sqrt(rows))
+    return max(1, rows // 1000)
+
+
+def _create_index_sql(
+    conn: Connection, index_type: str, storage: str, name: str, concurrently: bool
+) -> str:
+    expression, operator_class = STORAGE_INDEX_EXPRESSIONS[storage]
+    if index_type == "hnsw":
+        options = (
+            f"m = {settings.VECTOR_HNSW_M}, "
+            f"ef_construction = {settings.VECTOR_HNSW_EF_CONSTRUCTION}"
+        )
+    else:
+        options = f"lists = {_ivfflat_lists(conn)}"
+    return (
+        f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {name} "
+        f"ON {EMBEDDING_TABLE} USING {index_type} ({expression} {operator_class}) "
+        f"WITH ({options})"
+    )
+
+
+def _autocommit(engine: Engine) -> Connection:
+    conn = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+    conn.execute(
+        text("SELECT set_config('maintenance_work_mem', :value, false)"),
+        {"value": settings.VECTOR_INDEX_MAINTENANCE_WORK_MEM},
+    )
+    return conn
+
+
+def ensure_vector_index(engine: Engine, collection_name: str) -> str | None:
+    """
+    Create the vector tables, the metadata filter and full-text indexes and
+    the configured ANN index if they are missing. Safe to run on every
+    deploy.
+    """
+    # Creates the extension, tables and collection if they don't exist yet
+    PGVector(
+        embeddings=FakeEmbeddings(size=EMBEDDING_DIMENSIONS),
+        connection=engine,
+        collection_name=collection_name,
+        embedding_length=EMBEDDING_DIMENSIONS,
+    )
+    index_type = settings.VECTOR_INDEX_TYPE
+    storage = settings.VECTOR_STORAGE
+    with _autocommit(engine) as conn:
+        if not _table_exists(conn):
+            return None
+        _ensure_metadata_indexes(conn)
+        _ensure_lexical_index(conn)
+        if index_type == "none":
+            return None
+        name = index_name(index_type, storage)
+        _pin_dimensions(conn)
+        _drop_invalid_index(conn, name)
+        if _index_exists(conn, name):
+            return name
+        # Switching index type or storage mode: build the new index next to
+        # the old one, then drop the old one.
+        logger.info(f"Building {index_type} index {name} on {EMBEDDING_TABLE}")
+        conn.execute(
+            text(_create_index_sql(conn, index_type, storage, name, concurrently=True))
+        )
+        for other_name in ALL_INDEX_NAMES:
+            if other_name != name:
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {other_name}"))
+    return name
+
+
+def rebuild_vector_index(engine: Engine, collection_name: str) -> str | None:
+    """
+    Rebuild the ANN index after a bulk load without blocking searches: a
+    new index is built concurrently next to the old one and swapped in, and
+    the old one is only dropped once the new one has its name. IVFFlat
+    lists are recomputed from the current row count.
+    """
+    index_type = settings.VECTOR_INDEX_TYPE
+    storage = settings.VECTOR_STORAGE
+    if index_type == "none":
+        return None
+    name = index_name(index_type, storage)
+    with _autocommit(engine) as conn:
+        _drop_invalid_index(conn, name)
+        if not _index_exists(conn, name):
+            return ensure_vector_index(engine, collection_name)
+        new_name = f"{name}_new"
+        old_name = f"{name}_old"
+        logger.info(f"Rebuilding {index_type} index {name} on {EMBEDDING_TABLE}")
+        # Leftovers of an interrupted rebuild
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {new_name}"))
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {old_name}"))
+        conn.execute(
+            text(
+                _create_index_sql(
+                    conn, index_type, storage, new_name, concurrently=True
+                )
+            )
+        )
+        conn.execute(text(f"ALTER INDEX {name} RENAME TO {old_name}"))
+        conn.execute(text(f"ALTER INDEX {new_name} RENAME TO {name}"))
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {old_name}"))
+        conn.execute(text(f"ANALYZE {EMBEDDING_TABLE}"))
+    return name
@@ -0,0 +1,538 @@
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, TypeVar
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_postgres.vectorstores import PGVector
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.core.config import settings
+from app.core.embeddings import EMBEDDING_DIMENSIONS
+from app.core.vector_index import (
+    EMBEDDING_TABLE,
+    TEXT_SEARCH_CONFIG,
+    candidate_ef_search,
+    install_search_params,
+    search_params,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def metadata_filter(
+    owner_id: int | None = None,
+    language: str | None = None,
+    source_type: str | None = None,
+) -> dict[str, Any] | None:
+    """
+    Build a PGVector metadata filter. Fields are matched with ``$in``, which
+    PGVector compiles to ``cmetadata->>'field' IN (...)`` so the expression
+    indexes created by app.core.vector_index can serve it.
+    """
+    fields = {"owner_id": owner_id, "language": language, "source_type": source_type}
+    filter = {
+        field: {"$in": [value]} for field, value in fields.items() if value is not None
+    }
+    return filter or None
+
+
+def group_by_source(
+    docs_and_scores: list[tuple[Document, float]], n: int
+) -> list[tuple[Document, float]]:
+    """
+    Collapse chunk results to one entry per ``source`` (recipe), keeping
+    each recipe's closest chunk, and return the ``n`` closest recipes.
+    """
+    best: dict[Any, tuple[Document, float]] = {}
+    for doc, distance in docs_and_scores:
+        source = doc.metadata.get("source")
+        key = source if source is not None else id(doc)
+        if key not in best or distance < best[key][1]:
+            best[key] = (doc, distance)
+    return sorted(best.values(), key=lambda item: item[1])[:n]
+
+
+def chunk_key(doc: Document) -> Hashable:
+    return (doc.metadata.get("source"), doc.page_content)
+
+
+def source_key(doc: Document) -> Hashable:
+    source = doc.metadata.get("source")
+    return source if source is not None else chunk_key(doc)
+
+
+def reciprocal_rank_fusion(
+    rankings: list[list[T]], key: Callable[[T], Hashable], k: int = 60
+) -> list[tuple[T, float]]:
+    """
+    Fuse ranked lists with reciprocal rank fusion: every item scores
+    ``sum(1 / (k + rank))`` over the lists it appears in. Items are matched
+    by ``key`` and only their first occurrence in each list counts.
+    """
+    scores: dict[Hashable, float] = {}
+    items: dict[Hashable, T] = {}
+    for ranking in rankings:
+        seen = set()
+        for item in ranking:
+            item_key = key(item)
+            if item_key in seen:
+                continue
+            seen.add(item_key)
+            scores[item_key] = scores.get(item_key, 0.0) + 1.0 / (k + len(seen))
+            items.setdefault(item_key, item)
+    return sorted(
+        ((items[item_key], score) for item_key, score in scores.items()),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+
+
+def coverage_fusion(
+    rankings: list[list[T]],
+    key: Callable[[T], Hashable],
+    n: int,
+    k: int = 60,
+    covered: int | None = None,
+) -> list[tuple[T, float]]:
+    """
+    Reciprocal rank fusion that keeps the top item of each of the first
+    ``covered`` rankings (all by default) among the ``n`` results, so
+    every query contributes at least one hit. The remaining slots go to
+    the best fused items; results are ordered by fused score.
+    """
+    fused = reciprocal_rank_fusion(rankings, key=key, k=k)
+    picked: dict[Hashable, tuple[T, float]] = {}
+    scores = {key(item): score for item, score in fused}
+    for ranking in rankings[:covered]:
+        if len(picked) >= n:
+            break
+        if ranking:
+            top = key(ranking[0])
+            picked.setdefault(top, (ranking[0], scores[top]))
+    for item, score in fused:
+        if len(picked) >= n:
+            break
+        picked.setdefault(key(item), (item, score))
+    return sorted(picked.values(), key=lambda item: item[1], reverse=True)
+
+
+def _filter_sql(filter: dict[str, Any] | None, params: dict[str, Any]) -> str:
+    clauses = []
+    for field, condition in (filter or {}).items():
+        # Only the $in filters produced by metadata_filter are supported here
+        if not field.isidentifier() or set(condition) != {"$in"}:
+            raise ValueError(f"Unsupported filter on {field}: {condition}")
+        params[f"filter_{field}"] = [str(value) for value in condition["$in"]]
+        clauses.append(f"AND e.cmetadata->>'{field}' = ANY(:filter_{field})")
+    return " ".join(clauses)
+
+
+def _lexical_query(
+    terms: list[str], k: int, filter: dict[str, Any] | None
+) -> tuple[str, dict[str, Any]]:
+    params: dict[str, Any] = {"k": k}
+    tsqueries = []
+    for i, term in enumerate(terms):
+        params[f"term_{i}"] = term
+        tsqueries.append(f"plainto_tsquery('{TEXT_SEARCH_CONFIG}', :term_{i})")
+    sql = f"""
+        SELECT e.document, e.cmetadata, ts_rank_cd(e.document_tsv, query.q) AS rank
+        FROM {EMBEDDING_TABLE} AS e
+        JOIN langchain_pg_collection AS c ON c.uuid = e.collection_id
+        CROSS JOIN (SELECT {" || ".join(tsqueries)} AS q) AS query
+        WHERE c.name = :collection AND e.document_tsv @@ query.q
+        {_filter_sql(filter, params)}
+        ORDER BY rank DESC
+        LIMIT :k
+    """
+    return sql, params
+
+
+# Candidate ordering per storage mode; must match the indexed expressions
+# in app.core.vector_index.STORAGE_INDEX_EXPRESSIONS to use the index.
+_CANDIDATE_ORDER = {
+    "vector": "e.embedding <=> CAST(:embedding AS vector)",
+    "halfvec": (
+        f"CAST(e.embedding AS halfvec({EMBEDDING_DIMENSIONS})) "
+        f"<=> CAST(:embedding AS halfvec({EMBEDDING_DIMENSIONS}))"
+    ),
+    "binary": (
+        f"CAST(binary_quantize(e.embedding) AS bit({EMBEDDING_DIMENSIONS})) "
+        f"<~> binary_quantize(CAST(:embedding AS vector))"
+    ),
+}
+
+
+def vector_query(
+    storage: str,
+    embedding: list[float],
+    k: int,
+    rerank_factor: int,
+    filter: dict[str, Any] | None = None,
+    exact: bool = False,
+) -> tuple[str, dict[str, Any]]:
+    """
+    Similarity search SQL for a storage mode. Quantized modes take
+    ``k * rerank_factor`` candidates from the quantized index and rerank
+    them by full-precision cosine distance. ``exact`` scores every row
+    matching the filter instead of using the ANN index.
+    """
+    candidates = k if storage == "vector" or exact else k * rerank_factor
+    params: dict[str, Any] = {
+        "embedding": "[" + ",".join(str(value) for value in embedding) + "]",
+        "k": k,
+        "candidates": candidates,
+    }
+    if exact:
+        # OFFSET 0 keeps the ORDER BY out of the subquery, so the planner
+        # can't use the ANN index and scans the filtered rows instead
+        sql = f"""
+            SELECT document, cmetadata, distance
+            FROM (
+                SELECT e.document, e.cmetadata, e.embedding <=> CAST(:embedding AS vector) AS distance
+                FROM {EMBEDDING_TABLE} AS e
+                JOIN langchain_pg_collection AS c ON c.uuid = e.collection_id
+                WHERE c.name = :collection
+                {_filter_sql(filter, params)}
+                OFFSET 0
+            ) AS scored
+            ORDER BY distance
+            LIMIT :k
+        """
+        return sql, params
+    sql = f"""
+        SELECT document, cmetadata, embedding <=> CAST(:embedding AS vector) AS distance
+        FROM (
+            SELECT e.document, e.cmetadata, e.embedding
+            FROM {EMBEDDING_TABLE} AS e
+            JOIN langchain_pg_collection AS c ON c.uuid = e.collection_id
+            WHERE c.name = :collection
+            {_filter_sql(filter, params)}
+            ORDER BY {_CANDIDATE_ORDER[storage]}
+            LIMIT :candidates
+        ) AS candidates
+        ORDER BY distance
+        LIMIT :k
+    """
+    return sql, params
+
+
+def rows_to_docs_and_scores(rows: Any) -> list[tuple[Document, float]]:
+    return [
+        (Document(page_content=row.document, metadata=row.cmetadata), row.distance)
+        for row in rows
+    ]
+
+
+class VectorSearchService:
+    """
+    Async similarity search over one PGVector collection.
+
+    Holds a single long-lived async engine with a bounded connection pool
+    and one PGVector instance per worker process, so concurrent requests
+    share connections instead of opening new ones. Query embedding runs in
+    a worker thread to keep the event loop free.
+    """
+
+    def __init__(
+        self,
+        connection_string: Callable[[], str],
+        embedding_function: Callable[[], Embeddings],
+        collection_name: str,
+    ) -> None:
+        self._connection_string = connection_string
+        self._embedding_function = embedding_function
+        self.collection_name = collection_name
+        self._engine: AsyncEngine | None = None
+        self._vectorstore: PGVector | None = None
+        self._generation: str | None = None
+        self._generation_checked_at: float | None = None
+
+    @property
+    def engine(self) -> AsyncEngine:
+        if self._engine is None:
+            self._engine = create_async_engine(
+                self._connection_string(),
+                pool_size=settings.VECTOR_SEARCH_POOL_SIZE,
+                max_overflow=settings.VECTOR_SEARCH_MAX_OVERFLOW,
+                pool_timeout=settings.VECTOR_SEARCH_POOL_TIMEOUT,
+                pool_recycle=settings.VECTOR_SEARCH_POOL_RECYCLE,
+                pool_pre_ping=True,
+            )
+            install_search_params(self._engine.sync_engine)
+        return self._engine
+
+    @property
+    def vectorstore(self) -> PGVector:
+        if self._vectorstore is None:
+            self._vectorstore = PGVector(
+                embeddings=self._embedding_function(),
+                connection=self.engine,
+                collection_name=self.collection_name,
+                embedding_length=EMBEDDING_DIMENSIONS,
+            )
+        return self._vectorstore
+
+    async def embed_query(self, query: str) -> list[float]:
+        return await asyncio.to_thread(self.vectorstore.embeddings.embed_query, query)
+
+    async def embed_queries(self, queries: list[str]) -> list[list[float]]:
+        # One encoder call for all queries, see CachedEmbeddings.embed_queries
+        return await asyncio.to_thread(
+            self.vectorstore.embeddings.embed_queries, queries
+        )
+
+    async def _execute(self, sql: str, params: dict[str, Any]) -> list[Any]:
+        params["collection"] = self.collection_name
+        async with self.engine.connect() as conn:
+            return (await conn.execute(text(sql), params)).all()
+
+    async def collection_generation(self) -> str | None:
+        """
+        The uuid of the collection, which changes when a reindex swaps a new
+        collection in (app.core.reindex), and its write generation, which
+        every write bumps (app.core.vector_db_services.invalidate_retrievals).
+        Results cached under an older value are stale in every worker.
+        Looked up at most every ``RETRIEVAL_CACHE_GENERATION_TTL`` seconds.
+        """
+        now = time.monotonic()
+        checked_at = self._generation_checked_at
+        if (
+            checked_at is None
+            or now - checked_at >= settings.RETRIEVAL_CACHE_GENERATION_TTL
+        ):
+            rows = await self._execute(
+                """
+                SELECT CAST(c.uuid AS text), coalesce(g.generation, 0)
+                FROM langchain_pg_collection AS c
+                LEFT JOIN vector_write_generation AS g ON g.collection_name = c.name
+                WHERE c.name = :collection
+                """,
+                {},
+            )
+            self._generation = f"{rows[0][0]}:{rows[0][1]}" if rows else None
+            self._generation_checked_at = now
+        return self._generation
+
+    async def search_by_vector_with_score(
+        self,
+        embedding: list[float],
+        k: int = 10,
+        filter: dict[str, Any] | None = None,
+        ef_search: int | None = None,
+        probes: int | None = None,
+    ) -> list[tuple[Document, float]]:
+        """
+        With a filter, the HNSW scan only sees ``ef_search`` candidates
+        before the filter is applied (more with iterative scans), which can
+        leave a user owning few rows with few or no results. Filtered
+        searches that come back short are repeated as an exact scan over
+        the matching rows.
+        """
+        if settings.VECTOR_STORAGE == "vector" and filter is None:
+            with search_params(
+                ef_search=candidate_ef_search(ef_search, k), probes=probes
+            ):
+                return await self.vectorstore.asimilarity_search_with_score_by_vector(
+                    embedding, k=k, filter=filter
+                )
+        storage = settings.VECTOR_STORAGE
+        sql, params = vector_query(
+            storage, embedding, k, settings.VECTOR_RERANK_FACTOR, filter
+        )
+        ef_search = candidate_ef_search(ef_search, params["candidates"])
+        with search_params(
+            ef_search=ef_search, probes=probes, iterative=filter is not None
+        ):
+            rows = await self._execute(sql, params)
+        if filter is not None and len(rows) < k:
+            sql, params = vector_query(
+                storage, embedding, k, settings.VECTOR_RERANK_FACTOR, filter, exact=True
+            )
+            rows = await self._execute(sql, params)
+        return rows_to_docs_and_scores(rows)
+
+    async def search_recipes_by_vector(
+        self,
+        embedding: list[float],
+        n: int = 10,
+        overfetch: int = 4,
+        mmr: bool = False,
+        lambda_mult: float = 0.5,
+        filter: dict[str, Any] | None = None,
+        ef_search: int | None = None,
+        probes: int | None = None,
+    ) -> list[tuple[Document, float]]:
+        """
+        Return the ``n`` best distinct recipes. ``n * overfetch`` chunks are
+        fetched so that recipes split into many chunks don't crowd out the
+        rest; with ``mmr`` the chunks are first thinned out by maximal
+        marginal relevance, which drops near-duplicate chunks.
+        """
+        fetch_k = n * overfetch
+        if settings.VECTOR_STORAGE != "vector" or not mmr:
+            # MMR needs the chunk vectors, which the quantized path doesn't
+            # load, so it only applies to full-precision storage
+            results = await self.search_by_vector_with_score(
+                embedding, k=fetch_k, filter=filter, ef_search=ef_search, probes=probes
+            )
+            return group_by_source(results, n)
+        k = min(fetch_k, n * 2)
+        ef_search = candidate_ef_search(ef_search, fetch_k)
+        with search_params(
+            ef_search=ef_search, probes=probes, iterative=filter is not None
+        ):
+            results = await self.vectorstore.amax_marginal_relevance_search_with_score_by_vector(
+                embedding,
+                k=k,
+                fetch_k=fetch_k,
+                lambda_mult=lambda_mult,
+                filter=filter,
+            )
+        if filter is not None and len(results) < k:
+            # Too few rows passed the filter in the ANN scan, see
+            # search_by_vector_with_score
+            results = await self.search_by_vector_with_score(
+                embedding, k=fetch_k, filter=filter
+            )
+        return group_by_source(results, n)
+
+    async def lexical_search(
+        self,
+        terms: list[str],
+        k: int = 40,
+        filter: dict[str, Any] | None = None,
+    ) -> list[tuple[Document, float]]:
+        """
+        Full-text search over chunk text and titles using the ``document_tsv``
+        GIN index, matching any of ``terms``.
+        """
+        if not terms:
+            return []
+        sql, params = _lexical_query(terms, k, filter)
+        rows = await self._execute(sql, params)
+        return [
+            (Document(page_content=row.document, metadata=row.cmetadata), row.rank)
+            for row in rows
+        ]
+
+    async def _lexical_or_empty(
+        self, terms: list[str], k: int, filter: dict[str, Any] | None
+    ) -> list[tuple[Document, float]]:
+        try:
+            return await self.lexical_search(terms, k=k, filter=filter)
+        except Exception as e:
+            # e.g. the document_tsv column hasn't been created yet
+            logger.warning(f"Lexical search failed, using vector results only: {e}")
+            return []
+
+    async def hybrid_search(
+        self,
+        terms: list[str],
+        embedding: list[float],
+        n: int = 10,
+        vector_k: int = 40,
+        lexical_k: int = 40,
+        rrf_k: int = 60,
+        grouped: bool = True,
+        filter: dict[str, Any] | None = None,
+        ef_search: int | None = None,
+        probes: int | None = None,
+    ) -> list[tuple[Document, float]]:
+        """
+        Run the vector and lexical searches concurrently and fuse them with
+        reciprocal rank fusion. With ``grouped`` the fusion happens per
+        recipe (``source``), otherwise per chunk. Scores are RRF scores.
+        """
+        vector_results, lexical_results = await asyncio.gather(
+            self.search_by_vector_with_score(
+                embedding, k=vector_k, filter=filter, ef_search=ef_search, probes=probes
+            ),
+            self._lexical_or_empty(terms, lexical_k, filter),
+        )
+        fused = reciprocal_rank_fusion(
+            [[doc for doc, _ in vector_results], [doc for doc, _ in lexical_results]],
+            key=source_key if grouped else chunk_key,
+            k=rrf_k,
+        )
+        return fused[:n]
+
+    async def multi_vector_search(
+        self,
+        terms: list[str],
+        embeddings: list[list[float]],
+        n: int = 10,
+        per_query_k: int = 20,
+        lexical_k: int = 0,
+        rrf_k: int = 60,
+        grouped: bool = True,
+        filter: dict[str, Any] | None = None,
+        ef_search: int | None = None,
+        probes: int | None = None,
+        concurrency: int = 4,
+    ) -> list[tuple[Document, float]]:
+        """
+        Run one vector search per embedding (plus the lexical search over
+        ``terms`` if ``lexical_k``), at most ``concurrency`` at a time so one
+        request can't take the whole connection pool, and fuse them with
+        coverage_fusion, so each query's best hit is kept. Scores are RRF
+        scores.
+        """
+        slots = asyncio.Semaphore(concurrency)
+
+        async def bounded(
+            search: Awaitable[list[tuple[Document, float]]],
+        ) -> list[tuple[Document, float]]:
+            async with slots:
+                return await search
+
+        searches = [
+            self.search_by_vector_with_score(
+                embedding,
+                k=per_query_k,
+                filter=filter,
+                ef_search=ef_search,
+                probes=probes,
+            )
+            for embedding in embeddings
+        ]
+        if lexical_k:
+            searches.append(self._lexical_or_empty(terms, lexical_k, filter))
+        results = await asyncio.gather(*(bounded(search) for search in searches))
+        return coverage_fusion(
+            [[doc for doc, _ in result] for result in results],
+            key=source_key if grouped else chunk_key,
+            n=n,
+            k=rrf_k,
+            covered=len(embeddings),
+        )
+
+    async def search_with_score(
+        self,
+        query: str,
+        k: int = 10,
+        filter: dict[str, Any] | None = None,
+        ef_search: int | None = None,
+        probes: int | None = None,
+    ) -> list[tuple[Document, float]]:
+        embedding = await self.embed_query(query)
+        return await self.search_by_vector_with_score(
+            embedding, k=k, filter=filter, ef_search=ef_search, probes=probes
+        )
+
+    async def search(self, query: str, k: int = 10, **kwargs: Any) -> list[Document]:
+        return [doc for doc, _ in await self.search_with_score(query, k=k, **kwargs)]
+
+    async def close(self) -> None:
+        if self._engine is not None:
+            await self._engine.dispose()
+        self._engine = None
+        self._vectorstore = None
+        self._generation = None
+        self._generation_checked_at = None
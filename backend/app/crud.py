@@ -87,6 +87,18 @@ def update_recipe(db: Session, db_recipe: Recipe, recipe_in: RecipeUpdate) -> Re
     db.refresh(db_recipe)
     return db_recipe
 
+def recipe_source(db_recipe: Recipe) -> Optional[str]:
+    # Same precedence as the "source" metadata of its vector store chunks
+    return db_recipe.url or db_recipe.file_path
+
+def source_stored_by_other_recipe(db: Session, db_recipe: Recipe, source: str) -> bool:
+    return db.query(Recipe).filter(
+        Recipe.owner_id == db_recipe.owner_id,
+        Recipe.id != db_recipe.id,
+        Recipe.store_in_vector_db == True,  # noqa: E712
+        (Recipe.url == source) | ((Recipe.url == None) & (Recipe.file_path == source)),  # noqa: E711
+    ).first() is not None
+
 def delete_recipe(db: Session, db_recipe: Recipe) -> None:
     if db_recipe.file_path:
         delete_file_from_b2(db_recipe.file_path)
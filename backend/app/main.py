@@ -1,17 +1,41 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
+from app.core.chat_history import chat_history_store, sweep_periodically
 from app.core.config import settings
+from app.core.fetching import page_fetcher
+from app.core.llm import llm_registry
+from app.core.vector_db_services import preload_models, vector_search
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
     return f"{route.tags[0]}-{route.name}"
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.PRELOAD_MODELS:
+        await run_in_threadpool(preload_models)
+    llm_registry.build_all()
+    sweeper = asyncio.create_task(
+        sweep_periodically(chat_history_store, settings.CHAT_HISTORY_SWEEP_INTERVAL)
+    )
+    yield
+    sweeper.cancel()
+    await llm_registry.aclose()
+    await vector_search.close()
+    await page_fetcher.close()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
+    lifespan=lifespan,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
 )
@@ -0,0 +1,33 @@
+import argparse
+import logging
+
+from sqlalchemy import create_engine
+
+from app.core.vector_db_services import COLLECTION_NAME, get_connection_string
+from app.core.vector_index import ensure_vector_index, rebuild_vector_index
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage the pgvector ANN index")
+    parser.add_argument(
+        "command",
+        choices=["ensure", "rebuild"],
+        help="ensure: create the index if missing; rebuild: rebuild it after a bulk load",
+    )
+    args = parser.parse_args()
+
+    engine = create_engine(get_connection_string())
+    if args.command == "ensure":
+        logger.info("Ensuring vector index")
+        name = ensure_vector_index(engine, COLLECTION_NAME)
+    else:
+        logger.info("Rebuilding vector index")
+        name = rebuild_vector_index(engine, COLLECTION_NAME)
+    logger.info(f"Vector index ready: {name}")
+
+
+if __name__ == "__main__":
+    main()
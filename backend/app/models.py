@@ -1,3 +1,5 @@
+from sqlalchemy import Column, LargeBinary
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlmodel import Field, Relationship, SQLModel
 from typing import List, Optional
 from datetime import datetime, timezone
@@ -177,3 +179,83 @@ class RecipesOut(CamelModel):
     data: list[RecipeOut]
     count: int
 
+
+# Persistent tier of the embedding cache, see app.core.embedding_cache
+class EmbeddingCacheEntry(SQLModel, table=True):
+    __tablename__ = "embedding_cache"
+    model_name: str = Field(primary_key=True)
+    text_hash: str = Field(primary_key=True, max_length=64)
+    embedding: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+# Progress of a vector collection reindex, see app.core.reindex
+class VectorReindexRun(SQLModel, table=True):
+    __tablename__ = "vector_reindex_run"
+    target_collection: str = Field(primary_key=True)
+    run_id: str = Field(max_length=32)
+    last_recipe_id: int = 0
+    documents: int = 0
+    chunks: int = 0
+    failed: int = 0
+    swapped: bool = False
+    started_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    completed_at: Optional[datetime] = None
+
+
+# Bumped on every write to a vector collection, so that other workers
+# notice their cached retrievals are stale, see app.core.vector_search
+class VectorWriteGeneration(SQLModel, table=True):
+    __tablename__ = "vector_write_generation"
+    collection_name: str = Field(primary_key=True)
+    generation: int = 0
+
+
+# Sources written to the live collection by the API, replayed into a
+# shadow collection before it is swapped in, see app.core.reindex
+class VectorSourceChange(SQLModel, table=True):
+    __tablename__ = "vector_source_change"
+    id: int | None = Field(default=None, primary_key=True)
+    owner_id: Optional[int] = None
+    source: str
+    changed_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+# HTTP validators of the last stored version of a recipe page, keyed by the
+# chunk cleanup group (owner_id:source), see app.core.fetching
+class SourceFetchState(SQLModel, table=True):
+    __tablename__ = "source_fetch_state"
+    source_id: str = Field(primary_key=True)
+    url: str = ""
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: str = Field(default="", max_length=64)
+    metadata_hash: str = Field(default="", max_length=64)
+    fetched_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+# Text extracted from an uploaded PDF or image, keyed by the SHA-256 of the
+# file bytes, see app.core.extraction_cache
+class ExtractedTextCacheEntry(SQLModel, table=True):
+    __tablename__ = "extracted_text_cache"
+    content_hash: str = Field(primary_key=True, max_length=64)
+    extractor: str = Field(primary_key=True)
+    pages: list = Field(sa_column=Column(JSONB, nullable=False))
+    splitter: Optional[str] = None
+    chunk_boundaries: Optional[list] = Field(default=None, sa_column=Column(JSONB, nullable=True))
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+# Messages of a chat session as compact [type, content] pairs, see
+# app.core.chat_history
+class ChatSessionHistory(SQLModel, table=True):
+    __tablename__ = "chat_session_history"
+    session_id: str = Field(primary_key=True, max_length=255)
+    messages: list = Field(sa_column=Column(JSONB, nullable=False))
+    # Rolling summary of the messages folded out of ``messages``
+    summary: Optional[str] = None
+    # Number of the first message in ``messages``, counting every message
+    # the session ever had
+    first_message: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), index=True)
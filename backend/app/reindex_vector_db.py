@@ -0,0 +1,69 @@
+import argparse
+import logging
+import sys
+
+from app.core.db import engine
+from app.core.reindex import reindex_collection
+from app.core.vector_db_services import COLLECTION_NAME, get_search_engine
+from app.core.vector_index import rebuild_vector_index
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=f"Rebuild the {COLLECTION_NAME} vector collection from the recipe table. "
+        "An interrupted run resumes where it stopped."
+    )
+    parser.add_argument(
+        "--in-place",
+        action="store_true",
+        help="re-ingest into the live collection instead of building a shadow collection and swapping it in",
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="discard the progress of an interrupted run",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="swap the shadow collection in even if some recipes failed to ingest",
+    )
+    parser.add_argument(
+        "--fetch-workers",
+        type=int,
+        default=8,
+        help="recipes fetched and split concurrently",
+    )
+    parser.add_argument("--encoder-processes", type=int, default=None)
+    parser.add_argument(
+        "--batch-size", type=int, default=500, help="recipe rows fetched per round trip"
+    )
+    parser.add_argument(
+        "--rebuild-index", action="store_true", help="rebuild the ANN index afterwards"
+    )
+    args = parser.parse_args()
+
+    logger.info(f"Reindexing {COLLECTION_NAME}")
+    try:
+        reindex_collection(
+            engine,
+            shadow=not args.in_place,
+            restart=args.restart,
+            force=args.force,
+            batch_size=args.batch_size,
+            fetch_workers=args.fetch_workers,
+            encoder_processes=args.encoder_processes,
+        )
+    except RuntimeError as e:
+        logger.error(e)
+        sys.exit(1)
+    if args.rebuild_index:
+        logger.info("Rebuilding vector index")
+        rebuild_vector_index(get_search_engine(), COLLECTION_NAME)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableLambda
+
+from app.core.chat_compaction import (
+    compact_messages,
+    estimate_tokens,
+    summarize_history,
+    window_start,
+)
+from app.core.chat_history import InMemoryChatMessageHistory
+
+
+def conversation(turns: int, length: int = 40) -> list:
+    messages = []
+    for i in range(turns):
+        messages.append(HumanMessage(content=f"question {i} ".ljust(length, "?")))
+        messages.append(AIMessage(content=f"answer {i} ".ljust(length, ".")))
+    return messages
+
+
+def test_window_keeps_the_last_turns() -> None:
+    messages = conversation(10)
+
+    assert window_start(messages, max_turns=3, token_budget=10_000) == 14
+    assert window_start(conversation(2), max_turns=3, token_budget=10_000) == 0
+
+
+def test_window_respects_the_token_budget_and_turn_boundaries() -> None:
+    messages = conversation(10)
+    per_message = estimate_tokens(messages[0].content)
+
+    # Room for three messages; the window must not start with an answer
+    start = window_start(messages, max_turns=10, token_budget=per_message * 3)
+
+    assert start == 18
+    assert isinstance(messages[start], HumanMessage)
+
+
+def test_prompt_size_stays_constant() -> None:
+    sizes = []
+    for turns in (10, 100, 1000):
+        compacted = compact_messages(
+            "User is vegetarian.", conversation(turns), max_turns=4, token_budget=10_000
+        )
+        assert isinstance(compacted[0], SystemMessage)
+        sizes.append(sum(estimate_tokens(message.content) for message in compacted))
+
+    assert len(set(sizes)) == 1
+
+
+def test_summarize_history_folds_old_turns() -> None:
+    history = InMemoryChatMessageHistory(max_messages=100)
+    history.add_messages(conversation(5))
+    seen = {}
+
+    def summarize(inputs: dict) -> str:
+        seen.update(inputs)
+        return "User asked questions 0 to 2."
+
+    folded = asyncio.run(
+        summarize_history(
+            history, RunnableLambda(summarize), max_turns=2, token_budget=10_000
+        )
+    )
+
+    summary, messages, _ = history.snapshot()
+    assert folded
+    assert summary == "User asked questions 0 to 2."
+    assert [message.content.split()[1] for message in messages] == ["3", "3", "4", "4"]
+    assert (
+        "question 2" in seen["conversation"]
+        and "question 3" not in seen["conversation"]
+    )
+    # Nothing left to fold
+    assert not asyncio.run(
+        summarize_history(
+            history, RunnableLambda(summarize), max_turns=2, token_budget=10_000
+        )
+    )
+
+
+def test_compact_is_skipped_if_summary_changed() -> None:
+    history = InMemoryChatMessageHistory(max_messages=100)
+    history.add_messages(conversation(3))
+    assert history.compact("first", 2, None)
+
+    assert not history.compact("second", 2, None)
+    assert history.snapshot()[0] == "first"
+    assert len(history.messages) == 4
+
+
+def test_compact_keeps_messages_added_and_trimmed_meanwhile() -> None:
+    history = InMemoryChatMessageHistory(max_messages=6)
+    history.add_messages(conversation(3))
+    summary, messages, first = history.snapshot()
+    start = window_start(messages, max_turns=1, token_budget=10_000)
+
+    # Another turn arrives while the summary is written and the cap trims
+    # the first turn
+    history.add_messages(conversation(4)[6:])
+    assert history.compact("User asked questions 0 and 1.", first + start, summary)
+
+    assert [message.content.split()[1] for message in history.messages] == [
+        "2",
+        "2",
+        "3",
+        "3",
+    ]
@@ -0,0 +1,93 @@
+import uuid
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from sqlalchemy.exc import OperationalError
+
+from app.core.chat_history import (
+    InMemoryChatHistoryStore,
+    PostgresChatHistoryStore,
+    from_rows,
+    to_rows,
+)
+from app.core.db import engine
+
+
+def test_sessions_keep_only_the_last_messages() -> None:
+    store = InMemoryChatHistoryStore(max_sessions=10, max_messages=4, ttl=60)
+    history = store.get("a")
+
+    for i in range(3):
+        history.add_messages(
+            [HumanMessage(content=f"question {i}"), AIMessage(content=f"answer {i}")]
+        )
+
+    assert store.get("a") is history
+    assert [message.content for message in history.messages] == [
+        "question 1",
+        "answer 1",
+        "question 2",
+        "answer 2",
+    ]
+
+
+def test_least_recently_used_sessions_are_evicted() -> None:
+    store = InMemoryChatHistoryStore(max_sessions=2, max_messages=10, ttl=60)
+    store.get("a").add_messages([HumanMessage(content="carrots?")])
+    store.get("b")
+    store.get("a")
+    store.get("c")
+
+    assert store.get("a").messages[0].content == "carrots?"
+    assert store.get("b").messages == []
+    assert store.stats()["sessions"] == 2
+
+
+def test_idle_sessions_expire() -> None:
+    store = InMemoryChatHistoryStore(max_sessions=10, max_messages=10, ttl=0)
+    store.get("a").add_messages([HumanMessage(content="carrots?")])
+
+    assert store.sweep() == 1
+    assert store.get("a").messages == []
+
+
+def test_rows_round_trip() -> None:
+    messages = [HumanMessage(content="carrots?"), AIMessage(content="Roast them.")]
+
+    assert to_rows(messages) == [["human", "carrots?"], ["ai", "Roast them."]]
+    assert from_rows(to_rows(messages)) == messages
+
+
+def test_postgres_compact_keeps_messages_added_and_trimmed_meanwhile() -> None:
+    try:
+        with engine.connect():
+            pass
+    except OperationalError:
+        pytest.skip("needs the database")
+    store = PostgresChatHistoryStore(max_messages=4, ttl=60)
+    history = store.get(f"test-{uuid.uuid4()}")
+    try:
+        for i in range(2):
+            history.add_messages(
+                [
+                    HumanMessage(content=f"question {i}"),
+                    AIMessage(content=f"answer {i}"),
+                ]
+            )
+        summary, _, first = history.snapshot()
+
+        # Another worker saves a turn, trimming the first one, before this
+        # worker's summary of turn 0 is stored
+        history.add_messages(
+            [HumanMessage(content="question 2"), AIMessage(content="answer 2")]
+        )
+        assert history.compact("User asked question 0.", first + 2, summary)
+
+        assert [message.content for message in history.messages] == [
+            "question 1",
+            "answer 1",
+            "question 2",
+            "answer 2",
+        ]
+    finally:
+        history.clear()
@@ -0,0 +1,81 @@
+from unittest.mock import MagicMock
+
+from app.core.embedding_cache import (
+    CachedEmbeddings,
+    EmbeddingCache,
+    pack_embedding,
+    text_hash,
+    unpack_embedding,
+)
+
+
+def fake_encoder() -> MagicMock:
+    encoder = MagicMock()
+    encoder.embed_documents.side_effect = lambda texts: [
+        [float(len(text)), 0.5] for text in texts
+    ]
+    encoder.embed_query.side_effect = lambda text: [float(len(text)), 1.0]
+    return encoder
+
+
+def test_text_hash_normalizes_whitespace() -> None:
+    assert text_hash("carrot  and\nbeetroot ") == text_hash("carrot and beetroot")
+    assert text_hash("carrot") != text_hash("beetroot")
+
+
+def test_pack_roundtrip() -> None:
+    assert unpack_embedding(pack_embedding([0.5, -1.0, 2.25])) == [0.5, -1.0, 2.25]
+
+
+def test_cached_embeddings_only_encodes_misses() -> None:
+    encoder = fake_encoder()
+    cache = EmbeddingCache(maxsize=10, persistent=False)
+    embeddings = CachedEmbeddings(encoder, "model", cache)
+
+    first = embeddings.embed_documents(["carrot", "beetroot", "carrot"])
+    second = embeddings.embed_documents(["beetroot", "pumpkin"])
+
+    assert first == [[6.0, 0.5], [8.0, 0.5], [6.0, 0.5]]
+    assert second == [[8.0, 0.5], [7.0, 0.5]]
+    assert encoder.embed_documents.call_args_list[0].args == (["carrot", "beetroot"],)
+    assert encoder.embed_documents.call_args_list[1].args == (["pumpkin"],)
+    assert cache.stats()["memory_hits"] == 1
+
+
+def test_query_and_document_keys_are_separate() -> None:
+    encoder = fake_encoder()
+    embeddings = CachedEmbeddings(encoder, "model", EmbeddingCache(persistent=False))
+
+    embeddings.embed_documents(["carrot"])
+    assert embeddings.embed_query("carrot") == [6.0, 1.0]
+    assert embeddings.embed_query("carrot") == [6.0, 1.0]
+    assert encoder.embed_query.call_count == 1
+
+
+def test_embed_queries_encodes_uncached_queries_in_one_batch() -> None:
+    encoder = fake_encoder()
+    encoder.embed_queries.side_effect = lambda texts: [
+        [float(len(text)), 1.0] for text in texts
+    ]
+    embeddings = CachedEmbeddings(encoder, "model", EmbeddingCache(persistent=False))
+    embeddings.embed_query("carrot")
+
+    vectors = embeddings.embed_queries(["carrot", "leek", "kale", "leek"])
+
+    assert vectors == [[6.0, 1.0], [4.0, 1.0], [4.0, 1.0], [4.0, 1.0]]
+    # MagicMock isn't a known encoder, so embed_queries falls back to embed_query
+    assert [call.args for call in encoder.embed_query.call_args_list] == [
+        ("carrot",),
+        ("leek",),
+        ("kale",),
+    ]
+
+
+def test_lru_eviction() -> None:
+    cache = EmbeddingCache(maxsize=2, persistent=False)
+    cache.set_many("model", {"a": [1.0], "b": [2.0]})
+    cache.get_many("model", ["a"])
+    cache.set_many("model", {"c": [3.0]})
+
+    assert cache.get_many("model", ["a", "b", "c"]) == {"a": [1.0], "c": [3.0]}
+    assert cache.stats()["size"] == 2
@@ -0,0 +1,32 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+from pytest_mock import MockerFixture
+
+from app.core.embeddings import EmbeddingModelRegistry
+
+
+def test_registry_loads_model_once(mocker: MockerFixture) -> None:
+    model_cls = mocker.patch(
+        "app.core.encoders.HuggingFaceBgeEmbeddings", return_value=MagicMock()
+    )
+    registry = EmbeddingModelRegistry()
+    assert not registry.is_ready("some-model")
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        models = list(pool.map(lambda _: registry.get("some-model"), range(32)))
+
+    assert model_cls.call_count == 1
+    assert all(model is models[0] for model in models)
+    assert registry.is_ready("some-model")
+
+
+def test_registry_warm_up(mocker: MockerFixture) -> None:
+    model = MagicMock()
+    mocker.patch("app.core.encoders.HuggingFaceBgeEmbeddings", return_value=model)
+    registry = EmbeddingModelRegistry()
+
+    registry.warm_up("some-model")
+
+    model.embed_query.assert_called_once()
+    assert registry.is_ready("some-model")
@@ -0,0 +1,160 @@
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from app.core.embeddings import (
+    EMBEDDING_ENCODE_KWARGS,
+    EMBEDDING_MODEL_KWARGS,
+    EMBEDDING_MODEL_NAME,
+)
+from app.core.encoders import (
+    DynamicBatchingEmbeddings,
+    export_onnx,
+    load_encoder,
+    quantize_torch,
+)
+
+TEXTS = [
+    "carrot and beetroot soup",
+    "roast pumpkin with garlic",
+    "spinach, kale and potato curry",
+    "Method\n1. Chop the onion.\n2. Simmer for 20 minutes.",
+]
+
+
+class RecordingEmbeddings(Embeddings):
+    def __init__(self) -> None:
+        self.batches: list[list[str]] = []
+        self.release = threading.Event()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [[float(len(text))] for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        # Block the first batch so the remaining queries pile up
+        self.batches.append([text])
+        self.release.wait(5)
+        return [float(len(text))]
+
+
+def test_concurrent_queries_share_a_batch() -> None:
+    encoder = RecordingEmbeddings()
+    batcher = DynamicBatchingEmbeddings(encoder, window_ms=50, max_batch_size=8)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(batcher.embed_query, "x" * n) for n in range(1, 9)]
+        encoder.release.set()
+        results = [future.result() for future in futures]
+
+    assert results == [[float(n)] for n in range(1, 9)]
+    assert batcher.stats()["queries"] == 8
+    assert batcher.stats()["batches"] < 8
+
+
+def test_batch_errors_are_raised_in_every_caller() -> None:
+    class FailingEmbeddings(RecordingEmbeddings):
+        def embed_query(self, text: str) -> list[float]:
+            raise RuntimeError("encoder failed")
+
+    batcher = DynamicBatchingEmbeddings(
+        FailingEmbeddings(), window_ms=1, max_batch_size=8
+    )
+
+    with pytest.raises(RuntimeError, match="encoder failed"):
+        batcher.embed_query("carrot")
+
+
+def test_documents_bypass_the_queue() -> None:
+    batcher = DynamicBatchingEmbeddings(
+        RecordingEmbeddings(), window_ms=1, max_batch_size=8
+    )
+
+    assert batcher.embed_documents(["ab", "abc"]) == [[2.0], [3.0]]
+    assert batcher.stats()["batches"] == 0
+
+
+def cosine(a: list[float], b: list[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b, strict=True))
+    return dot / (math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b)))
+
+
+@pytest.fixture(scope="module")
+def reference() -> Embeddings:
+    pytest.importorskip("sentence_transformers")
+    try:
+        return load_encoder(
+            EMBEDDING_MODEL_NAME,
+            "torch",
+            EMBEDDING_MODEL_KWARGS,
+            EMBEDDING_ENCODE_KWARGS,
+        )
+    except OSError as exc:
+        pytest.skip(f"{EMBEDDING_MODEL_NAME} not available: {exc}")
+
+
+def assert_parity(
+    reference: Embeddings, candidate: Embeddings, min_cosine: float
+) -> None:
+    expected = reference.embed_documents(TEXTS) + [reference.embed_query(TEXTS[0])]
+    actual = candidate.embed_documents(TEXTS) + [candidate.embed_query(TEXTS[0])]
+    for a, b in zip(expected, actual, strict=True):
+        assert cosine(a, b) >= min_cosine
+    # Nearest document for the query must not change
+    query, docs = actual[-1], actual[:-1]
+    expected_query, expected_docs = expected[-1], expected[:-1]
+    assert max(range(len(docs)), key=lambda i: cosine(query, docs[i])) == max(
+        range(len(expected_docs)),
+        key=lambda i: cosine(expected_query, expected_docs[i]),
+    )
+
+
+@pytest.mark.parametrize(("quantize", "min_cosine"), [(False, 0.9999), (True, 0.98)])
+def test_onnx_matches_torch(
+    reference: Embeddings, tmp_path, quantize: bool, min_cosine: float
+) -> None:
+    pytest.importorskip("onnxruntime")
+    if quantize:
+        pytest.importorskip("onnx")
+    from app.core.encoders import OnnxBgeEmbeddings
+
+    model_path = export_onnx(EMBEDDING_MODEL_NAME, tmp_path, quantize=quantize)
+
+    assert_parity(reference, OnnxBgeEmbeddings(model_path), min_cosine)
+
+
+def test_torch_int8_matches_torch(reference: Embeddings) -> None:
+    candidate = quantize_torch(
+        load_encoder(
+            EMBEDDING_MODEL_NAME,
+            "torch",
+            EMBEDDING_MODEL_KWARGS,
+            EMBEDDING_ENCODE_KWARGS,
+        )
+    )
+
+    assert_parity(reference, candidate, 0.98)
+
+
+def test_batched_queries_match_single_queries(reference: Embeddings) -> None:
+    batcher = DynamicBatchingEmbeddings(reference, window_ms=20, max_batch_size=8)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        batched = list(pool.map(batcher.embed_query, TEXTS))
+
+    for text, vector in zip(TEXTS, batched, strict=True):
+        assert cosine(vector, reference.embed_query(text)) >= 0.9999
+
+
+def test_onnx_backend_without_runtime_is_refused(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    import importlib.util
+
+    from app.core.config import Settings
+
+    monkeypatch.setattr(importlib.util, "find_spec", lambda name: None)
+    with pytest.raises(ValueError, match="onnxruntime, onnx"):
+        Settings(EMBEDDING_BACKEND="onnx-int8")  # type: ignore
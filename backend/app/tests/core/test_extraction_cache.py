@@ -0,0 +1,65 @@
+import pytest
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from app.core import extraction_cache
+from app.core.extraction_cache import ExtractedText, save_extracted_text, split_page
+
+PAGES = [
+    Document(
+        page_content="Beetroot soup\n\nRoast the beetroot.\n\nBlend with stock and serve warm.",
+        metadata={"source": "cookbook.pdf", "page": 0},
+    ),
+    Document(
+        page_content="Kale chips\n\nTear the kale, oil it and bake until crisp.",
+        metadata={"source": "cookbook.pdf", "page": 1},
+    ),
+]
+
+
+def split(split_text):
+    chunks, boundaries = [], []
+    for index, page in enumerate(PAGES):
+        page_chunks, page_boundaries = split_page(index, page, split_text)
+        chunks.append(page_chunks)
+        boundaries.extend(page_boundaries)
+    return chunks, boundaries
+
+
+def test_boundaries_rebuild_the_same_chunks() -> None:
+    splitter = RecursiveCharacterTextSplitter(chunk_size=30, chunk_overlap=5)
+    chunks, boundaries = split(splitter.split_text)
+
+    page_chunks = ExtractedText(PAGES, "recursive:30:5", boundaries).page_chunks(
+        "recursive:30:5"
+    )
+
+    assert chunks == [splitter.split_documents([page]) for page in PAGES]
+    assert [page for page, _ in page_chunks] == PAGES
+    assert [chunks for _, chunks in page_chunks] == chunks
+
+
+def test_chunks_need_matching_splitter() -> None:
+    _, boundaries = split(lambda text: [text])
+
+    assert (
+        ExtractedText(PAGES, "recursive:512:20", boundaries).page_chunks("token:512:20")
+        is None
+    )
+
+
+def test_non_verbatim_chunks_have_no_boundaries() -> None:
+    chunks, boundaries = split_page(0, PAGES[0], lambda text: [text.upper()])
+
+    assert len(chunks) == 1
+    assert boundaries is None
+
+
+def test_failed_write_is_not_raised(monkeypatch: pytest.MonkeyPatch) -> None:
+    class BrokenSession:
+        def __init__(self, engine) -> None:
+            raise ConnectionError("database is down")
+
+    monkeypatch.setattr(extraction_cache, "Session", BrokenSession)
+
+    save_extracted_text("0" * 64, "pdf", ExtractedText(PAGES))
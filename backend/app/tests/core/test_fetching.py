@@ -0,0 +1,143 @@
+import asyncio
+import hashlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from app.core.fetching import FetchError, FetchResult, PageFetcher
+
+PAGE = b"<html><title>Beetroot soup</title></html>"
+
+
+def make_fetcher(handler, **kwargs) -> PageFetcher:
+    options = {
+        "timeout": 5,
+        "max_connections": 10,
+        "per_host_limit": 2,
+        "max_bytes": 1024,
+        "user_agent": "test",
+    }
+    options.update(kwargs)
+    return PageFetcher(transport=httpx.MockTransport(handler), **options)
+
+
+def test_conditional_request_returns_not_modified() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=PAGE, headers={"etag": '"v1"'})
+
+    fetcher = make_fetcher(handler)
+
+    first = fetcher.fetch_sync("https://example.com/soup")
+    second = fetcher.fetch_sync("https://example.com/soup", etag=first.etag)
+
+    assert first.text == PAGE.decode()
+    assert first.etag == '"v1"'
+    assert second.not_modified
+    assert second.content == b""
+
+
+def test_oversized_bodies_are_rejected() -> None:
+    fetcher = make_fetcher(lambda request: httpx.Response(200, content=b"x" * 2048))
+
+    with pytest.raises(FetchError, match="exceeds|limit"):
+        fetcher.fetch_sync("https://example.com/huge")
+
+
+def test_error_status_raises() -> None:
+    fetcher = make_fetcher(lambda request: httpx.Response(404))
+
+    with pytest.raises(FetchError, match="404"):
+        asyncio.run(fetcher.fetch("https://example.com/missing"))
+
+
+def test_requests_per_host_are_limited() -> None:
+    active: dict[str, int] = {}
+    peak: dict[str, int] = {}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        active[host] = active.get(host, 0) + 1
+        peak[host] = max(peak.get(host, 0), active[host])
+        await asyncio.sleep(0.02)
+        active[host] -= 1
+        return httpx.Response(200, content=PAGE)
+
+    fetcher = make_fetcher(handler, per_host_limit=2)
+    urls = [
+        f"https://{host}/{i}" for host in ("a.example", "b.example") for i in range(6)
+    ]
+
+    with ThreadPoolExecutor(max_workers=12) as pool:
+        list(pool.map(fetcher.fetch_sync, urls))
+
+    assert peak == {"a.example": 2, "b.example": 2}
+
+
+def test_download_streams_to_file_and_hashes() -> None:
+    body = b"%PDF" + b"x" * 4096
+    fetcher = make_fetcher(lambda request: httpx.Response(200, content=body))
+
+    with tempfile.TemporaryFile() as f:
+        digest = fetcher.download_sync(
+            "https://example.com/recipe.pdf", f, max_bytes=8192
+        )
+        f.seek(0)
+        assert f.read() == body
+
+    assert digest == hashlib.sha256(body).hexdigest()
+    with tempfile.TemporaryFile() as f, pytest.raises(FetchError, match="exceeds"):
+        fetcher.download_sync("https://example.com/recipe.pdf", f)
+
+
+@pytest.mark.parametrize("stored_chunks, refetched", [(["chunk"], False), ([], True)])
+def test_unchanged_page_is_only_skipped_if_its_chunks_exist(
+    monkeypatch: pytest.MonkeyPatch, stored_chunks: list[str], refetched: bool
+) -> None:
+    from app.core import vector_db_services
+    from app.models import SourceFetchState
+
+    metadata = {"source": "https://example.com/soup", "owner_id": 1}
+    state = SourceFetchState(
+        source_id="1:https://example.com/soup",
+        etag='"v1"',
+        metadata_hash=vector_db_services.metadata_hash(metadata),
+    )
+    requests = []
+    stored = []
+
+    class RecordManager:
+        def list_keys(self, group_ids, limit=None):
+            return stored_chunks
+
+    class Fetcher:
+        def fetch_sync(self, url, etag=None, last_modified=None):
+            requests.append(etag)
+            return FetchResult(url=url, status_code=304 if etag else 200, content=PAGE)
+
+    monkeypatch.setattr(vector_db_services, "get_embedding_function", lambda: None)
+    monkeypatch.setattr(vector_db_services, "get_fetch_state", lambda source_id: state)
+    monkeypatch.setattr(
+        vector_db_services, "get_record_manager", lambda: RecordManager()
+    )
+    monkeypatch.setattr(vector_db_services, "page_fetcher", Fetcher())
+    monkeypatch.setattr(
+        vector_db_services,
+        "store_embeddings",
+        lambda chunks, *args: stored.append(chunks),
+    )
+    monkeypatch.setattr(
+        vector_db_services, "html_to_documents", lambda result: [result.text]
+    )
+    monkeypatch.setattr(
+        vector_db_services, "split_documents", lambda documents: documents
+    )
+    monkeypatch.setattr(vector_db_services, "save_fetch_state", lambda *args: None)
+
+    vector_db_services.store_in_vector_db(url=metadata["source"], metadata=metadata)
+
+    assert requests == [None if refetched else '"v1"']
+    assert bool(stored) == refetched
@@ -0,0 +1,124 @@
+from collections.abc import Iterator
+from concurrent.futures import Executor, ThreadPoolExecutor
+
+import pytest
+from langchain_core.documents import Document
+
+from app.core import ingestion
+from app.core.ingestion import BulkIngestionPipeline, IngestionStats
+from app.models import Recipe
+
+
+class FakeEmbeddings:
+    """
+    Stands in for CachedEmbeddings: remembers the primed vectors.
+    """
+
+    def __init__(self) -> None:
+        self.vectors: dict[str, list[float]] = {}
+
+    def missing(self, texts: list[str]) -> list[str]:
+        return list(dict.fromkeys(text for text in texts if text not in self.vectors))
+
+    def prime(self, texts: list[str], vectors: list[list[float]]) -> None:
+        self.vectors.update(zip(texts, vectors, strict=True))
+
+
+class ThreadPipeline(BulkIngestionPipeline):
+    # Encoder processes would load the real model
+    def _encoder_pool(self) -> Executor:
+        return ThreadPoolExecutor(max_workers=self.encoder_processes)
+
+
+@pytest.fixture
+def store(monkeypatch: pytest.MonkeyPatch) -> dict:
+    store: dict = {"encoded": [], "written": [], "loaded": []}
+    embeddings = FakeEmbeddings()
+
+    def load_chunks(file_path=None, url=None) -> list[Document]:
+        if url.endswith("broken"):
+            raise ConnectionError("unreachable")
+        store["loaded"].append(url)
+        return [Document(page_content=f"{url} part {i}") for i in range(2)]
+
+    def encode_batch(texts: list[str]) -> list[list[float]]:
+        store["encoded"].append(texts)
+        return [[float(len(text))] for text in texts]
+
+    def store_embeddings(
+        chunks, embedding_function, metadata, batch_size, collection_name
+    ) -> None:
+        assert all(chunk.page_content in embedding_function.vectors for chunk in chunks)
+        store["written"].append(chunks)
+
+    monkeypatch.setattr(ingestion, "load_chunks", load_chunks)
+    monkeypatch.setattr(ingestion, "_encode_batch", encode_batch)
+    monkeypatch.setattr(ingestion, "get_embedding_function", lambda: embeddings)
+    monkeypatch.setattr(ingestion, "store_embeddings", store_embeddings)
+    return store
+
+
+def recipes(count: int, broken: tuple[int, ...] = ()) -> list[Recipe]:
+    return [
+        Recipe(
+            id=i,
+            title=f"Recipe {i}",
+            url=f"https://example.com/{'broken' if i in broken else i}",
+            owner_id=1,
+        )
+        for i in range(count)
+    ]
+
+
+def test_chunks_are_encoded_and_written_in_batches(store: dict) -> None:
+    pipeline = ThreadPipeline(
+        fetch_workers=2, encoder_processes=2, encode_batch_size=4, window_size=5
+    )
+    flushed = []
+
+    stats = pipeline.run(
+        recipes(6),
+        on_flush=lambda recipe, stats: flushed.append((recipe.id, stats.chunks)),
+    )
+
+    assert (stats.documents, stats.chunks, stats.failed) == (6, 12, 0)
+    # Windows close once they hold 5 chunks, i.e. after every 3 recipes
+    assert [len(chunks) for chunks in store["written"]] == [6, 6]
+    assert sorted(len(batch) for batch in store["encoded"]) == [2, 2, 4, 4]
+    assert flushed == [(2, 6), (5, 12), (5, 12)]
+    # Recipes are written in the order they were given
+    assert [chunk.metadata["title"] for chunk in store["written"][0]][::2] == [
+        "Recipe 0",
+        "Recipe 1",
+        "Recipe 2",
+    ]
+
+
+def test_failed_recipes_are_counted_and_skipped(store: dict) -> None:
+    pipeline = ThreadPipeline(fetch_workers=2, encoder_processes=1, window_size=100)
+    flushed: list[tuple[int, IngestionStats]] = []
+
+    stats = pipeline.run(
+        recipes(4, broken=(1, 3)),
+        on_flush=lambda recipe, stats: flushed.append((recipe.id, stats)),
+    )
+
+    assert (stats.documents, stats.chunks, stats.failed) == (2, 4, 2)
+    # The checkpoint moves past a recipe that failed to load
+    assert flushed[-1][0] == 3
+
+
+def test_fetches_in_flight_are_bounded(store: dict) -> None:
+    pipeline = ThreadPipeline(fetch_workers=2, encoder_processes=1, window_size=1)
+    ahead = []
+
+    def pulled() -> Iterator[Recipe]:
+        for i, recipe in enumerate(recipes(20)):
+            # Recipes taken from the iterable but not written yet
+            ahead.append(i - len(store["written"]))
+            yield recipe
+
+    pipeline.run(pulled())
+
+    assert len(store["written"]) == 20
+    assert max(ahead) <= pipeline.fetch_workers * 2
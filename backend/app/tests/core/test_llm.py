@@ -0,0 +1,57 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models import BaseChatModel, FakeListChatModel
+from langchain_core.prompts import ChatPromptTemplate
+
+from app.core.llm import LLMRegistry
+
+
+def fake_factory(created: list[str]):
+    def factory(model_name: str, callbacks: list[BaseCallbackHandler]) -> BaseChatModel:
+        created.append(model_name)
+        return FakeListChatModel(responses=["Roast the carrots."], callbacks=callbacks)
+
+    return factory
+
+
+def test_chains_are_built_once_and_share_models() -> None:
+    created: list[str] = []
+    registry = LLMRegistry(model_factory=fake_factory(created))
+    prompt = ChatPromptTemplate.from_messages([("human", "{input}")])
+    registry.register("chat", "some-model", lambda model: prompt | model)
+    registry.register("plain", "some-model", lambda model: model)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        chains = list(pool.map(lambda _: registry.chain("chat"), range(32)))
+    registry.build_all()
+
+    assert all(chain is chains[0] for chain in chains)
+    assert created == ["some-model"]
+    assert registry.chain("plain") is registry.model("some-model")
+
+
+def test_latency_is_recorded_per_model() -> None:
+    registry = LLMRegistry(model_factory=fake_factory([]))
+    registry.register("chat", "some-model", lambda model: model)
+
+    registry.chain("chat").invoke("carrots?")
+    asyncio.run(registry.chain("chat").ainvoke("carrots?"))
+
+    stats = registry.stats()["some-model"]
+    assert stats["calls"] == 2
+    assert stats["errors"] == 0
+    assert stats["latency"]["p50_ms"] >= 0
+
+
+def test_model_factory_can_be_replaced() -> None:
+    created: list[str] = []
+    registry = LLMRegistry(model_factory=fake_factory([]))
+    registry.register("chat", "some-model", lambda model: model)
+    first = registry.chain("chat")
+
+    registry.set_model_factory(fake_factory(created))
+
+    assert registry.chain("chat") is not first
+    assert created == ["some-model"]
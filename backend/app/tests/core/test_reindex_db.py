@@ -0,0 +1,186 @@
+from collections.abc import Callable, Generator, Iterable
+from typing import Any
+
+import pytest
+from langchain_community.embeddings import FakeEmbeddings
+from langchain_postgres.vectorstores import PGVector
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, delete
+
+from app.core import reindex
+from app.core.db import engine
+from app.core.embeddings import EMBEDDING_DIMENSIONS
+from app.core.ingestion import IngestionStats
+from app.core.vector_db_services import get_search_engine, record_source_change
+from app.models import Recipe, User, VectorReindexRun
+from app.tests.utils.user import create_random_user
+
+LIVE = "test_reindex"
+SHADOW = f"{LIVE}{reindex.SHADOW_SUFFIX}"
+
+
+class FakePipeline:
+    """
+    Stands in for BulkIngestionPipeline: records the recipes of each run
+    and creates the target collection without fetching or embedding.
+    """
+
+    runs: list[list[int]] = []
+    failed = 0
+    during_run: Callable[[], None] | None = None
+
+    def __init__(
+        self,
+        collection_name: str,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        self.collection_name = collection_name
+
+    def run(
+        self,
+        recipes: Iterable[Recipe],
+        on_flush: Callable[[Recipe, IngestionStats], None] | None = None,
+    ) -> IngestionStats:
+        recipes = list(recipes)
+        FakePipeline.runs.append([recipe.id for recipe in recipes])
+        PGVector(
+            embeddings=FakeEmbeddings(size=EMBEDDING_DIMENSIONS),
+            connection=get_search_engine(),
+            collection_name=self.collection_name,
+            embedding_length=EMBEDDING_DIMENSIONS,
+        )
+        if FakePipeline.during_run is not None:
+            during_run, FakePipeline.during_run = FakePipeline.during_run, None
+            during_run()
+        stats = IngestionStats(documents=len(recipes), failed=FakePipeline.failed)
+        if on_flush and recipes:
+            on_flush(recipes[-1], stats)
+        return stats
+
+
+@pytest.fixture
+def recipes(monkeypatch: pytest.MonkeyPatch) -> Generator[list[Recipe], None, None]:
+    try:
+        with engine.connect():
+            pass
+    except OperationalError:
+        pytest.skip("needs the database")
+    monkeypatch.setattr(reindex, "COLLECTION_NAME", LIVE)
+    monkeypatch.setattr(reindex, "BulkIngestionPipeline", FakePipeline)
+    FakePipeline.runs = []
+    FakePipeline.failed = 0
+    FakePipeline.during_run = None
+    # Creates the PGVector tables and the live collection
+    PGVector(
+        embeddings=FakeEmbeddings(size=EMBEDDING_DIMENSIONS),
+        connection=get_search_engine(),
+        collection_name=LIVE,
+        embedding_length=EMBEDDING_DIMENSIONS,
+    )
+    with Session(engine) as session:
+        user = create_random_user(session)
+        created = [
+            Recipe(
+                title=f"Recipe {i}",
+                url=f"https://example.com/reindex-{i}",
+                store_in_vector_db=True,
+                owner_id=user.id,
+            )
+            for i in range(3)
+        ]
+        session.add_all(created)
+        session.commit()
+        for recipe in created:
+            session.refresh(recipe)
+        session.expunge_all()
+    yield created
+    with Session(engine) as session:
+        session.execute(delete(Recipe).where(Recipe.owner_id == user.id))
+        session.execute(delete(User).where(User.id == user.id))
+        session.execute(
+            delete(VectorReindexRun).where(
+                VectorReindexRun.target_collection.in_([LIVE, SHADOW])
+            )
+        )
+        session.commit()
+    for name in (LIVE, SHADOW, f"{LIVE}{reindex.OLD_SUFFIX}"):
+        reindex.drop_collection(get_search_engine(), name)
+
+
+def ours(ids: list[int], recipes: list[Recipe]) -> list[int]:
+    # Other tests' recipes share the table
+    return [id_ for id_ in ids if id_ in {recipe.id for recipe in recipes}]
+
+
+def get_run(target: str = SHADOW) -> VectorReindexRun:
+    with Session(engine) as session:
+        run = session.get(VectorReindexRun, target)
+        assert run is not None
+        return run
+
+
+def test_resumes_after_the_checkpoint(recipes: list[Recipe]) -> None:
+    with Session(engine) as session:
+        session.add(
+            VectorReindexRun(
+                target_collection=SHADOW, run_id="resumed", last_recipe_id=recipes[0].id
+            )
+        )
+        session.commit()
+
+    reindex.reindex_collection(engine)
+
+    assert ours(FakePipeline.runs[0], recipes) == [recipes[1].id, recipes[2].id]
+    run = get_run()
+    assert run.swapped
+    assert run.completed_at is not None
+    assert not reindex.collection_exists(get_search_engine(), SHADOW)
+
+
+def test_swapped_run_is_only_marked_complete(recipes: list[Recipe]) -> None:
+    with Session(engine) as session:
+        session.add(
+            VectorReindexRun(
+                target_collection=SHADOW,
+                run_id="swapped",
+                last_recipe_id=recipes[-1].id,
+                swapped=True,
+            )
+        )
+        session.commit()
+
+    reindex.reindex_collection(engine)
+
+    assert FakePipeline.runs == []
+    assert get_run().completed_at is not None
+
+
+def test_failed_recipes_block_the_swap_unless_forced(recipes: list[Recipe]) -> None:
+    FakePipeline.failed = 1
+
+    with pytest.raises(RuntimeError):
+        reindex.reindex_collection(engine, restart=True)
+
+    run = get_run()
+    assert not run.swapped
+    assert run.completed_at is None
+    assert reindex.collection_exists(get_search_engine(), SHADOW)
+
+    FakePipeline.failed = 0
+    reindex.reindex_collection(engine, force=True)
+
+    assert get_run().swapped
+    assert not reindex.collection_exists(get_search_engine(), SHADOW)
+
+
+def test_writes_during_the_build_are_replayed(recipes: list[Recipe]) -> None:
+    changed = recipes[1]
+    FakePipeline.during_run = lambda: record_source_change(
+        changed.url, changed.owner_id
+    )
+
+    reindex.reindex_collection(engine, restart=True)
+
+    assert ours(FakePipeline.runs[1], recipes) == [changed.id]
+    assert get_run().swapped
@@ -0,0 +1,32 @@
+import json
+import subprocess
+import sys
+
+# Seconds allowed for importing the vector db module in a fresh interpreter
+IMPORT_BUDGET = 5.0
+
+HEAVY_MODULES = [
+    "torch",
+    "transformers",
+    "sentence_transformers",
+    "pypdf",
+    "unstructured",
+]
+
+SCRIPT = f"""
+import json, sys, time
+start = time.perf_counter()
+import app.core.vector_db_services
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed, "loaded": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def test_vector_db_services_import_is_cheap() -> None:
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT], capture_output=True, text=True, check=True
+    )
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+
+    assert report["loaded"] == []
+    assert report["elapsed"] < IMPORT_BUDGET
@@ -0,0 +1,54 @@
+import asyncio
+import json
+
+from app.core.streaming import StreamTracker, completed_items, measure_stream, sse_event
+
+
+def test_sse_event_format() -> None:
+    event = sse_event("token", {"content": "Roast\nthe carrots"})
+
+    assert event.endswith("\n\n")
+    name, data = event.strip().split("\n")
+    assert name == "event: token"
+    assert json.loads(data.removeprefix("data: ")) == {"content": "Roast\nthe carrots"}
+
+
+def test_measure_stream_passes_items_through() -> None:
+    async def tokens():
+        for token in ["Roast", " the", " carrots"]:
+            yield token
+
+    tracker = StreamTracker()
+
+    async def collect():
+        return [token async for token in measure_stream(tokens(), "test", tracker)]
+
+    assert asyncio.run(collect()) == ["Roast", " the", " carrots"]
+    stats = tracker.stats()["test"]
+    assert stats["streams"] == 1
+    assert stats["first_chunk"]["p50_ms"] <= stats["duration"]["p50_ms"]
+
+
+def test_completed_items_waits_for_the_next_key() -> None:
+    partials = [
+        {},
+        {"monday": {"breakfast": {"recipe": "Sweet"}}},
+        {"monday": {"breakfast": {"recipe": "Sweet potato hash"}}},
+        {"monday": {"breakfast": {"recipe": "Sweet potato hash"}}, "tuesday": {}},
+        {
+            "monday": {"breakfast": {"recipe": "Sweet potato hash"}},
+            "tuesday": {"lunch": {"recipe": "Soup"}},
+        },
+    ]
+
+    async def stream():
+        for partial in partials:
+            yield partial
+
+    async def collect():
+        return [item async for item in completed_items(stream())]
+
+    assert asyncio.run(collect()) == [
+        ("monday", {"breakfast": {"recipe": "Sweet potato hash"}}),
+        ("tuesday", {"lunch": {"recipe": "Soup"}}),
+    ]
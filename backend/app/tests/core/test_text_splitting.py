@@ -0,0 +1,50 @@
+import re
+from typing import Any
+
+from app.core.text_splitting import TokenOffsetTextSplitter
+
+
+def whitespace_tokenizer(text: str, **kwargs: Any) -> dict[str, Any]:
+    return {
+        "offset_mapping": [match.span() for match in re.finditer(r"\w+|[^\w\s]", text)]
+    }
+
+
+def token_count(text: str) -> int:
+    return len(whitespace_tokenizer(text)["offset_mapping"])
+
+
+def test_chunks_respect_token_budget() -> None:
+    text = " ".join(f"word{i}" for i in range(1000))
+    splitter = TokenOffsetTextSplitter(
+        whitespace_tokenizer, chunk_size=100, chunk_overlap=10
+    )
+
+    chunks = splitter.split_text(text)
+
+    assert all(token_count(chunk) <= 100 for chunk in chunks)
+    assert chunks[0].startswith("word0 ")
+    assert chunks[-1].endswith("word999")
+    # consecutive chunks overlap by chunk_overlap tokens
+    assert chunks[1].startswith("word90 ")
+
+
+def test_prefers_paragraph_boundaries() -> None:
+    first = " ".join(["carrot"] * 70)
+    second = " ".join(["beetroot"] * 70)
+    splitter = TokenOffsetTextSplitter(
+        whitespace_tokenizer, chunk_size=100, chunk_overlap=0
+    )
+
+    chunks = splitter.split_text(f"{first}\n\n{second}")
+
+    assert chunks == [first, second]
+
+
+def test_short_text_is_one_chunk() -> None:
+    splitter = TokenOffsetTextSplitter(
+        whitespace_tokenizer, chunk_size=100, chunk_overlap=10
+    )
+
+    assert splitter.split_text("Roast the pumpkin.") == ["Roast the pumpkin."]
+    assert splitter.split_text("") == []
@@ -0,0 +1,61 @@
+from app.core.ttl_cache import TTLCache
+
+
+class FakeTimer:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_entries_expire_after_ttl() -> None:
+    timer = FakeTimer()
+    cache = TTLCache(maxsize=10, ttl=60, timer=timer)
+    cache.set("carrot", [1])
+
+    timer.now = 59
+    assert cache.get("carrot") == [1]
+    timer.now = 60
+    assert cache.get("carrot") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_entry_is_evicted() -> None:
+    cache = TTLCache(maxsize=2, ttl=60, timer=FakeTimer())
+    cache.set("carrot", 1)
+    cache.set("beetroot", 2)
+    cache.get("carrot")
+    cache.set("pumpkin", 3)
+
+    assert cache.get("beetroot") is None
+    assert cache.get("carrot") == 1
+    assert cache.get("pumpkin") == 3
+
+
+def test_expired_entries_are_evicted_first() -> None:
+    timer = FakeTimer()
+    cache = TTLCache(maxsize=2, ttl=60, timer=timer)
+    cache.set("carrot", 1)
+    timer.now = 30
+    cache.set("beetroot", 2)
+    cache.get("carrot")
+    timer.now = 61
+    cache.set("pumpkin", 3)
+
+    assert len(cache) == 2
+    assert cache.get("beetroot") == 2
+
+
+def test_expire_drops_expired_entries() -> None:
+    timer = FakeTimer()
+    cache = TTLCache(maxsize=10, ttl=60, timer=timer)
+    cache.set("carrot", 1)
+    timer.now = 30
+    cache.set("beetroot", 2)
+    timer.now = 61
+
+    assert cache.values() == [2]
+    assert cache.expire() == 1
+    assert len(cache) == 1
@@ -0,0 +1,242 @@
+import asyncio
+
+import pytest
+from langchain_core.documents import Document
+
+from app.core.config import settings
+from app.core.vector_index import (
+    HNSW_MAX_EF_SEARCH,
+    _supports_iterative_scan,
+    candidate_ef_search,
+)
+from app.core.vector_search import (
+    VectorSearchService,
+    _lexical_query,
+    coverage_fusion,
+    group_by_source,
+    metadata_filter,
+    reciprocal_rank_fusion,
+    source_key,
+    vector_query,
+)
+
+
+def chunk(source: str | None, title: str = "") -> Document:
+    return Document(page_content=title, metadata={"source": source, "title": title})
+
+
+def test_group_by_source_keeps_best_chunk_per_recipe() -> None:
+    results = [
+        (chunk("a", "soup 1"), 0.10),
+        (chunk("a", "soup 2"), 0.12),
+        (chunk("b", "salad"), 0.20),
+        (chunk("a", "soup 3"), 0.25),
+        (chunk("c", "curry"), 0.30),
+    ]
+
+    grouped = group_by_source(results, 2)
+
+    assert [(doc.metadata["source"], distance) for doc, distance in grouped] == [
+        ("a", 0.10),
+        ("b", 0.20),
+    ]
+
+
+def test_group_by_source_orders_by_best_distance() -> None:
+    # e.g. after MMR, results are not sorted by distance
+    results = [
+        (chunk("b"), 0.30),
+        (chunk("a"), 0.40),
+        (chunk("b"), 0.50),
+        (chunk("a"), 0.05),
+    ]
+
+    grouped = group_by_source(results, 10)
+
+    assert [(doc.metadata["source"], distance) for doc, distance in grouped] == [
+        ("a", 0.05),
+        ("b", 0.30),
+    ]
+
+
+def test_chunks_without_source_are_kept_apart() -> None:
+    grouped = group_by_source([(chunk(None), 0.1), (chunk(None), 0.2)], 10)
+
+    assert len(grouped) == 2
+
+
+def test_metadata_filter_uses_in_for_indexed_fields() -> None:
+    assert metadata_filter() is None
+    assert metadata_filter(owner_id=3, source_type="pdf") == {
+        "owner_id": {"$in": [3]},
+        "source_type": {"$in": ["pdf"]},
+    }
+
+
+def test_reciprocal_rank_fusion() -> None:
+    vector = ["a", "b", "c"]
+    lexical = ["c", "d", "a"]
+
+    fused = reciprocal_rank_fusion([vector, lexical], key=lambda item: item, k=60)
+
+    assert [item for item, _ in fused] == ["a", "c", "b", "d"]
+    assert fused[0][1] == pytest.approx(1 / 61 + 1 / 63)
+
+
+def test_reciprocal_rank_fusion_counts_first_occurrence_per_recipe() -> None:
+    vector = [chunk("a", "soup 1"), chunk("a", "soup 2"), chunk("b", "salad")]
+    lexical = [chunk("b", "salad")]
+
+    fused = reciprocal_rank_fusion([vector, lexical], key=source_key, k=60)
+
+    assert [doc.metadata["source"] for doc, _ in fused] == ["b", "a"]
+    assert fused[0][1] == pytest.approx(1 / 62 + 1 / 61)
+
+
+def test_coverage_fusion_keeps_each_querys_top_hit() -> None:
+    carrot = ["carrot soup", "carrot cake", "carrot salad", "roast roots"]
+    beetroot = ["carrot soup", "carrot cake", "roast roots", "borscht"]
+    kale = ["kale chips", "roast roots", "carrot cake", "carrot soup"]
+
+    fused = coverage_fusion([carrot, beetroot, kale], key=lambda item: item, n=2)
+    assert [item for item, _ in fused] == ["carrot soup", "kale chips"]
+
+    # Plain RRF would rank kale chips last
+    fused = coverage_fusion([carrot, beetroot, kale], key=lambda item: item, n=3)
+    assert [item for item, _ in fused] == ["carrot soup", "carrot cake", "kale chips"]
+
+
+def test_coverage_fusion_only_covers_leading_rankings() -> None:
+    rankings = [["a", "b"], ["a", "b"], ["z"]]
+
+    covered = coverage_fusion(rankings, key=lambda item: item, n=2, covered=2)
+    everything = coverage_fusion(rankings, key=lambda item: item, n=2)
+
+    assert [item for item, _ in covered] == ["a", "b"]
+    assert [item for item, _ in everything] == ["a", "z"]
+
+
+def test_lexical_query_binds_terms_and_filters() -> None:
+    sql, params = _lexical_query(
+        ["beetroot", "red onion"], 40, metadata_filter(owner_id=7)
+    )
+
+    assert (
+        "plainto_tsquery('english', :term_0) || plainto_tsquery('english', :term_1)"
+        in sql
+    )
+    assert "e.cmetadata->>'owner_id' = ANY(:filter_owner_id)" in sql
+    assert params == {
+        "k": 40,
+        "term_0": "beetroot",
+        "term_1": "red onion",
+        "filter_owner_id": ["7"],
+    }
+
+
+def test_vector_query_reranks_quantized_candidates() -> None:
+    sql, params = vector_query(
+        "halfvec", [0.5, -1.0], 10, 4, metadata_filter(language="en")
+    )
+
+    assert (
+        "CAST(e.embedding AS halfvec(384)) <=> CAST(:embedding AS halfvec(384))" in sql
+    )
+    assert "embedding <=> CAST(:embedding AS vector) AS distance" in sql
+    assert params == {
+        "embedding": "[0.5,-1.0]",
+        "k": 10,
+        "candidates": 40,
+        "filter_language": ["en"],
+    }
+
+
+def test_vector_query_full_precision_takes_k_candidates() -> None:
+    _, params = vector_query("vector", [0.5], 10, 4)
+
+    assert params["candidates"] == 10
+
+
+def test_exact_vector_query_bypasses_the_index() -> None:
+    sql, params = vector_query(
+        "binary", [0.5], 10, 4, metadata_filter(owner_id=7), exact=True
+    )
+
+    assert "OFFSET 0" in sql
+    assert "binary_quantize" not in sql
+    assert "e.cmetadata->>'owner_id' = ANY(:filter_owner_id)" in sql
+    assert params["candidates"] == 10
+
+
+def test_ef_search_covers_the_rerank_candidates() -> None:
+    _, params = vector_query("halfvec", [0.1], k=40, rerank_factor=4)
+    assert candidate_ef_search(None, params["candidates"]) == 160
+    assert candidate_ef_search(None, 10) == settings.VECTOR_HNSW_EF_SEARCH
+    assert candidate_ef_search(200, 160) == 200
+    assert candidate_ef_search(None, 5000) == HNSW_MAX_EF_SEARCH
+
+
+@pytest.mark.parametrize(
+    "version, supported", [("0.7.4", False), ("0.8.0", True), ("0.10.1", True)]
+)
+def test_iterative_scan_needs_pgvector_0_8(version: str, supported: bool) -> None:
+    class Cursor:
+        executed = 0
+
+        def execute(self, sql: str) -> None:
+            self.executed += 1
+
+        def fetchone(self) -> tuple[str]:
+            return (version,)
+
+    class Record:
+        def __init__(self) -> None:
+            self.info: dict = {}
+
+    cursor, record = Cursor(), Record()
+
+    assert _supports_iterative_scan(cursor, record) is supported
+    assert _supports_iterative_scan(cursor, record) is supported
+    assert cursor.executed == 1
+
+
+def test_multi_vector_search_bounds_concurrent_searches() -> None:
+    class CountingSearch(VectorSearchService):
+        running = 0
+        peak = 0
+
+        async def search_by_vector_with_score(self, embedding, k=10, **kwargs):
+            CountingSearch.running += 1
+            CountingSearch.peak = max(CountingSearch.peak, CountingSearch.running)
+            await asyncio.sleep(0.01)
+            CountingSearch.running -= 1
+            return [(chunk(f"recipe-{embedding[0]}"), 0.1)]
+
+    service = CountingSearch(lambda: "", lambda: None, "test")
+    results = asyncio.run(
+        service.multi_vector_search(
+            ["a"] * 10, [[i] for i in range(10)], n=10, concurrency=3
+        )
+    )
+
+    assert CountingSearch.peak == 3
+    assert len(results) == 10
+
+
+def test_collection_generation_is_looked_up_at_most_once_per_ttl(monkeypatch) -> None:
+    lookups = []
+
+    class FakeSearch(VectorSearchService):
+        async def _execute(self, sql, params):
+            lookups.append(sql)
+            return [("uuid", len(lookups))]
+
+    service = FakeSearch(lambda: "", lambda: None, "test")
+    monkeypatch.setattr(settings, "RETRIEVAL_CACHE_GENERATION_TTL", 60.0)
+
+    async def generations():
+        return [await service.collection_generation() for _ in range(3)]
+
+    assert asyncio.run(generations()) == ["uuid:1"] * 3
+    monkeypatch.setattr(settings, "RETRIEVAL_CACHE_GENERATION_TTL", 0.0)
+    assert asyncio.run(service.collection_generation()) == "uuid:2"
@@ -0,0 +1,81 @@
+import asyncio
+import random
+from collections.abc import Generator
+
+import pytest
+from langchain_community.embeddings import FakeEmbeddings
+from langchain_postgres.vectorstores import PGVector
+from sqlalchemy import Engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.core.embeddings import EMBEDDING_DIMENSIONS
+from app.core.vector_db_services import get_connection_string, get_search_engine
+from app.core.vector_index import ensure_vector_index
+from app.core.vector_search import VectorSearchService, metadata_filter
+
+COLLECTION = "test_small_tenant"
+ROWS = 3000
+SMALL_TENANT = 7
+
+
+def random_vector(rng: random.Random) -> list[float]:
+    return [rng.gauss(0, 1) for _ in range(EMBEDDING_DIMENSIONS)]
+
+
+@pytest.fixture(scope="module")
+def search_engine() -> Generator[Engine, None, None]:
+    engine = get_search_engine()
+    try:
+        with engine.connect():
+            pass
+    except OperationalError:
+        pytest.skip("needs the pgvector database")
+    store = PGVector(
+        embeddings=FakeEmbeddings(size=EMBEDDING_DIMENSIONS),
+        connection=engine,
+        collection_name=COLLECTION,
+        embedding_length=EMBEDDING_DIMENSIONS,
+    )
+    rng = random.Random(0)
+    # The small tenant owns 3 of 3000 rows
+    store.add_embeddings(
+        texts=[f"recipe {i}" for i in range(ROWS)],
+        embeddings=[random_vector(rng) for _ in range(ROWS)],
+        metadatas=[
+            {"source": f"recipe-{i}", "owner_id": SMALL_TENANT if i % 1000 == 0 else 1}
+            for i in range(ROWS)
+        ],
+    )
+    ensure_vector_index(engine, COLLECTION)
+    yield engine
+    with engine.begin() as conn:
+        conn.execute(
+            text("DELETE FROM langchain_pg_collection WHERE name = :name"),
+            {"name": COLLECTION},
+        )
+
+
+def test_small_tenant_gets_all_of_its_recipes(search_engine: Engine) -> None:
+    service = VectorSearchService(
+        get_connection_string,
+        lambda: FakeEmbeddings(size=EMBEDDING_DIMENSIONS),
+        COLLECTION,
+    )
+
+    async def search() -> list:
+        try:
+            return await service.search_by_vector_with_score(
+                random_vector(random.Random(1)),
+                k=10,
+                filter=metadata_filter(owner_id=SMALL_TENANT),
+            )
+        finally:
+            await service.close()
+
+    results = asyncio.run(search())
+
+    assert sorted(doc.metadata["source"] for doc, _ in results) == [
+        "recipe-0",
+        "recipe-1000",
+        "recipe-2000",
+    ]
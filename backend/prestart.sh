@@ -8,3 +8,6 @@ alembic upgrade head
 
 # Create initial data in DB
 python /app/app/initial_data.py
+
+# Create the pgvector ANN index if it doesn't exist yet
+python /app/app/manage_vector_index.py ensure